@@ -1,5 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
+from src.models.knowledge import KnowledgeBase
 from src.models.navigation import db, TopicQuery, AdminAuth
+from src.services.knowledge_snapshot import load_changes, publish_changes
+from src.services.response_cache import invalidate_on_model_changes, response_cache
 import json
 import csv
 import io
@@ -8,9 +11,26 @@ from datetime import datetime
 
 admin_bp = Blueprint("admin", __name__)
 
+# Cached chat answers must not outlive topic query edits
+invalidate_on_model_changes(response_cache, TopicQuery)
+
 # Admin authentication code (in production, this should be in environment variables)
 ADMIN_AUTH_CODE = "SECOINFI2024"
 
+def publish_topic_queries(*topics):
+    """Publish a chat knowledge snapshot with the committed queries of topics re-read
+
+    The snapshot is derived from the current one on the publisher thread;
+    the returned future resolves to it.
+    """
+    return publish_changes(
+        current_app._get_current_object(),
+        lambda: load_changes(db.session, KnowledgeBase, TopicQuery, query_topics=topics),
+        # The commit already invalidated; answers cached from the old snapshot
+        # since then must go too
+        on_publish=lambda snapshot: response_cache.invalidate()
+    )
+
 class AdminManager:
     def __init__(self):
         pass
@@ -102,6 +122,7 @@ class AdminManager:
                 continue
         
         db.session.commit()
+        publish_topic_queries(topic)
         return True, f"Successfully imported {imported_count} queries for topic {topic}"
     
     def export_queries(self, topic=None, format_type="json"):
@@ -229,6 +250,7 @@ def authorize_topic():
         )
         db.session.add(default_query)
         db.session.commit()
+        publish_topic_queries(topic_name)
         
         return jsonify({
             "message": f"Topic {topic_name} created successfully",
@@ -275,6 +297,7 @@ def add_single_query():
         
         db.session.add(topic_query)
         db.session.commit()
+        publish_topic_queries(topic)
         
         return jsonify({
             "message": "Query added successfully",
@@ -297,6 +320,7 @@ def update_query(query_id):
         query_obj.updated_at = datetime.utcnow()
         
         db.session.commit()
+        publish_topic_queries(query_obj.topic)
         
         return jsonify({
             "message": "Query updated successfully",
@@ -311,8 +335,10 @@ def delete_query(query_id):
     """Delete a query"""
     try:
         query_obj = TopicQuery.query.get_or_404(query_id)
+        topic = query_obj.topic
         db.session.delete(query_obj)
         db.session.commit()
+        publish_topic_queries(topic)
         
         return jsonify({"message": "Query deleted successfully"})
     
@@ -6,17 +6,23 @@ import os
 import json
 import hashlib
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from werkzeug.utils import secure_filename
 from src.models.knowledge import (
     db, KnowledgeBase, AdminUser, TrainingSession, 
     TopicIndex, BlockchainVerification
 )
 from src.services.data_processor import DataProcessor
+from src.models.navigation import TopicQuery
+from src.services.knowledge_snapshot import load_changes, publish_changes
+from src.services.response_cache import invalidate_on_model_changes, response_cache
 
 admin_training_bp = Blueprint('admin_training', __name__)
 data_processor = DataProcessor()
 
+# Cached chat answers must not outlive knowledge base edits
+invalidate_on_model_changes(response_cache, KnowledgeBase)
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'.md', '.json', '.csv', '.txt', '.zip'}
 
@@ -24,6 +30,32 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return os.path.splitext(filename)[1].lower() in ALLOWED_EXTENSIONS
 
+def publish_training_knowledge(topics):
+    """Publish a chat knowledge snapshot with the committed entries of topics re-read
+
+    Topic hashtags become keywords, so they reach their topic in every chat
+    index and in typo correction. The snapshot is derived from the current one
+    on the publisher thread; the returned future resolves to it.
+    """
+    topics = sorted(set(topics))
+
+    def load():
+        changes = load_changes(db.session, KnowledgeBase, TopicQuery, topics=topics)
+        keywords = {}
+        if topics:
+            for topic_name, hashtags in db.session.query(TopicIndex.topic_name, TopicIndex.hashtags).filter(
+                    TopicIndex.topic_name.in_(topics)):
+                keywords.setdefault(topic_name, []).extend(json.loads(hashtags or '[]'))
+        return dict(changes, keywords=keywords)
+
+    return publish_changes(
+        current_app._get_current_object(),
+        load,
+        # The commit already invalidated; answers cached from the old snapshot
+        # since then must go too
+        on_publish=lambda snapshot: response_cache.invalidate()
+    )
+
 @admin_training_bp.route('/admin/authenticate-email', methods=['POST'])
 def authenticate_admin_email():
     """Authenticate admin by email and create/update admin user"""
@@ -155,6 +187,7 @@ def upload_training_data():
         training_session.status = 'completed'
         training_session.completed_at = datetime.utcnow()
         db.session.commit()
+        publish_training_knowledge(topic['topic'] for topic in processed_topics)
         
         return jsonify({
             'message': f'Successfully processed {total_topics} topics from {len(files)} files',
@@ -228,6 +261,7 @@ def process_econtract_data():
         training_session.status = 'completed'
         training_session.completed_at = datetime.utcnow()
         db.session.commit()
+        publish_training_knowledge(topic['topic'] for topic in processed_topics)
         
         return jsonify({
             'message': f'Successfully processed {len(topics)} e-contract topics',
@@ -0,0 +1,117 @@
+"""
+Analysis Result Cache for Infy AI
+Freshness window over stored domain analyses: fresh results are served as
+is, stale ones are served at once while a single background refresh runs,
+and expired or missing ones are analyzed once however many callers ask
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, MutableMapping, Optional, Tuple
+
+Analyze = Callable[[], Dict[str, Any]]
+
+
+def analyzed_at(result: Dict[str, Any]) -> Optional[datetime]:
+    """When a stored result was produced; reads analyzed_at or Domain.to_dict()'s last_analyzed"""
+    if result.get('status', 'completed') != 'completed':
+        return None  # queued placeholders are not analyses
+    stamp = result.get('analyzed_at') or result.get('last_analyzed')
+    if isinstance(stamp, datetime):
+        return stamp
+    try:
+        return datetime.fromisoformat(stamp) if stamp else None
+    except ValueError:
+        return None
+
+
+class AnalysisCache:
+    """Stale-while-revalidate view over a result store keyed by canonical domain key"""
+
+    def __init__(self, store: MutableMapping[str, Dict[str, Any]], fresh_seconds: float = 3600.0,
+                 stale_seconds: float = 7 * 86400.0, refresh_workers: int = 4):
+        self.store = store
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.refresh_workers = refresh_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def age(self, result: Dict[str, Any], now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds since the result was produced, None if it never was"""
+        stamp = analyzed_at(result)
+        return None if stamp is None else ((now or datetime.utcnow()) - stamp).total_seconds()
+
+    def _run(self, key: str, analyze: Analyze, future: Future):
+        try:
+            result = analyze()
+            self.store[key] = result
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _background_refresh(self, key: str, analyze: Analyze, future: Future):
+        self._run(key, analyze, future)
+        error = future.exception()
+        if error is not None:
+            self.refresh_failures += 1
+            print(f"Error refreshing analysis of {key}: {error}")
+
+    def get(self, key: str, analyze: Analyze) -> Tuple[Dict[str, Any], str]:
+        """Return (result, state); state is fresh, stale, miss or coalesced"""
+        result = self.store.get(key)
+        age = self.age(result) if result is not None else None
+        if age is not None and age <= self.fresh_seconds:
+            self.fresh_hits += 1
+            return result, 'fresh'
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if age is not None and age <= self.fresh_seconds + self.stale_seconds:
+            # Serve what we have; one refresh per key no matter how many stale reads arrive
+            self.stale_hits += 1
+            if leader:
+                self.refreshes += 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.refresh_workers, thread_name_prefix='analysis-refresh')
+                self._executor.submit(self._background_refresh, key, analyze, future)
+            return result, 'stale'
+
+        if not leader:
+            self.coalesced += 1
+            return future.result(), 'coalesced'
+        self.misses += 1
+        self._run(key, analyze, future)
+        return future.result(), 'miss'
+
+    def stats(self) -> Dict[str, Any]:
+        """Get freshness counters"""
+        lookups = self.fresh_hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            'fresh_seconds': self.fresh_seconds,
+            'stale_seconds': self.stale_seconds,
+            'fresh_hits': self.fresh_hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'in_flight': len(self._in_flight),
+            'hit_ratio': round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
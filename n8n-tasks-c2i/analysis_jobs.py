@@ -0,0 +1,333 @@
+"""
+Analysis Jobs for Infy AI
+Background bulk-analysis jobs: submitting returns a job id at once, workers
+analyze the domains chunk by chunk, progress is published at most once per
+interval, and an optional callback URL is notified when the job finishes.
+Callbacks are delivered only to public addresses, resolved once per attempt
+and connected to directly, so a job cannot be used to reach this machine or
+its private network
+"""
+import ipaddress
+import json
+import queue
+import socket
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import urlsplit
+
+ChunkAnalyzer = Callable[[List[str]], List[Union[Dict[str, Any], Exception]]]
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+
+def check_callback_url(url: str):
+    """Raise ValueError unless url is http(s) to a host name or a public IP address
+
+    Only the URL is inspected, so this is safe on the request path; host names
+    are resolved and checked by resolve_callback_url when the callback is sent.
+    """
+    parts = urlsplit(url or '')
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError('callback_url must be an absolute http(s) URL')
+    host = parts.hostname
+    if host == 'localhost' or host.endswith('.localhost'):
+        raise ValueError(f"callback_url host {host!r} is this machine")
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return
+    if not _is_public(host):
+        raise ValueError(f"callback_url host {host!r} is a non-public address")
+
+
+def resolve_callback_url(url: str) -> str:
+    """Resolve the callback URL's host once; returns the address to deliver to
+
+    Raises ValueError if the URL fails check_callback_url, the host cannot be
+    resolved, or any address it resolves to is not public.
+    """
+    check_callback_url(url)
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = [info[4][0] for info in socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)]
+    except (OSError, ValueError) as e:
+        raise ValueError(f"callback_url host {parts.hostname!r} cannot be resolved: {e}")
+    if not addresses:
+        raise ValueError(f"callback_url host {parts.hostname!r} cannot be resolved")
+    for address in addresses:
+        if not _is_public(address):
+            raise ValueError(f"callback_url host {parts.hostname!r} resolves to non-public address {address}")
+    return addresses[0]
+
+
+def _is_public(address: str) -> bool:
+    # Scoped IPv6 addresses come back as fe80::1%eth0
+    parsed = ipaddress.ip_address(address.split('%', 1)[0])
+    if parsed.version == 6 and parsed.ipv4_mapped is not None:
+        parsed = parsed.ipv4_mapped
+    return parsed.is_global
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """A redirect would skip resolve_callback_url; 3xx responses fail the delivery instead"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class _PinnedAddress(urllib.request.HTTPHandler, urllib.request.HTTPSHandler):
+    """Connects to the address resolve_callback_url checked instead of resolving the host again
+
+    The Host header and TLS certificate check still use the URL's host name.
+    """
+
+    def __init__(self, address: str):
+        urllib.request.HTTPSHandler.__init__(self)
+        self.address = address
+
+    def do_open(self, http_class, req, **http_conn_args):
+        def connection(host, **kwargs):
+            conn = http_class(host, **kwargs)
+            conn._create_connection = lambda target, *args: socket.create_connection((self.address, target[1]), *args)
+            return conn
+        return super().do_open(connection, req, **http_conn_args)
+
+
+def _callback_opener(address: str) -> urllib.request.OpenerDirector:
+    """Opener delivering straight to address: no proxies, no redirects"""
+    return urllib.request.build_opener(urllib.request.ProxyHandler({}), _NoRedirects, _PinnedAddress(address))
+
+
+class AnalysisJob:
+    """One bulk analysis: its domain keys, batch record and published progress"""
+
+    def __init__(self, keys: List[str], batch: Dict[str, Any], callback_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.keys: Optional[List[str]] = keys
+        self.batch = batch
+        self.callback_url = callback_url
+        self.total = len(keys)
+        self.processed = 0
+        self.failed = 0
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.callback_status: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        # (monotonic time, domains done) at each publish; the window gives current throughput
+        self._samples: deque = deque(maxlen=30)
+
+    def throughput(self) -> float:
+        """Domains per second over the recent publish window"""
+        if len(self._samples) < 2:
+            return 0.0
+        (first_time, first_done), (last_time, last_done) = self._samples[0], self._samples[-1]
+        return (last_done - first_done) / (last_time - first_time) if last_time > first_time else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Progress as last published by the worker"""
+        done = self.processed + self.failed
+        rate = self.throughput()
+        if self.status in FINISHED_STATUSES:
+            eta = 0.0
+        else:
+            eta = round((self.total - done) / rate, 1) if rate else None
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'batch_id': self.batch.get('id'),
+            'total_domains': self.total,
+            'processed_domains': self.processed,
+            'failed_domains': self.failed,
+            'progress_percentage': round(done * 100.0 / self.total, 2) if self.total else 100.0,
+            'throughput_per_second': round(rate, 2),
+            'eta_seconds': eta,
+            'error': self.error,
+            'callback_url': self.callback_url,
+            'callback_status': self.callback_status,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class AnalysisJobRunner:
+    """Worker threads running submitted jobs in order, chunk_size domains at a time"""
+
+    def __init__(self, workers: int = 2, chunk_size: int = 50, progress_interval: float = 1.0,
+                 callback_timeout: float = 10.0, callback_attempts: int = 3, max_finished_jobs: int = 1000):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.callback_timeout = callback_timeout
+        self.callback_attempts = callback_attempts
+        self.max_finished_jobs = max_finished_jobs
+        self.analyze: Optional[ChunkAnalyzer] = None
+
+        self._jobs: 'OrderedDict[str, AnalysisJob]' = OrderedDict()
+        self._queue: 'queue.Queue[AnalysisJob]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.publishes = 0
+        self.callbacks_delivered = 0
+        self.callbacks_failed = 0
+
+    def start(self, analyze: ChunkAnalyzer):
+        """Attach the chunk analyzer and start the worker threads"""
+        self.analyze = analyze
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._threads = [
+            threading.Thread(target=self._run, name=f'analysis-job-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, keys: List[str], batch: Dict[str, Any], callback_url: Optional[str] = None) -> AnalysisJob:
+        """Queue a job and return it without waiting for any analysis
+
+        Raises ValueError for a callback URL that fails check_callback_url.
+        """
+        if callback_url:
+            check_callback_url(callback_url)
+        job = AnalysisJob(keys, batch, callback_url)
+        batch['job_id'] = job.id
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+            self.submitted += 1
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 50) -> List[AnalysisJob]:
+        """Most recently submitted jobs first"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _publish(self, job: AnalysisJob, processed: int, failed: int, status: Optional[str] = None):
+        # The only place job and batch counters change, so readers see coalesced progress
+        with self._lock:
+            job.processed, job.failed = processed, failed
+            job._samples.append((time.monotonic(), processed + failed))
+            if status is not None:
+                job.status = status
+            job.batch.update(
+                processed_domains=processed,
+                failed_domains=failed,
+                progress_percentage=job.snapshot()['progress_percentage'],
+                status='processing' if job.status == 'running' else job.status
+            )
+            self.publishes += 1
+
+    def _execute(self, job: AnalysisJob):
+        job.started_at = datetime.utcnow()
+        self._publish(job, 0, 0, 'running')
+        processed = failed = 0
+        last_publish = time.monotonic()
+        try:
+            for start in range(0, job.total, self.chunk_size):
+                chunk = job.keys[start:start + self.chunk_size]
+                try:
+                    results = self.analyze(chunk)
+                except Exception as e:
+                    print(f"Error analyzing chunk of job {job.id}: {e}")
+                    results = [e] * len(chunk)
+                chunk_failed = sum(1 for result in results if isinstance(result, Exception))
+                failed += chunk_failed
+                processed += len(chunk) - chunk_failed
+                if time.monotonic() - last_publish >= self.progress_interval:
+                    self._publish(job, processed, failed)
+                    last_publish = time.monotonic()
+            status = 'completed'
+        except Exception as e:
+            job.error = str(e)
+            status = 'failed'
+        job.finished_at = datetime.utcnow()
+        job.batch['completed_at'] = job.finished_at.isoformat()
+        self._publish(job, processed, failed, status)
+        job.keys = None  # the key list is only needed while running
+        with self._lock:
+            if status == 'completed':
+                self.completed += 1
+            else:
+                self.failed += 1
+        if job.callback_url:
+            threading.Thread(target=self._notify, args=(job,), name=f'analysis-job-callback-{job.id[:8]}',
+                             daemon=True).start()
+
+    def _notify(self, job: AnalysisJob):
+        """POST the final snapshot to the job's callback URL, retrying with backoff"""
+        body = json.dumps({'event': 'analysis_job.finished', 'job': job.snapshot(), 'batch': job.batch}).encode()
+        error = None
+        for attempt in range(self.callback_attempts):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+            request = urllib.request.Request(job.callback_url, data=body, method='POST',
+                                             headers={'Content-Type': 'application/json'})
+            try:
+                # Resolved at send time, and only once: the host may resolve elsewhere by now
+                address = resolve_callback_url(job.callback_url)
+            except ValueError as e:
+                error = e
+                break
+            try:
+                with _callback_opener(address).open(request, timeout=self.callback_timeout) as response:
+                    job.callback_status = f"delivered: HTTP {response.status}"
+                    self.callbacks_delivered += 1
+                    return
+            except Exception as e:
+                error = e
+        job.callback_status = f"failed: {error}"
+        self.callbacks_failed += 1
+        print(f"Error notifying callback for job {job.id}: {error}")
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._execute(job)
+            except Exception as e:
+                print(f"Error running analysis job {job.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get job and callback counters"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+        return {
+            'workers': self.workers,
+            'submitted': self.submitted,
+            'queued': self._queue.qsize(),
+            'running': running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'progress_publishes': self.publishes,
+            'callbacks_delivered': self.callbacks_delivered,
+            'callbacks_failed': self.callbacks_failed
+        }
+
+
+# Shared job runner; main.py starts it with its chunk analyzer
+analysis_jobs = AnalysisJobRunner()
@@ -0,0 +1,406 @@
+"""
+Domain Analysis Scheduler for Infy AI
+Pool of background workers draining DomainAnalysisQueue in priority order,
+with lease timeouts, retry backoff and coalesced DomainBatch progress
+"""
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from sqlalchemy import and_, case, func, or_, select, update
+
+from src.models.domain import Domain, DomainAnalysisQueue, DomainBatch, Protocol
+from src.services.domain_aggregates import AGGREGATE_COLUMNS, domain_aggregates
+from src.services.domain_canonical import protocol_variants, supported_protocol
+from src.services.sitemap_fetcher import sitemap_fetcher
+
+Analyzer = Callable[[Dict[str, Any]], Dict[str, Any]]
+# Analyzes a whole claimed chunk; returns per row either Domain updates or an exception
+BatchAnalyzer = Callable[[List[Dict[str, Any]]], List[Union[Dict[str, Any], Exception]]]
+
+
+class PermanentAnalysisError(Exception):
+    """Analysis failure that retrying cannot fix; the row fails immediately"""
+
+
+def probe_domain(row: Dict[str, Any], timeout: float = 10.0) -> Dict[str, Any]:
+    """Default analyzer: fetch the domain's root URL and record the response status"""
+    full_url = row['full_url']
+    if not full_url.startswith(('http://', 'https://')):
+        raise PermanentAnalysisError(f"Unsupported protocol for {full_url}")
+    try:
+        with urllib.request.urlopen(full_url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        if e.code < 500:
+            return {'analysis_notes': f"HTTP {e.code}"}
+        raise
+    return {'analysis_notes': f"HTTP {status}"}
+
+
+def sitemap_analyzer(rows: List[Dict[str, Any]], timeout: float = 120.0) -> List[Union[Dict[str, Any], Exception]]:
+    """Probe a chunk's sitemaps concurrently on the shared SitemapFetcher"""
+    results: List[Union[Dict[str, Any], Exception]] = [
+        PermanentAnalysisError(f"Unsupported protocol for {row['full_url']}") for row in rows
+    ]
+    web_rows = [index for index, row in enumerate(rows) if row['full_url'].startswith(('http://', 'https://'))]
+    probes = sitemap_fetcher.probe_blocking([rows[index]['full_url'] for index in web_rows], timeout=timeout)
+    for index, probe in zip(web_rows, probes):
+        results[index] = probe if isinstance(probe, Exception) else {
+            'sitemap_found': probe['found'],
+            'sitemap_url': probe['url'],
+            'sitemap_pages_count': probe['pages_count']
+        }
+    return results
+
+
+def bump_protocol_usage(session, counts: Dict[str, int]):
+    """Add per-protocol usage in one UPDATE; commits with the caller's transaction"""
+    counts = {protocol: count for protocol, count in counts.items() if count}
+    if not counts:
+        return
+    session.execute(
+        update(Protocol)
+        .where(Protocol.protocol.in_(list(counts)))
+        .values(usage_count=func.coalesce(Protocol.usage_count, 0) + case(counts, value=Protocol.protocol, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def variant_notes(fanout: Dict[str, Any]) -> str:
+    """One line per probed variant: status or error, and timing"""
+    return '\n'.join(
+        f"{variant['protocol']} {variant['status'] or variant['error']} {variant['elapsed_ms']:.0f}ms"
+        + (f" -> {variant['final_url']}" if variant['redirected'] else '')
+        for variant in fanout['variants'] if variant['protocol'] in fanout['probed']
+    )
+
+
+def protocol_fanout_analyzer(rows: List[Dict[str, Any]], timeout: float = 120.0) -> List[Union[Dict[str, Any], Exception]]:
+    """Probe every active protocol variant of each domain in a chunk concurrently
+
+    Runs inside the worker's app context; Protocol.usage_count is bumped in
+    one UPDATE per chunk and committed together with the outcomes.
+    """
+    session = Protocol.query.session
+    protocols = [protocol for (protocol,) in session.execute(
+        select(Protocol.protocol).where(Protocol.is_active.is_(True)).order_by(Protocol.id))
+        if supported_protocol(protocol)]  # an unsupported custom row must not fail every domain
+    fanouts: List[Any] = []
+    for row in rows:
+        try:
+            fanouts.append([(protocol, canonical.url)
+                            for protocol, canonical in protocol_variants(row['domain_name'], protocols)])
+        except ValueError as e:
+            fanouts.append(PermanentAnalysisError(str(e)))
+    probed = [index for index, fanout in enumerate(fanouts) if not isinstance(fanout, Exception)]
+    for index, fanout in zip(probed, sitemap_fetcher.probe_variants_blocking([fanouts[index] for index in probed],
+                                                                              timeout=timeout)):
+        fanouts[index] = fanout
+
+    results: List[Union[Dict[str, Any], Exception]] = []
+    usage: Dict[str, int] = {}
+    for row, fanout in zip(rows, fanouts):
+        if isinstance(fanout, Exception):
+            results.append(fanout)
+            continue
+        for protocol in fanout['probed']:
+            usage[protocol] = usage.get(protocol, 0) + 1
+        if not fanout['probed']:
+            results.append(PermanentAnalysisError(f"No active web protocol for {row['domain_name']}"))
+        elif not fanout['reachable']:
+            results.append(ConnectionError(f"No protocol variant of {row['domain_name']} is reachable"))
+        else:
+            sitemap = fanout['sitemap'] or {}
+            results.append({
+                'sitemap_found': bool(sitemap.get('found')),
+                'sitemap_url': sitemap.get('url'),
+                'sitemap_pages_count': sitemap.get('pages_count', 0),
+                'analysis_notes': variant_notes(fanout)
+            })
+    bump_protocol_usage(session, usage)
+    return results
+
+
+class AnalysisScheduler:
+    """Worker threads that claim queue rows under a lease and record results in chunks"""
+
+    def __init__(self, workers: int = 4, claim_size: int = 10, lease_seconds: int = 300,
+                 poll_interval: float = 1.0, base_backoff_seconds: float = 30.0,
+                 max_backoff_seconds: float = 3600.0, analyzer: Optional[Analyzer] = None,
+                 batch_analyzer: Optional[BatchAnalyzer] = None):
+        self.workers = workers
+        self.claim_size = claim_size
+        # A lease must outlast analyzing claim_size rows, or another worker re-claims them
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.analyzer = analyzer or probe_domain
+        self.batch_analyzer = batch_analyzer
+
+        self.app = None
+        self.db = None
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._counter_lock = threading.Lock()
+        self._finished_at = deque(maxlen=10000)
+
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.lost_leases = 0
+        self.exhausted = 0
+
+    def start(self, app, db, workers: Optional[int] = None):
+        """Start the worker threads against a Flask app's database"""
+        self.app = app
+        self.db = db
+        if workers is not None:
+            self.workers = workers
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'analysis-worker-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the workers after their current chunk"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _claimable(self, now: datetime):
+        queue = DomainAnalysisQueue
+        return or_(
+            and_(queue.status == 'queued',
+                 or_(queue.next_attempt_at.is_(None), queue.next_attempt_at <= now)),
+            # A lost lease counts as an attempt; rows out of attempts are failed instead
+            and_(queue.status == 'processing', queue.lease_expires_at < now,
+                 queue.attempts < queue.max_attempts)
+        )
+
+    def fail_exhausted(self) -> int:
+        """Fail rows whose lease expired on their last allowed attempt"""
+        queue = DomainAnalysisQueue
+        rows = self.db.session.execute(
+            select(queue.id, queue.domain_id, queue.batch_id, queue.attempts, queue.max_attempts,
+                   queue.lease_owner)
+            .where(queue.status == 'processing', queue.lease_expires_at < datetime.utcnow(),
+                   queue.attempts >= queue.max_attempts)
+            .order_by(queue.id)
+            .limit(self.claim_size)
+        ).mappings().all()
+        if not rows:
+            return 0
+        # Recorded under the expired lease, so a late result from its worker loses
+        counts = self.record([(dict(row), None, f"Lease expired on attempt {row['attempts']} of {row['max_attempts']}",
+                               False) for row in rows])
+        with self._counter_lock:
+            self.exhausted += counts['failed']
+        return counts['failed']
+
+    def claim(self) -> List[Dict[str, Any]]:
+        """Lease up to claim_size rows, highest priority first"""
+        queue = DomainAnalysisQueue
+        session = self.db.session
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        candidates = (select(queue.id)
+                      .where(self._claimable(now))
+                      .order_by(queue.priority.desc(), queue.id)
+                      .limit(self.claim_size))
+        # The claimable condition is re-checked by the UPDATE itself, so two
+        # workers racing for the same candidates cannot both take a row
+        session.execute(
+            update(queue)
+            .where(queue.id.in_(candidates.scalar_subquery()), self._claimable(now))
+            .values(status='processing', lease_owner=token,
+                    lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    attempts=queue.attempts + 1, last_attempt=now)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+        rows = session.execute(
+            select(queue.id, queue.domain_id, queue.batch_id, queue.attempts, queue.max_attempts,
+                   Domain.domain_name, Domain.protocol, Domain.full_url)
+            .join(Domain, Domain.id == queue.domain_id)
+            .where(queue.lease_owner == token)
+            .order_by(queue.priority.desc(), queue.id)
+        ).mappings().all()
+        claimed = [dict(row, lease_owner=token) for row in rows]
+        with self._counter_lock:
+            self.claimed += len(claimed)
+        return claimed
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before the next attempt, exponential with jitter"""
+        delay = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** max(attempts - 1, 0)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def process(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Analyze claimed rows and record every outcome in one transaction"""
+        if self.batch_analyzer is not None:
+            try:
+                results = self.batch_analyzer(rows)
+            except Exception as e:
+                results = [e] * len(rows)
+        else:
+            results = []
+            for row in rows:
+                try:
+                    results.append(self.analyzer(row))
+                except Exception as e:
+                    results.append(e)
+
+        outcomes = []
+        for row, result in zip(rows, results):
+            if isinstance(result, PermanentAnalysisError):
+                outcomes.append((row, None, str(result), False))
+            elif isinstance(result, Exception):
+                outcomes.append((row, None, str(result) or type(result).__name__,
+                                 row['attempts'] < row['max_attempts']))
+            else:
+                outcomes.append((row, result, None, True))
+        return self.record(outcomes)
+
+    def record(self, outcomes) -> Dict[str, int]:
+        """Write (row, updates, error, retryable) outcomes and batch progress"""
+        queue = DomainAnalysisQueue
+        session = self.db.session
+        now = datetime.utcnow()
+        counts = {'completed': 0, 'retried': 0, 'failed': 0, 'lost': 0}
+        batch_deltas: Dict[int, List[int]] = {}
+        # Aggregate columns before this chunk's writes, read in one query
+        previous = {row.id: dict(row._mapping) for row in session.execute(
+            select(Domain.id, *(getattr(Domain, column) for column in AGGREGATE_COLUMNS))
+            .where(Domain.id.in_({row['domain_id'] for row, _, error, retryable in outcomes
+                                  if error is None or not retryable}))
+        )}
+        aggregate_changes = []
+
+        for row, updates, error, retryable in outcomes:
+            if error is None:
+                values = {'status': 'completed', 'error_message': None}
+            elif retryable:
+                values = {'status': 'queued', 'error_message': error,
+                          'next_attempt_at': now + timedelta(seconds=self.backoff(row['attempts']))}
+            else:
+                values = {'status': 'failed', 'error_message': error}
+
+            # Only the current lease holder may record a result
+            result = session.execute(
+                update(queue)
+                .where(queue.id == row['id'], queue.lease_owner == row['lease_owner'])
+                .values(lease_owner=None, lease_expires_at=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                counts['lost'] += 1
+                continue
+
+            if error is None:
+                domain_values = dict(updates or {}, analysis_status='completed', last_analyzed=now)
+                counts['completed'] += 1
+            elif retryable:
+                counts['retried'] += 1
+                continue
+            else:
+                domain_values = {'analysis_status': 'failed', 'analysis_notes': error, 'last_analyzed': now}
+                counts['failed'] += 1
+            session.execute(
+                update(Domain).where(Domain.id == row['domain_id']).values(**domain_values)
+                .execution_options(synchronize_session=False)
+            )
+            before = previous.get(row['domain_id'])
+            if before is not None:
+                aggregate_changes.append((before, dict(before, **domain_values)))
+            if row['batch_id'] is not None:
+                delta = batch_deltas.setdefault(row['batch_id'], [0, 0])
+                delta[0 if error is None else 1] += 1
+
+        # One increment per batch per chunk instead of a write per domain
+        for batch_id, (processed, failed) in batch_deltas.items():
+            done = DomainBatch.processed_domains + DomainBatch.failed_domains + processed + failed
+            finished = done >= DomainBatch.total_domains
+            session.execute(
+                update(DomainBatch)
+                .where(DomainBatch.id == batch_id)
+                .values(
+                    processed_domains=DomainBatch.processed_domains + processed,
+                    failed_domains=DomainBatch.failed_domains + failed,
+                    progress_percentage=case(
+                        (finished, 100.0),
+                        else_=done * 100.0 / DomainBatch.total_domains),
+                    status=case((finished, 'completed'), else_='processing'),
+                    started_at=func.coalesce(DomainBatch.started_at, now),
+                    completed_at=case((finished, now), else_=DomainBatch.completed_at)
+                )
+                .execution_options(synchronize_session=False)
+            )
+        session.commit()
+        domain_aggregates.replace_many(aggregate_changes)
+
+        with self._counter_lock:
+            self.completed += counts['completed']
+            self.retried += counts['retried']
+            self.failed += counts['failed']
+            self.lost_leases += counts['lost']
+            self._finished_at.append((time.monotonic(), counts['completed'] + counts['failed']))
+        return counts
+
+    def run_once(self) -> int:
+        """Claim and process one chunk; returns the number of rows claimed"""
+        self.fail_exhausted()
+        rows = self.claim()
+        if rows:
+            self.process(rows)
+        return len(rows)
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    claimed = self.run_once()
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"Error in domain analysis worker: {e}")
+                    claimed = 0
+                if not claimed:
+                    self._stopping.wait(self.poll_interval)
+            self.db.session.remove()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get worker counters and recent throughput"""
+        cutoff = time.monotonic() - 60
+        with self._counter_lock:
+            last_minute = sum(count for finished_at, count in self._finished_at if finished_at >= cutoff)
+        return {
+            'workers': self.workers,
+            'running': sum(1 for thread in self._threads if thread.is_alive()),
+            'claimed': self.claimed,
+            'completed': self.completed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'lost_leases': self.lost_leases,
+            'exhausted': self.exhausted,
+            'domains_last_minute': last_minute
+        }
+
+
+# Shared domain analysis scheduler, started by init_database; fills the sitemap columns
+analysis_scheduler = AnalysisScheduler(batch_analyzer=sitemap_analyzer)
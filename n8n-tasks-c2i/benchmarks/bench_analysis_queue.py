@@ -0,0 +1,159 @@
+"""
+Benchmark: AnalysisScheduler throughput draining DomainAnalysisQueue with the
+production sitemap_analyzer, against a local stand-in site and a SQLite database
+Usage: python benchmarks/bench_analysis_queue.py [--domains 5000] [--workers 8]
+
+Every domain is a distinct host name that a stubbed resolver points at the
+stand-in server, so robots.txt, crawl-delay spacing, host slots and sitemap
+parsing all run as they do against real sites. The src package layout the
+scheduler imports is built in a temporary directory, as the tests do.
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from conftest import build_src_layout
+
+LAYOUT = tempfile.mkdtemp(prefix='infy-src-layout-')
+build_src_layout(LAYOUT)
+sys.path[:0] = [ROOT, LAYOUT]
+
+from aiohttp.abc import AbstractResolver
+from flask import Flask
+
+from src.models.domain import Domain, DomainAnalysisQueue, DomainBatch
+from src.models.user import db
+from src.services.analysis_queue import AnalysisScheduler, sitemap_analyzer
+from src.services.sitemap_fetcher import sitemap_fetcher
+
+SITE_SUFFIX = '.bench.test'
+PAGES_PER_SITEMAP = 100
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # Roughly one in fifty requests fails so retries are exercised
+        if random.random() < 0.02:
+            self.reply(503, b'unavailable', 'text/plain')
+        elif self.path == '/robots.txt':
+            host = self.headers['Host']
+            self.reply(200, f"User-agent: *\nAllow: /\nSitemap: http://{host}/sitemap.xml\n".encode(), 'text/plain')
+        elif self.path == '/sitemap.xml':
+            host = self.headers['Host']
+            urls = ''.join(f"<url><loc>http://{host}/page-{page}</loc></url>" for page in range(PAGES_PER_SITEMAP))
+            body = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' \
+                   f'{urls}</urlset>'
+            self.reply(200, body.encode(), 'application/xml')
+        else:
+            self.reply(404, b'not found', 'text/plain')
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInResolver(AbstractResolver):
+    """Stubbed DNS: every benchmark host name resolves to the local stand-in server"""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        self.requests += 1
+        if not host.endswith(SITE_SUFFIX):
+            raise OSError(f"{host} is not a benchmark host")
+        return [{'hostname': host, 'host': '127.0.0.1', 'port': port, 'family': socket.AF_INET,
+                 'proto': 0, 'flags': socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {'requests': self.requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--domains', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--claim-size', type=int, default=50)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    # Before the fetcher opens its session, which binds the resolver
+    sitemap_fetcher.resolver = StandInResolver()
+
+    workdir = tempfile.mkdtemp()
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        batch = DomainBatch(batch_name='bench', file_type='csv', total_domains=args.domains)
+        db.session.add(batch)
+        db.session.flush()
+        domains = []
+        for index in range(args.domains):
+            name = f"site-{index}{SITE_SUFFIX}:{port}"
+            domains.append({'domain_name': name, 'protocol': 'http://', 'full_url': f"http://{name}"})
+        db.session.execute(Domain.__table__.insert(), domains)
+        domain_ids = db.session.execute(db.select(Domain.id)).scalars().all()
+        db.session.execute(DomainAnalysisQueue.__table__.insert(), [
+            {'domain_id': domain_id, 'batch_id': batch.id, 'priority': random.randint(1, 4),
+             'status': 'queued', 'attempts': 0, 'max_attempts': 3}
+            for domain_id in domain_ids
+        ])
+        db.session.commit()
+        batch_id = batch.id
+
+    scheduler = AnalysisScheduler(claim_size=args.claim_size, poll_interval=0.05,
+                                  base_backoff_seconds=0.1, max_backoff_seconds=1.0,
+                                  batch_analyzer=sitemap_analyzer)
+    start = time.perf_counter()
+    scheduler.start(app, db, workers=args.workers)
+    with app.app_context():
+        while True:
+            progress = db.session.get(DomainBatch, batch_id)
+            db.session.refresh(progress)
+            if progress.status == 'completed':
+                break
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - start
+        found = Domain.query.filter(Domain.sitemap_found.is_(True)).count()
+        print(f"{args.domains} domains, {args.workers} workers: {elapsed:.2f}s, "
+              f"{args.domains / elapsed * 60:.0f} domains/min")
+        print(f"batch: processed={progress.processed_domains} failed={progress.failed_domains} "
+              f"progress={progress.progress_percentage:.1f}% sitemaps_found={found}")
+    scheduler.stop()
+    print(scheduler.stats())
+    print(sitemap_fetcher.stats())
+    sitemap_fetcher.close()
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+    shutil.rmtree(LAYOUT, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: BM25Index build, incremental append and query latency
+Usage: python benchmarks/bench_bm25_index.py [--passages 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bm25_index import BM25Index
+
+VOCABULARY = [f"term{i}" for i in range(20000)] + [
+    'blockchain', 'domain', 'sitemap', 'contract', 'agreement', 'ethereum',
+    'service', 'ranking', 'authority', 'payment', 'secoinfi', 'contact'
+]
+
+QUERIES = [
+    'what is secoinfi',
+    'blockchain contract agreement',
+    'domain authority ranking service',
+    'sitemap term42 term1337',
+    'contact payment ethereum'
+]
+
+
+def make_passage(rng):
+    common = rng.choices(VOCABULARY[-12:], k=5)
+    rare = rng.choices(VOCABULARY, k=60)
+    return ' '.join(common + rare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--passages', type=int, default=100000)
+    parser.add_argument('--append', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    index = BM25Index()
+
+    start = time.perf_counter()
+    index.add_documents((i, make_passage(rng), None, None) for i in range(args.passages))
+    print(f"build {args.passages} passages: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index.add_documents((args.passages + i, make_passage(rng), None, None) for i in range(args.append))
+    print(f"incremental append {args.append} passages: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    latencies = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        index.search(QUERIES[i % len(QUERIES)], top_k=5)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"query p50 {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms")
+    print(index.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: bytes per domain of main.py's dict-of-dicts domain store versus CompactDomainStore
+Usage: python benchmarks/bench_domain_records.py [--domains 1000000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain_canonical import canonicalize
+from domain_records import CompactDomainStore
+
+
+def analysis_results(count, seed=7):
+    """Records shaped like main.py's run_domain_analysis output"""
+    generator = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for index in range(count):
+        canonical = canonicalize(f"site-{index}.example.com", generator.choice(('https://', 'http://')))
+        found = generator.random() < 0.3
+        yield canonical.key, {
+            'domain': canonical.key,
+            'domain_id': canonical.id,
+            'protocol': canonical.protocol,
+            'full_url': canonical.url,
+            'ranking': {
+                'domain_authority': generator.randint(20, 95),
+                'page_authority': generator.randint(15, 85)
+            },
+            'sitemap': {'found': found, 'url': f"{canonical.url}/sitemap.xml" if found else None,
+                        'pages_count': generator.randint(1, 50000) if found else 0},
+            'indexing': {
+                'google_indexed': generator.random() < 0.5,
+                'bing_indexed': generator.random() < 0.5
+            },
+            'status': 'completed',
+            'analyzed_at': (start + timedelta(microseconds=generator.randint(0, 10 ** 12))).isoformat()
+        }
+
+
+def fill(store, count):
+    for key, record in analysis_results(count):
+        store[key] = record
+    return store
+
+
+def measure(label, make, count):
+    gc.collect()
+    tracemalloc.start()
+    store = fill(make(), count)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<22} {size / 2 ** 20:>9.1f} MiB {size / count:>8.0f} bytes/domain")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--domains', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{args.domains} domains")
+    before = measure('dict of dicts', dict, args.domains)
+    keys = random.Random(1).sample(list(before), min(args.lookups, args.domains))
+    start = time.perf_counter()
+    for key in keys:
+        before[key]
+    dict_lookup = (time.perf_counter() - start) / len(keys)
+    del before
+
+    after = measure('CompactDomainStore', CompactDomainStore, args.domains)
+    start = time.perf_counter()
+    for key in keys:
+        after[key]
+    compact_lookup = (time.perf_counter() - start) / len(keys)
+    print(f"lookup: dict {dict_lookup * 1e6:.2f} us, compact (decoded dict) {compact_lookup * 1e6:.2f} us")
+    print(after.stats())
+
+
+if __name__ == '__main__':
+    main()
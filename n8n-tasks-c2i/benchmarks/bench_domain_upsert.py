@@ -0,0 +1,89 @@
+"""
+Benchmark: bulk_upsert_domains rows/sec on SQLite versus per-row ORM inserts
+Usage: python benchmarks/bench_domain_upsert.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from conftest import build_src_layout
+
+# The src package layout the models import, built as the tests build it
+LAYOUT = tempfile.mkdtemp(prefix='infy-src-layout-')
+build_src_layout(LAYOUT)
+sys.path[:0] = [ROOT, LAYOUT]
+
+from flask import Flask
+
+from domain_upsert import bulk_upsert_domains
+from src.models.domain import Domain
+from src.models.user import db
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+    return app
+
+
+def domain_rows(count):
+    return ((f"site-{index}.example.com", 'https://') for index in range(count))
+
+
+def per_row_insert(count):
+    # The pattern the bulk path replaces: one SELECT and one INSERT per domain
+    for domain_name, protocol in domain_rows(count):
+        if not Domain.query.filter_by(full_url=f"{protocol}{domain_name}").first():
+            db.session.add(Domain(domain_name, protocol))
+            db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--baseline-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        app = make_app(os.path.join(workdir, 'baseline.db'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            per_row_insert(args.baseline_rows)
+            elapsed = time.perf_counter() - start
+            print(f"per-row ORM   {args.baseline_rows:>9} rows: {args.baseline_rows / elapsed:>10.0f} rows/s")
+            db.session.remove()
+
+        print(f"{'rows':>9} {'insert rows/s':>14} {'re-upsert rows/s':>17}  counts")
+        for size in (int(value) for value in args.sizes.split(',')):
+            app = make_app(os.path.join(workdir, f"bulk_{size}.db"))
+            with app.app_context():
+                db.create_all()
+                start = time.perf_counter()
+                inserted = bulk_upsert_domains(db.session, domain_rows(size), chunk_size=args.chunk_size)
+                insert_rate = size / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                repeated = bulk_upsert_domains(db.session, domain_rows(size), chunk_size=args.chunk_size)
+                repeat_rate = size / (time.perf_counter() - start)
+                print(f"{size:>9} {insert_rate:>14.0f} {repeat_rate:>17.0f}  "
+                      f"inserted={inserted['inserted']} queued={inserted['queued']} skipped={repeated['skipped']}")
+                db.session.remove()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        shutil.rmtree(LAYOUT, ignore_errors=True)
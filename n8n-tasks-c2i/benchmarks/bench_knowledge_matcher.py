@@ -0,0 +1,81 @@
+"""
+Benchmark: inverted-index KnowledgeMatcher vs the legacy keyword scan
+Usage: python benchmarks/bench_knowledge_matcher.py [--sizes 10 1000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_matcher import KnowledgeMatcher, tokenize
+
+WORDS = [
+    'blockchain', 'domain', 'sitemap', 'contract', 'agreement', 'ethereum',
+    'service', 'ranking', 'authority', 'index', 'payment', 'wallet', 'seo',
+    'backlink', 'voice', 'assistant', 'deed', 'trust', 'invoice', 'upload'
+]
+
+MESSAGES = [
+    'what is secoinfi',
+    'which services do you offer for blockchain',
+    'how does domain ranking analysis work',
+    'how can i contact you by phone',
+    'tell me about sitemap backlink packages',
+    'hello there'
+]
+
+
+def make_entries(count, rng):
+    """Generate synthetic (topic, content) knowledge entries"""
+    entries = []
+    for i in range(count):
+        topic = f"{rng.choice(WORDS)} topic{i}"
+        content = ' '.join(rng.choice(WORDS) for _ in range(40))
+        entries.append((topic, content))
+    return entries
+
+
+def legacy_find(entries, keywords, message):
+    """The old if/elif chain generalised to N entries: scan every keyword of every entry"""
+    message_lower = message.lower()
+    for (topic, content), words in zip(entries, keywords):
+        if any(word in message_lower for word in words):
+            return content
+    return None
+
+
+def time_per_call(func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(MESSAGES[i % len(MESSAGES)])
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=600)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'entries':>10} {'build ms':>10} {'legacy us':>12} {'matcher us':>12} {'speedup':>9}")
+
+    for size in args.sizes:
+        entries = make_entries(size, rng)
+        keywords = [tokenize(topic) for topic, _ in entries]
+
+        matcher = KnowledgeMatcher()
+        start = time.perf_counter()
+        matcher.build(entries)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        legacy = time_per_call(lambda m: legacy_find(entries, keywords, m), max(args.repeat // max(size // 1000, 1), 6))
+        indexed = time_per_call(matcher.match, args.repeat)
+        print(f"{size:>10} {build_ms:>10.1f} {legacy * 1e6:>12.1f} {indexed * 1e6:>12.1f} {legacy / indexed:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: SitemapFetcher probes/sec against local stand-in sites serving
+robots.txt, a sitemap index and gzipped child sitemaps
+Usage: python benchmarks/bench_sitemap_fetcher.py [--hosts 20] [--probes 1000] [--crawl-delay 0]
+"""
+import argparse
+import gzip
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sitemap_fetcher import SitemapFetcher
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+CHILD_PAGES = (500, 250)
+
+
+def urlset(pages):
+    urls = ''.join(f"<url><loc>https://example.com/page-{index}</loc></url>" for index in range(pages))
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{urls}</urlset>'.encode()
+
+
+FIXTURES = {
+    '/robots.txt': b'User-agent: *\nSitemap: /sitemap_index.xml\n',
+    '/sitemap_index.xml': (f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">'
+                           + ''.join(f"<sitemap><loc>/sitemap-{index}.xml.gz</loc></sitemap>"
+                                     for index in range(len(CHILD_PAGES)))
+                           + '</sitemapindex>').encode(),
+}
+FIXTURES.update({f"/sitemap-{index}.xml.gz": gzip.compress(urlset(pages)) for index, pages in enumerate(CHILD_PAGES)})
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = FIXTURES.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        body = body or b''
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hosts', type=int, default=20)
+    parser.add_argument('--probes', type=int, default=1000)
+    parser.add_argument('--max-in-flight', type=int, default=100)
+    parser.add_argument('--per-host-limit', type=int, default=2)
+    parser.add_argument('--crawl-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    # One server per port; the fetcher treats each host:port as its own site
+    servers = [ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler) for _ in range(args.hosts)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    sites = [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+
+    fetcher = SitemapFetcher(max_in_flight=args.max_in_flight, per_host_limit=args.per_host_limit,
+                             crawl_delay=args.crawl_delay)
+    start = time.perf_counter()
+    results = fetcher.probe_blocking([sites[index % len(sites)] for index in range(args.probes)])
+    elapsed = time.perf_counter() - start
+
+    failures = [result for result in results if isinstance(result, Exception) or not result['found']]
+    wrong_counts = [result for result in results
+                    if not isinstance(result, Exception) and result['pages_count'] != sum(CHILD_PAGES)]
+    print(f"{args.probes} probes over {args.hosts} hosts: {elapsed:.2f}s, {args.probes / elapsed:.0f} probes/s")
+    print(f"failures={len(failures)} wrong_page_counts={len(wrong_counts)}")
+    print(fetcher.stats())
+    fetcher.close()
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
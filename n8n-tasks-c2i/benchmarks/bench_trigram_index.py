@@ -0,0 +1,50 @@
+"""
+Benchmark: TrigramIndex lookup latency for misspelled words
+Usage: python benchmarks/bench_trigram_index.py [--topics 50000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trigram_index import TrigramIndex
+
+
+def random_word(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+
+
+def misspell(word, rng):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    topics = [(' '.join(random_word(rng) for _ in range(3)), topic_id) for topic_id in range(args.topics)]
+
+    index = TrigramIndex()
+    start = time.perf_counter()
+    index.build(topics)
+    print(f"build {args.topics} topics: {time.perf_counter() - start:.2f}s {index.stats()}")
+
+    queries = [misspell(rng.choice(topics)[0].split()[0], rng) for _ in range(args.repeat)]
+    found = 0
+    start = time.perf_counter()
+    for query in queries:
+        found += bool(index.search(query, limit=5))
+    elapsed = time.perf_counter() - start
+    print(f"search: {elapsed / args.repeat * 1e6:.0f}us per word, {found}/{args.repeat} with candidates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+BM25 Retrieval Engine for Infy AI
+Ranks knowledge passages with Okapi BM25 over compact, incrementally updated arrays
+"""
+import hashlib
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Imported both as src.services.bm25_index (knowledge_snapshot) and flat (main.py)
+try:
+    from .knowledge_matcher import tokenize
+except ImportError:
+    from knowledge_matcher import tokenize
+
+
+Document = Tuple[Any, str, Optional[str], Optional[str]]  # doc_id, text, content_hash, passage
+Postings = Dict[int, Tuple[List[int], List[int]]]
+
+
+class BM25Index:
+    """Okapi BM25 index with append-only postings stored in typed arrays
+
+    Re-added doc ids supersede their older rows and removed doc ids are hidden;
+    statistics count live rows only, so scores match an index rebuilt from the
+    surviving documents.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Per-document columns
+        self.doc_ids: List[Any] = []
+        self.passages: List[str] = []
+        self.content_hashes: List[str] = []
+        self.doc_lengths = array('I')
+        self.total_length = 0  # of live rows
+        self.positions: Dict[Any, int] = {}  # live row per doc id
+        self.removed: Set[int] = set()  # superseded or removed rows
+
+        # Per-term postings: term id -> doc positions and term frequencies
+        self.term_ids: Dict[str, int] = {}
+        self.postings_docs: List[array] = []
+        self.postings_tfs: List[array] = []
+
+        # Length norms and the removed-row mask are cached and refreshed only
+        # when rows were added or removed
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._dead: Optional[np.ndarray] = None
+        self._cached_for = (0, 0)
+        self.frozen = False
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add_document(self, doc_id: Any, text: str, content_hash: Optional[str] = None,
+                     passage: Optional[str] = None) -> int:
+        """Add one document and return its position in the index"""
+        return self.add_documents([(doc_id, text, content_hash, passage)])[0]
+
+    def add_documents(self, documents: Iterable[Document]) -> List[int]:
+        """Append (doc_id, text, content_hash, passage) rows, updating statistics in place"""
+        with self._lock:
+            if self.frozen:
+                raise RuntimeError('BM25 index is frozen')
+            positions, postings = self._append(documents)
+            while len(self.postings_docs) < len(self.term_ids):
+                self.postings_docs.append(array('I'))
+                self.postings_tfs.append(array('H'))
+            for term_id, (docs, tfs) in postings.items():
+                self.postings_docs[term_id].extend(docs)
+                self.postings_tfs[term_id].extend(tfs)
+        return positions
+
+    def _append(self, documents: Iterable[Document]) -> Tuple[List[int], Postings]:
+        """Append document columns and return their positions and postings per term id"""
+        positions = []
+        postings: Postings = {}
+        for doc_id, text, content_hash, passage in documents:
+            passage = text if passage is None else passage
+            if content_hash is None:
+                content_hash = hashlib.sha256(passage.encode('utf-8')).hexdigest()
+
+            position = len(self.doc_ids)
+            tokens = tokenize(text)
+            frequencies: Dict[str, int] = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+
+            for token, tf in frequencies.items():
+                term_id = self.term_ids.setdefault(token, len(self.term_ids))
+                docs, tfs = postings.setdefault(term_id, ([], []))
+                docs.append(position)
+                tfs.append(min(tf, 0xFFFF))
+
+            self._remove(doc_id)
+            self.positions[doc_id] = position
+            self.doc_ids.append(doc_id)
+            self.passages.append(passage)
+            self.content_hashes.append(content_hash)
+            self.doc_lengths.append(len(tokens))
+            self.total_length += len(tokens)
+            positions.append(position)
+        return positions, postings
+
+    def _remove(self, doc_id: Any) -> bool:
+        position = self.positions.pop(doc_id, None)
+        if position is None:
+            return False
+        self.removed.add(position)
+        self.total_length -= self.doc_lengths[position]
+        return True
+
+    def discard(self, doc_ids: Iterable[Any]) -> int:
+        """Hide rows for deleted documents from search results"""
+        with self._lock:
+            if self.frozen:
+                raise RuntimeError('BM25 index is frozen')
+            return sum(self._remove(doc_id) for doc_id in doc_ids)
+
+    def extended(self, documents: Iterable[Document], removed: Iterable[Any] = ()) -> 'BM25Index':
+        """Frozen index of this frozen index's rows plus documents, with removed doc ids hidden
+
+        Only the new documents are tokenized. Postings of terms they do not use
+        are shared, and this index stays unchanged for readers still holding it.
+        """
+        if not self.frozen:
+            raise RuntimeError('Only a frozen BM25 index can be extended')
+        index = BM25Index(self.k1, self.b)
+        index.doc_ids = list(self.doc_ids)
+        index.passages = list(self.passages)
+        index.content_hashes = list(self.content_hashes)
+        index.doc_lengths = array('I', self.doc_lengths)
+        index.total_length = self.total_length
+        index.positions = dict(self.positions)
+        index.removed = set(self.removed)
+        index.term_ids = dict(self.term_ids)
+        index.postings_docs = list(self.postings_docs)
+        index.postings_tfs = list(self.postings_tfs)
+
+        for doc_id in removed:
+            index._remove(doc_id)
+        _, postings = index._append(documents)
+        new_terms = len(index.term_ids) - len(index.postings_docs)
+        index.postings_docs += [np.zeros(0, dtype=np.int64)] * new_terms
+        index.postings_tfs += [np.zeros(0, dtype=np.float32)] * new_terms
+        for term_id, (docs, tfs) in postings.items():
+            index.postings_docs[term_id] = np.concatenate((index.postings_docs[term_id],
+                                                           np.asarray(docs, dtype=np.int64)))
+            index.postings_tfs[term_id] = np.concatenate((index.postings_tfs[term_id],
+                                                          np.asarray(tfs, dtype=np.float32)))
+        index._refresh_cache()
+        index.frozen = True
+        return index
+
+    def freeze(self):
+        """Convert postings to NumPy arrays and make the index read-only and lock-free"""
+        with self._lock:
+            self._refresh_cache()
+            self.postings_docs = [np.asarray(docs, dtype=np.int64) for docs in self.postings_docs]
+            self.postings_tfs = [np.asarray(tfs, dtype=np.float32) for tfs in self.postings_tfs]
+            self.frozen = True
+
+    def clear(self):
+        """Drop every document from the index"""
+        with self._lock:
+            self._reset()
+
+    def _refresh_cache(self):
+        """Recompute length norms, k1 * (1 - b + b * dl / avgdl), and the removed-row mask after changes"""
+        doc_count = len(self.doc_lengths)
+        if self._cached_for == (doc_count, len(self.removed)):
+            return
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.uint32).astype(np.float32)
+        live_count = len(self.positions)
+        avgdl = max(self.total_length / live_count, 1.0) if live_count else 1.0
+        self._norms = self.k1 * (1.0 - self.b + self.b * lengths / avgdl)
+        if self.removed:
+            dead = np.zeros(doc_count, dtype=bool)
+            dead[np.fromiter(self.removed, dtype=np.int64, count=len(self.removed))] = True
+            self._dead = dead
+        else:
+            self._dead = None
+        self._cached_for = (doc_count, len(self.removed))
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Return the top_k passages with their BM25 scores and content hashes"""
+        query_terms = set(tokenize(query))
+        if self.frozen:
+            return self._search(query_terms, top_k)
+        with self._lock:
+            return self._search(query_terms, top_k)
+
+    def _search(self, query_terms, top_k: int) -> List[Dict[str, Any]]:
+        doc_count = len(self.doc_ids)
+        live_count = len(self.positions)
+        if not live_count or not query_terms:
+            return []
+
+        self._refresh_cache()
+        norms, dead = self._norms, self._dead
+        doc_parts = []
+        score_parts = []
+
+        for token in query_terms:
+            term_id = self.term_ids.get(token)
+            if term_id is None:
+                continue
+            # Copies growable postings; frozen postings are already arrays
+            docs = np.asarray(self.postings_docs[term_id], dtype=np.int64)
+            tfs = np.asarray(self.postings_tfs[term_id], dtype=np.float32)
+            if dead is not None:
+                alive = ~dead[docs]
+                docs, tfs = docs[alive], tfs[alive]
+            df = len(docs)
+            if not df:
+                continue
+            idf = np.log(1.0 + (live_count - df + 0.5) / (df + 0.5))
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norms[docs]))
+
+        if not doc_parts:
+            return []
+
+        scores = np.bincount(
+            np.concatenate(doc_parts),
+            weights=np.concatenate(score_parts),
+            minlength=doc_count
+        )
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = sorted(candidates.tolist(), key=lambda position: (-scores[position], position))
+
+        return [{
+            'doc_id': self.doc_ids[position],
+            'score': round(float(scores[position]), 4),
+            'content_hash': self.content_hashes[position],
+            'passage': self.passages[position]
+        } for position in candidates]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get corpus statistics"""
+        doc_count = len(self.positions)
+        return {
+            'documents': doc_count,
+            'rows': len(self.doc_ids),
+            'superseded_rows': len(self.removed),
+            'terms': len(self.term_ids),
+            'postings': sum(len(postings) for postings in self.postings_docs),
+            'average_length': round(self.total_length / doc_count, 2) if doc_count else 0.0
+        }
+
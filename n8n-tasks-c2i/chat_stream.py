@@ -0,0 +1,80 @@
+"""
+Chat Streaming Helpers for Infy AI
+Server-Sent Events formatting, answer chunking and stream latency tracking
+"""
+import json
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?;:])\s+|\n+')
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one text/event-stream message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def chunk_text(text: str, max_chars: int = 240) -> Iterator[str]:
+    """Lazily split text into sentence-aligned chunks of at most max_chars"""
+    buffer = ''
+    for sentence in SENTENCE_PATTERN.split(text):
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            # Break overlong sentences on the last space before the limit
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if buffer:
+                yield buffer
+                buffer = ''
+            yield sentence[:cut]
+            sentence = sentence[cut:].lstrip()
+        if buffer and len(buffer) + 1 + len(sentence) > max_chars:
+            yield buffer
+            buffer = ''
+        buffer = f"{buffer} {sentence}" if buffer else sentence
+    if buffer:
+        yield buffer
+
+
+class StreamTimings:
+    """Rolling time-to-first-event, time-to-first-chunk and total latency for streamed answers"""
+
+    def __init__(self, window: int = 1000):
+        self._first_event_ms = deque(maxlen=window)
+        self._first_chunk_ms = deque(maxlen=window)
+        self._total_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.streams = 0
+
+    def record(self, first_chunk_ms: float, total_ms: float, first_event_ms: Optional[float] = None):
+        with self._lock:
+            self._first_event_ms.append(first_chunk_ms if first_event_ms is None else first_event_ms)
+            self._first_chunk_ms.append(first_chunk_ms)
+            self._total_ms.append(total_ms)
+            self.streams += 1
+
+    @staticmethod
+    def _summary(samples) -> Dict[str, float]:
+        if not samples:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0}
+        ordered = sorted(samples)
+        return {
+            'mean': round(sum(ordered) / len(ordered), 3),
+            'p50': round(ordered[len(ordered) // 2], 3),
+            'p95': round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Get latency summaries in milliseconds"""
+        with self._lock:
+            first_event = list(self._first_event_ms)
+            first_chunk, total = list(self._first_chunk_ms), list(self._total_ms)
+        return {
+            'streams': self.streams,
+            'first_event_ms': self._summary(first_event),
+            'first_chunk_ms': self._summary(first_chunk),
+            'total_ms': self._summary(total)
+        }
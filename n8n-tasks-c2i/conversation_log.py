@@ -0,0 +1,192 @@
+"""
+Conversation Log Writer for Infy AI
+Bounded in-memory ring buffer with a write-behind flusher that batch-inserts
+conversation rows so the chat request path never waits on a database commit
+"""
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+Sink = Callable[[List[Dict[str, Any]]], None]
+
+
+class WriteBehindLog:
+    """Ring buffer of pending rows drained to a sink every N rows or T milliseconds"""
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 200,
+                 flush_interval_ms: int = 500, sink: Optional[Sink] = None):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.sink = sink
+
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.dropped_without_sink = 0
+        self.failed_batches = 0
+
+        if sink is not None:
+            self.start(sink)
+
+    def _evict_oldest(self):
+        """Drop the oldest pending row to make room; caller holds the condition"""
+        self._pending.popleft()
+        self.dropped += 1
+        if self.sink is None:
+            # Nothing will ever drain the buffer, so every further row is lost
+            if not self.dropped_without_sink:
+                print(f"Conversation log full ({self.capacity} rows) with no sink attached; dropping oldest rows")
+            self.dropped_without_sink += 1
+
+    def append(self, row: Dict[str, Any]):
+        """Queue a row without blocking; the oldest pending row is dropped when full"""
+        with self._condition:
+            if len(self._pending) >= self.capacity:
+                self._evict_oldest()
+            self._pending.append(row)
+            self.queued += 1
+            if self.sink is not None and len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def extend(self, rows: List[Dict[str, Any]]):
+        """Queue several rows under a single lock acquisition"""
+        with self._condition:
+            for row in rows:
+                if len(self._pending) >= self.capacity:
+                    self._evict_oldest()
+                self._pending.append(row)
+            self.queued += len(rows)
+            if self.sink is not None and len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent rows still held in memory"""
+        with self._condition:
+            return list(self._pending)[-limit:]
+
+    def start(self, sink: Sink):
+        """Attach a sink and start the background flusher"""
+        self.sink = sink
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='conversation-log-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            count = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def flush(self) -> int:
+        """Write every pending row to the sink in batches and return how many were written"""
+        if self.sink is None:
+            return 0
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                try:
+                    self.sink(batch)
+                    self.flushed += len(batch)
+                    written += len(batch)
+                except Exception as e:
+                    self.failed_batches += 1
+                    self.dropped += len(batch)
+                    print(f"Error flushing {len(batch)} conversation rows: {e}")
+        return written
+
+    def _run(self):
+        while True:
+            deadline = time.monotonic() + self.flush_interval
+            with self._condition:
+                while not self._stopping and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def close(self):
+        """Stop the flusher after writing the remaining rows"""
+        thread = self._thread
+        if thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        thread.join(timeout=5)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue counters"""
+        return {
+            'queued': self.queued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'dropped_without_sink': self.dropped_without_sink,
+            'pending': len(self._pending),
+            'failed_batches': self.failed_batches,
+            'capacity': self.capacity,
+            'sink_attached': self.sink is not None
+        }
+
+
+def sqlalchemy_sink(app, db, model) -> Sink:
+    """Build a sink that bulk-inserts rows into a Flask-SQLAlchemy model's table"""
+    def insert_rows(rows: List[Dict[str, Any]]):
+        with app.app_context():
+            db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+    return insert_rows
+
+
+def _json_default(value: Any) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def jsonl_sink(path: str) -> Sink:
+    """Build a sink that appends rows to a JSON-lines file"""
+    def write_rows(rows: List[Dict[str, Any]]):
+        with open(path, 'a', encoding='utf-8') as handle:
+            handle.writelines(json.dumps(row, default=_json_default) + '\n' for row in rows)
+    return write_rows
+
+
+# Shared chat conversation log; rows use ConversationLog column names. The app
+# that imports it attaches the sink: database_init writes to ConversationLog,
+# main.py falls back to a JSON-lines file when no database is configured
+conversation_log = WriteBehindLog()
+
+
+def start_everywhere(sink: Sink) -> int:
+    """Attach sink to the shared log of every loaded copy of this module
+
+    The module is imported both as src.services.conversation_log and flat
+    (main.py), and each copy holds its own log; a database configured through
+    either must receive the rows of both. Returns how many logs were started.
+    """
+    logs = []
+    for name in ('conversation_log', 'src.services.conversation_log', __name__):
+        log = getattr(sys.modules.get(name), 'conversation_log', None)
+        if log is not None and all(log is not seen for seen in logs):
+            logs.append(log)
+    for log in logs:
+        log.start(sink)
+    return len(logs)
@@ -7,6 +7,13 @@ from src.models.user import db, User, AdminAuth
 from src.models.knowledge import KnowledgeBase, ConversationLog, TopicQuery
 from src.models.navigation import NavigationItem
 from src.models.domain import Domain, DomainBatch, Protocol, DomainAnalysisQueue
+from src.services.analysis_queue import analysis_scheduler, protocol_fanout_analyzer
+from src.services.conversation_log import sqlalchemy_sink, start_everywhere
+from src.services.dedup_index import domain_dedup
+from src.services.domain_aggregates import AGGREGATE_COLUMNS, domain_aggregates
+from src.services.domain_listing import iter_pages
+from src.services.domain_schema import upgrade_domain_schema
+from src.services.knowledge_snapshot import publish_from_database
 import hashlib
 from datetime import datetime
 
@@ -16,6 +23,32 @@ def init_database(app):
         # Create all tables
         db.create_all()
         
+        # create_all skips existing tables; bring domain tables from earlier versions up to date
+        upgrade_domain_schema(db)
+        
+        # Flush buffered chat conversations into ConversationLog in batches,
+        # including those main.py queues through its own copy of the log
+        start_everywhere(sqlalchemy_sink(app, db, ConversationLog))
+        
+        # Count stored domains once; from here the analysis scheduler and bulk
+        # upserts keep the aggregates current as they write
+        domain_aggregates.rebuild(
+            row._mapping for rows in iter_pages(db.session, [], columns=AGGREGATE_COLUMNS) for row in rows
+        )
+        
+        # Bulk uploads skip URLs the dedup index has seen; a persistent index
+        # that has drifted from the domains table (or an in-memory one) is refilled
+        if len(domain_dedup) != Domain.query.count():
+            domain_dedup.rebuild(
+                row.full_url for rows in iter_pages(db.session, [], columns=('full_url',)) for row in rows
+            )
+        
+        # Drain DomainAnalysisQueue with a pool of background workers; fan-out
+        # mode probes every active protocol variant instead of the queued URL
+        if app.config.get('ANALYSIS_PROTOCOL_FANOUT'):
+            analysis_scheduler.batch_analyzer = protocol_fanout_analyzer
+        analysis_scheduler.start(app, db, workers=app.config.get('ANALYSIS_WORKERS', 4))
+        
         # Initialize admin authentication
         if not AdminAuth.query.first():
             admin_auth = AdminAuth(
@@ -50,19 +83,23 @@ def init_database(app):
         knowledge_entries = [
             {
                 "topic": "SECOINFI",
-                "content": "SECOINFI is a blockchain business development company led by CEO Dileep Kumar D. We provide comprehensive blockchain services, domain analysis, and AI-powered solutions for businesses looking to integrate blockchain technology."
+                "content": "SECOINFI is a blockchain business development company led by CEO Dileep Kumar D. We provide comprehensive blockchain services, domain analysis, and AI-powered solutions for businesses looking to integrate blockchain technology.",
+                "keywords": ["secoinfi", "company", "what is"]
             },
             {
                 "topic": "Services",
-                "content": "SECOINFI offers blockchain development, smart contract creation, domain analysis and ranking, SEO optimization, and AI voice assistant services. We help businesses leverage blockchain technology for growth and innovation."
+                "content": "SECOINFI offers blockchain development, smart contract creation, domain analysis and ranking, SEO optimization, and AI voice assistant services. We help businesses leverage blockchain technology for growth and innovation.",
+                "keywords": ["service", "offer", "provide"]
             },
             {
                 "topic": "Domain Analysis",
-                "content": "Our domain analysis service provides comprehensive insights including domain authority, page authority, sitemap analysis, search engine indexing status, and link submission tracking. We support multiple protocols and can process thousands of domains in bulk."
+                "content": "Our domain analysis service provides comprehensive insights including domain authority, page authority, sitemap analysis, search engine indexing status, and link submission tracking. We support multiple protocols and can process thousands of domains in bulk.",
+                "keywords": ["domain", "analysis", "ranking"]
             },
             {
                 "topic": "Contact",
-                "content": "CEO: Dileep Kumar D, Phone/WhatsApp: +91 9620058644, Website: seco.in.net, Metamask: 0x4a100E184ac1f17491Fbbcf549CeBfB676694eF7"
+                "content": "CEO: Dileep Kumar D, Phone/WhatsApp: +91 9620058644, Website: seco.in.net, Metamask: 0x4a100E184ac1f17491Fbbcf549CeBfB676694eF7",
+                "keywords": ["contact", "phone", "email", "reach"]
             }
         ]
         
@@ -131,6 +168,9 @@ def init_database(app):
         # Commit all changes
         try:
             db.session.commit()
+            # Chat reads a snapshot of the knowledge rows; admin edits publish new ones
+            publish_from_database(db.session, KnowledgeBase, TopicQuery,
+                                  keywords={entry["topic"]: entry["keywords"] for entry in knowledge_entries})
             print("Database initialized successfully!")
             return True
         except Exception as e:
@@ -0,0 +1,209 @@
+"""
+Domain Dedup Index for Infy AI
+Memory-mapped Bloom filter in front of an exact on-disk key store, so most
+new URLs are confirmed unseen without touching disk and restarts reuse the files
+"""
+import atexit
+import hashlib
+import math
+import os
+import sqlite3
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+HEADER = struct.Struct('<8sQIQ')  # magic, bit count, hash count, key count
+MAGIC = b'INFYBLM1'
+EXACT_LOOKUP_BATCH = 500
+
+
+class BloomFilter:
+    """Bit array with k double-hashed probes; backed by a file through np.memmap when given a path"""
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 10_000_000, error_rate: float = 0.001):
+        self.path = path
+        if path and os.path.exists(path):
+            with open(path, 'rb') as handle:
+                magic, self.bits, self.hashes, self.count = HEADER.unpack(handle.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+        else:
+            self.bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+            self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+            self.count = 0
+            if path:
+                with open(path, 'wb') as handle:
+                    handle.write(HEADER.pack(MAGIC, self.bits, self.hashes, 0))
+                    handle.truncate(HEADER.size + (self.bits + 7) // 8)
+
+        size = (self.bits + 7) // 8
+        if path:
+            self._array = np.memmap(path, dtype=np.uint8, mode='r+', offset=HEADER.size, shape=(size,))
+        else:
+            self._array = np.zeros(size, dtype=np.uint8)
+        self._probes = np.arange(self.hashes, dtype=np.uint64)
+
+    def _positions(self, keys: List[str]) -> np.ndarray:
+        digests = b''.join(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest() for key in keys)
+        halves = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+        with np.errstate(over='ignore'):
+            positions = halves[:, :1] + self._probes * (halves[:, 1:] | np.uint64(1))
+        return positions % np.uint64(self.bits)
+
+    def contains_many(self, keys: List[str]) -> np.ndarray:
+        """Boolean per key: False means definitely absent"""
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(keys)
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        return ((self._array[positions >> np.uint64(3)] & masks) != 0).all(axis=1)
+
+    def add_many(self, keys: List[str]):
+        if not keys:
+            return
+        positions = self._positions(keys).ravel()
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        np.bitwise_or.at(self._array, (positions >> np.uint64(3)).astype(np.intp), masks)
+
+    def fill_ratio(self) -> float:
+        """Expected fraction of set bits after count distinct insertions"""
+        return 1.0 - math.exp(-self.hashes * self.count / self.bits)
+
+    def flush(self):
+        if self.path:
+            self._array.flush()
+            with open(self.path, 'r+b') as handle:
+                handle.write(HEADER.pack(MAGIC, self.bits, self.hashes, self.count))
+
+
+class DedupIndex:
+    """Bloom filter pre-check plus an exact SQLite key table; files live in one directory"""
+
+    def __init__(self, directory: Optional[str] = None, capacity: int = 10_000_000, error_rate: float = 0.001):
+        self.directory = directory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom: Optional[BloomFilter] = None
+        self._exact: Optional[sqlite3.Connection] = None
+
+        self.checked = 0
+        self.bloom_negatives = 0
+        self.exact_lookups = 0
+        self.false_positives = 0
+        self.duplicates = 0
+
+    def _open(self):
+        # Files are opened on first use so importing the module has no side effects
+        if self._bloom is not None:
+            return
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            bloom_path = os.path.join(self.directory, 'bloom.bin')
+            exact_path = os.path.join(self.directory, 'keys.sqlite')
+        else:
+            bloom_path, exact_path = None, ':memory:'
+        self._bloom = BloomFilter(bloom_path, self.capacity, self.error_rate)
+        self._exact = sqlite3.connect(exact_path, check_same_thread=False)
+        self._exact.execute('PRAGMA journal_mode=WAL')
+        self._exact.execute('CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        if bloom_path:
+            atexit.register(self.flush)
+
+    def _exact_existing(self, keys: List[str]) -> set:
+        existing = set()
+        for start in range(0, len(keys), EXACT_LOOKUP_BATCH):
+            batch = keys[start:start + EXACT_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            existing.update(row[0] for row in self._exact.execute(
+                f"SELECT key FROM seen WHERE key IN ({placeholders})", batch))
+        return existing
+
+    def filter_new(self, keys: Iterable[str]) -> List[str]:
+        """Return keys never added before, first occurrence only, in input order"""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            self._open()
+            maybe_present = self._bloom.contains_many(keys)
+            candidates = [key for key, present in zip(keys, maybe_present) if present]
+            existing = self._exact_existing(candidates) if candidates else set()
+
+            self.checked += len(keys)
+            self.bloom_negatives += len(keys) - len(candidates)
+            self.exact_lookups += len(candidates)
+            self.false_positives += len(candidates) - len(existing)
+            self.duplicates += len(existing)
+        return [key for key in keys if key not in existing]
+
+    def add(self, keys: Iterable[str]):
+        """Record keys as seen in both the filter and the exact store"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        with self._lock:
+            self._open()
+            before = self._exact.total_changes
+            self._exact.executemany('INSERT OR IGNORE INTO seen (key) VALUES (?)', ((key,) for key in keys))
+            self._exact.commit()
+            self._bloom.add_many(keys)
+            self._bloom.count += self._exact.total_changes - before
+
+    def rebuild(self, keys: Iterable[str]):
+        """Replace every recorded key with keys, e.g. from the store the index guards"""
+        with self._lock:
+            self._open()
+            self._exact.execute('DELETE FROM seen')
+            self._exact.commit()
+            self._bloom._array[:] = 0
+            self._bloom.count = 0
+        self.add(keys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._open()
+            return self._exact.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def add_new(self, keys: Iterable[str]) -> List[str]:
+        """filter_new followed by add; returns the keys that were new"""
+        new_keys = self.filter_new(keys)
+        self.add(new_keys)
+        return new_keys
+
+    def flush(self):
+        """Persist the filter's bits and key count"""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get filter sizing and check counters"""
+        with self._lock:
+            self._open()
+            fill = self._bloom.fill_ratio()
+            return {
+                'keys': self._bloom.count,
+                'capacity': self.capacity,
+                'bloom_bytes': (self._bloom.bits + 7) // 8,
+                'hashes': self._bloom.hashes,
+                'fill_ratio': round(fill, 6),
+                'estimated_false_positive_rate': fill ** self._bloom.hashes,
+                'checked': self.checked,
+                'bloom_negatives': self.bloom_negatives,
+                'exact_lookups': self.exact_lookups,
+                'false_positives': self.false_positives,
+                'duplicates': self.duplicates,
+                'persistent': self.directory is not None
+            }
+
+
+# Shared dedup index of queued domain URLs (canonical protocol + domain).
+# In memory unless DOMAIN_DEDUP_DIR is set, so it never outlives the store it
+# guards; whoever owns that store rebuilds the index from it on start.
+# Sizing is fixed when the files are first created
+domain_dedup = DedupIndex(
+    os.environ.get('DOMAIN_DEDUP_DIR') or None,
+    capacity=int(os.environ.get('DOMAIN_DEDUP_CAPACITY', 10_000_000)),
+    error_rate=float(os.environ.get('DOMAIN_DEDUP_ERROR_RATE', 0.001))
+)
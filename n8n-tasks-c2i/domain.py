@@ -1,14 +1,24 @@
 from src.models.user import db
+from src.services.domain_canonical import canonicalize
 from datetime import datetime
 import json
 
 class Domain(db.Model):
     __tablename__ = 'domains'
-    
+    # Listing filters followed by the (updated_at, id) keyset, so a filtered page is one index range scan
+    __table_args__ = (
+        db.Index('ix_domains_keyset', 'updated_at', 'id'),
+        db.Index('ix_domains_status_keyset', 'analysis_status', 'updated_at', 'id'),
+        db.Index('ix_domains_protocol_keyset', 'protocol', 'updated_at', 'id'),
+        db.Index('ix_domains_indexed_keyset', 'google_indexed', 'bing_indexed', 'updated_at', 'id'),
+        db.Index('ix_domains_authority', 'domain_authority', 'page_authority', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     domain_name = db.Column(db.String(255), nullable=False, index=True)
     protocol = db.Column(db.String(20), nullable=False, default='https://')
-    full_url = db.Column(db.String(500), nullable=False, index=True)
+    full_url = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    canonical_id = db.Column(db.BigInteger, index=True)  # shared by every protocol variant
     
     # SEO and ranking data
     domain_authority = db.Column(db.Integer, default=0)
@@ -44,9 +54,11 @@ class Domain(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     def __init__(self, domain_name, protocol='https://'):
-        self.domain_name = domain_name
-        self.protocol = protocol
-        self.full_url = f"{protocol}{domain_name}"
+        canonical = canonicalize(domain_name, protocol)
+        self.domain_name = canonical.key
+        self.protocol = canonical.protocol
+        self.full_url = canonical.url
+        self.canonical_id = canonical.id
     
     def to_dict(self):
         return {
@@ -54,6 +66,7 @@ class Domain(db.Model):
             'domain_name': self.domain_name,
             'protocol': self.protocol,
             'full_url': self.full_url,
+            'canonical_id': self.canonical_id,
             'ranking': {
                 'domain_authority': self.domain_authority,
                 'page_authority': self.page_authority,
@@ -158,6 +171,13 @@ class Protocol(db.Model):
 
 class DomainAnalysisQueue(db.Model):
     __tablename__ = 'domain_analysis_queue'
+    __table_args__ = (
+        db.Index('ix_domain_analysis_queue_claim', 'status', 'priority', 'id'),
+        # At most one open entry per domain; bulk enqueues upsert against it
+        db.Index('uq_domain_analysis_queue_open_domain', 'domain_id', unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'processing')"),
+                 postgresql_where=db.text("status IN ('queued', 'processing')")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     domain_id = db.Column(db.Integer, db.ForeignKey('domains.id'), nullable=False)
@@ -170,8 +190,13 @@ class DomainAnalysisQueue(db.Model):
     attempts = db.Column(db.Integer, default=0)
     max_attempts = db.Column(db.Integer, default=3)
     last_attempt = db.Column(db.DateTime)
+    next_attempt_at = db.Column(db.DateTime)  # retry backoff; claimable once passed
     error_message = db.Column(db.Text)
     
+    # Worker lease: a processing row whose lease expired is claimed again
+    lease_owner = db.Column(db.String(64), index=True)
+    lease_expires_at = db.Column(db.DateTime)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -190,6 +215,8 @@ class DomainAnalysisQueue(db.Model):
             'attempts': self.attempts,
             'max_attempts': self.max_attempts,
             'last_attempt': self.last_attempt.isoformat() if self.last_attempt else None,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
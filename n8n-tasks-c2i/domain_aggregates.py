@@ -0,0 +1,297 @@
+"""
+Domain Aggregates for Infy AI
+Running domain statistics updated on every stored result: fixed-bucket
+authority histograms, per-status and per-protocol counters, indexing and
+sitemap shares and mergeable quantile sketches, so stats never scan domains
+"""
+import math
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+# Domain columns a flat record needs for aggregation
+AGGREGATE_COLUMNS = (
+    'analysis_status', 'protocol', 'domain_authority', 'page_authority',
+    'google_indexed', 'bing_indexed', 'sitemap_found', 'sitemap_pages_count'
+)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch (DDSketch): estimates are within relative_accuracy of
+    the true value, sketches merge by adding bucket counts, and values can be removed"""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float, weight: int = 1):
+        """Count value weight times; a negative weight removes earlier additions"""
+        self.count += weight
+        if value <= 0:
+            self.zeros += weight  # authorities and page counts are never negative
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        remaining = self.buckets.get(index, 0) + weight
+        if remaining:
+            self.buckets[index] = remaining
+        else:
+            del self.buckets[index]
+
+    def merge(self, other: 'QuantileSketch'):
+        """Fold another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches with different accuracies cannot be merged")
+        self.zeros += other.zeros
+        self.count += other.count
+        for index, count in other.buckets.items():
+            remaining = self.buckets.get(index, 0) + count
+            if remaining:
+                self.buckets[index] = remaining
+            else:
+                self.buckets.pop(index, None)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1), None when empty"""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class Histogram:
+    """Equal-width buckets over [0, max_value]; out-of-range values land in the end buckets"""
+
+    def __init__(self, bucket_width: int = 10, max_value: int = 100):
+        self.bucket_width = bucket_width
+        self.max_value = max_value
+        self.counts = [0] * max(1, math.ceil(max_value / bucket_width))
+
+    def add(self, value: int, weight: int = 1):
+        self.counts[min(max(int(value) // self.bucket_width, 0), len(self.counts) - 1)] += weight
+
+    def merge(self, other: 'Histogram'):
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Histograms with different buckets cannot be merged")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+
+    def buckets(self) -> List[Dict[str, int]]:
+        last = len(self.counts) - 1
+        return [{'min': index * self.bucket_width,
+                 'max': self.max_value if index == last else (index + 1) * self.bucket_width - 1,
+                 'count': count}
+                for index, count in enumerate(self.counts)]
+
+
+class DomainMetrics(NamedTuple):
+    status: Optional[str]
+    protocol: Optional[str]
+    domain_authority: Optional[int]
+    page_authority: Optional[int]
+    google_indexed: bool
+    bing_indexed: bool
+    sitemap_found: bool
+    sitemap_pages: Optional[int]
+
+
+def domain_metrics(record: Optional[Mapping[str, Any]]) -> Optional[DomainMetrics]:
+    """Metrics of a stored domain: main.py analysis results, Domain.to_dict() or flat Domain columns"""
+    if record is None:
+        return None
+    ranking = record.get('ranking') or record
+    indexing = record.get('indexing') or record
+    sitemap = record.get('sitemap')
+    if isinstance(sitemap, Mapping):
+        sitemap_found, sitemap_pages = sitemap.get('found'), sitemap.get('pages_count')
+    else:
+        sitemap_found, sitemap_pages = record.get('sitemap_found'), record.get('sitemap_pages_count')
+    analysis = record.get('analysis')
+    status = (analysis.get('status') if isinstance(analysis, Mapping) else
+              record.get('analysis_status') or record.get('status'))
+    return DomainMetrics(
+        status=status,
+        protocol=record.get('protocol'),
+        domain_authority=ranking.get('domain_authority'),
+        page_authority=ranking.get('page_authority'),
+        google_indexed=bool(indexing.get('google_indexed')),
+        bing_indexed=bool(indexing.get('bing_indexed')),
+        sitemap_found=bool(sitemap_found),
+        sitemap_pages=sitemap_pages
+    )
+
+
+class DomainAggregates:
+    """Statistics over every stored domain, kept current by replace() on each write"""
+
+    def __init__(self, bucket_width: int = 10, max_authority: int = 100, relative_accuracy: float = 0.01):
+        self.bucket_width = bucket_width
+        self.max_authority = max_authority
+        self.relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.domains = 0
+        self.analyzed = 0  # status 'completed'; only these carry authority, indexing and sitemap data
+        self.by_status: Dict[str, int] = {}
+        self.by_protocol: Dict[str, int] = {}
+        self.google_indexed = 0
+        self.bing_indexed = 0
+        self.sitemap_found = 0
+        self.histograms = {name: Histogram(self.bucket_width, self.max_authority)
+                           for name in ('domain_authority', 'page_authority')}
+        self.sketches = {name: QuantileSketch(self.relative_accuracy)
+                         for name in ('domain_authority', 'page_authority', 'sitemap_pages')}
+        self.updates = 0
+
+    @staticmethod
+    def _bump(counter: Dict[str, int], key: Optional[str], weight: int):
+        key = key or 'unknown'
+        remaining = counter.get(key, 0) + weight
+        if remaining:
+            counter[key] = remaining
+        else:
+            counter.pop(key, None)
+
+    def _apply(self, metrics: Optional[DomainMetrics], weight: int):
+        if metrics is None:
+            return
+        self.domains += weight
+        self._bump(self.by_status, metrics.status, weight)
+        self._bump(self.by_protocol, metrics.protocol, weight)
+        if metrics.status != 'completed':
+            return
+        self.analyzed += weight
+        self.google_indexed += weight * metrics.google_indexed
+        self.bing_indexed += weight * metrics.bing_indexed
+        self.sitemap_found += weight * metrics.sitemap_found
+        for name in ('domain_authority', 'page_authority'):
+            value = getattr(metrics, name)
+            if value is not None:
+                self.histograms[name].add(value, weight)
+                self.sketches[name].add(value, weight)
+        if metrics.sitemap_found and metrics.sitemap_pages is not None:
+            self.sketches['sitemap_pages'].add(metrics.sitemap_pages, weight)
+
+    def replace(self, previous: Optional[Mapping[str, Any]], current: Optional[Mapping[str, Any]]):
+        """Swap one domain's contribution; None on either side means it did not or no longer exists"""
+        before, after = domain_metrics(previous), domain_metrics(current)
+        with self._lock:
+            self._apply(before, -1)
+            self._apply(after, 1)
+            self.updates += 1
+
+    def replace_many(self, changes: Iterable[Tuple[Optional[Mapping[str, Any]], Optional[Mapping[str, Any]]]]):
+        """replace() for a chunk of (previous, current) pairs under one lock"""
+        changes = [(domain_metrics(previous), domain_metrics(current)) for previous, current in changes]
+        with self._lock:
+            for before, after in changes:
+                self._apply(before, -1)
+                self._apply(after, 1)
+            self.updates += len(changes)
+
+    def rebuild(self, records: Iterable[Mapping[str, Any]]):
+        """Recount from every stored domain, e.g. once at startup"""
+        rebuilt = DomainAggregates(self.bucket_width, self.max_authority, self.relative_accuracy)
+        for record in records:
+            rebuilt._apply(domain_metrics(record), 1)
+        with self._lock:
+            self._reset()
+            self._merge(rebuilt)
+
+    def merge(self, other: 'DomainAggregates'):
+        """Add another process's or shard's aggregates to these"""
+        with self._lock:
+            self._merge(other)
+
+    def _merge(self, other: 'DomainAggregates'):
+        self.domains += other.domains
+        self.analyzed += other.analyzed
+        for key, count in other.by_status.items():
+            self._bump(self.by_status, key, count)
+        for key, count in other.by_protocol.items():
+            self._bump(self.by_protocol, key, count)
+        self.google_indexed += other.google_indexed
+        self.bing_indexed += other.bing_indexed
+        self.sitemap_found += other.sitemap_found
+        for name, histogram in other.histograms.items():
+            self.histograms[name].merge(histogram)
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+
+    def _share(self, count: int) -> Dict[str, Any]:
+        return {'count': count, 'share': round(count / self.analyzed, 4) if self.analyzed else 0.0}
+
+    def _percentiles(self, name: str) -> Dict[str, Optional[float]]:
+        values = {f"p{round(q * 100)}": self.sketches[name].quantile(q) for q in PERCENTILES}
+        return {key: None if value is None else round(value, 2) for key, value in values.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current statistics; cost depends on bucket counts, never on the number of domains"""
+        with self._lock:
+            return {
+                'domains': self.domains,
+                'analyzed': self.analyzed,
+                'by_status': dict(self.by_status),
+                'by_protocol': dict(self.by_protocol),
+                'google_indexed': self._share(self.google_indexed),
+                'bing_indexed': self._share(self.bing_indexed),
+                'sitemap_found': self._share(self.sitemap_found),
+                'domain_authority': {'histogram': self.histograms['domain_authority'].buckets(),
+                                     'percentiles': self._percentiles('domain_authority')},
+                'page_authority': {'histogram': self.histograms['page_authority'].buckets(),
+                                   'percentiles': self._percentiles('page_authority')},
+                'sitemap_pages': {'percentiles': self._percentiles('sitemap_pages')},
+                'relative_accuracy': self.relative_accuracy,
+                'updates': self.updates
+            }
+
+
+class AggregatedStore(MutableMapping):
+    """Mapping of domain key to stored result that keeps DomainAggregates in step with every write"""
+
+    def __init__(self, aggregates: DomainAggregates, store: Optional[MutableMapping] = None):
+        self.aggregates = aggregates
+        self.store = store if store is not None else {}
+        self._lock = threading.Lock()
+        aggregates.rebuild(self.store.values())
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        return self.store[key]
+
+    def __setitem__(self, key: str, value: Dict[str, Any]):
+        # Locked so racing writers of one key each replace what the other stored
+        with self._lock:
+            previous = self.store.get(key)
+            self.store[key] = value
+            self.aggregates.replace(previous, value)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            previous = self.store.pop(key)
+            self.aggregates.replace(previous, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.store
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+# Shared aggregates; main.py feeds them through AggregatedStore, the database
+# app from the analysis scheduler and bulk upserts
+domain_aggregates = DomainAggregates()
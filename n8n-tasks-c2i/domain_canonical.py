@@ -0,0 +1,158 @@
+"""
+Domain Canonicalization for Infy AI
+One normalizer for every domain code path: IDNA, case, trailing dots and
+slashes, default ports and www variants collapse to a single key and id.
+Only the schemes of the Protocol list are accepted, and hosts that name this
+machine or a private network (localhost, loopback, private and link-local
+addresses) are rejected, since analysis probes every stored domain
+"""
+import hashlib
+import ipaddress
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Schemes of the Protocol list (http://, https://, their www. forms, wsl://, upi://)
+SUPPORTED_SCHEMES = frozenset(['http', 'https', 'wsl', 'upi'])
+LOCAL_SUFFIXES = ('localhost', 'local', 'internal', 'localdomain')
+LABEL_PATTERN = re.compile(r'^[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?$')
+IPV6_PATTERN = re.compile(r'^\[[0-9a-f:.]+\]$')
+MAX_HOST_LENGTH = 253
+ID_MASK = (1 << 63) - 1  # fits a signed 64-bit database integer
+
+
+@dataclass(frozen=True)
+class CanonicalDomain:
+    """Normalized domain; key and id ignore scheme and www, url keeps them"""
+    host: str
+    scheme: str = 'https'
+    www: bool = False
+    port: Optional[int] = None
+    path: str = ''
+
+    @property
+    def key(self) -> str:
+        """Identity string shared by every protocol variant of the domain"""
+        port = f":{self.port}" if self.port is not None else ''
+        return f"{self.host}{port}{self.path}"
+
+    @property
+    def id(self) -> int:
+        """63-bit integer identity derived from key"""
+        return domain_id(self.key)
+
+    @property
+    def protocol(self) -> str:
+        """Protocol string in the Protocol table's form, e.g. 'https://www.'"""
+        return f"{self.scheme}://{'www.' if self.www else ''}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.protocol}{self.key}"
+
+
+@lru_cache(maxsize=65536)
+def domain_id(key: str) -> int:
+    """Stable integer id for a canonical key"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big') & ID_MASK
+
+
+def _ascii_host(host: str) -> str:
+    labels = host.split('.')
+    try:
+        return '.'.join(label if label.isascii() else label.encode('idna').decode('ascii') for label in labels)
+    except UnicodeError as e:
+        raise ValueError(f"Invalid internationalized domain {host!r}: {e}")
+
+
+def supported_protocol(protocol: str) -> bool:
+    """Whether a Protocol row's scheme is one canonicalize accepts"""
+    return protocol.strip().lower().partition('://')[0] in SUPPORTED_SCHEMES
+
+
+def _check_scheme(scheme: str, protocol: Optional[str]):
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported protocol {protocol!r}; expected one of "
+                         f"{', '.join(sorted(name + '://' for name in SUPPORTED_SCHEMES))}")
+
+
+def _check_public_host(host: str, domain: str):
+    """Reject hosts that address this machine or a private network"""
+    labels = host.strip('[]').split('.')
+    if host.startswith('[') or labels[-1].isdigit():
+        # IP literals; a numeric last label is never a real TLD (127.1, 2130706433)
+        try:
+            address = ipaddress.ip_address(host.strip('[]'))
+        except ValueError:
+            raise ValueError(f"Invalid address {domain!r}")
+        if not address.is_global:
+            raise ValueError(f"Private or local address {domain!r} is not allowed")
+    elif len(labels) < 2 or labels[-1] in LOCAL_SUFFIXES:
+        raise ValueError(f"Local host name {domain!r} is not allowed")
+
+
+@lru_cache(maxsize=65536)
+def canonicalize(domain: str, protocol: Optional[str] = None, default_protocol: str = 'https://') -> CanonicalDomain:
+    """Normalize a domain (optionally with inline scheme, port and path) and its protocol"""
+    text = (domain or '').strip()
+    inline_scheme = None
+    if '://' in text:
+        inline_scheme, text = text.split('://', 1)
+    text = re.split(r'[?#]', text, maxsplit=1)[0]
+    authority, _, path = text.partition('/')
+    authority = authority.rpartition('@')[2]
+
+    # An explicit protocol wins over a scheme written into the domain
+    protocol = (protocol or '').strip().lower()
+    if protocol:
+        scheme, _, rest = protocol.partition('://')
+        www = rest.startswith('www')
+    else:
+        scheme = (inline_scheme or default_protocol.partition('://')[0]).strip().lower()
+        www = False
+    _check_scheme(scheme, protocol or inline_scheme)
+
+    port = None
+    if authority.startswith('['):
+        host, _, port_text = authority.partition(']')
+        host += ']'
+        port_text = port_text.lstrip(':')
+    else:
+        host, _, port_text = authority.partition(':')
+    if port_text:
+        if not port_text.isdigit() or not 0 < int(port_text) < 65536:
+            raise ValueError(f"Invalid port in {domain!r}")
+        port = int(port_text)
+        if DEFAULT_PORTS.get(scheme) == port:
+            port = None
+
+    host = _ascii_host(host.strip().rstrip('.').lower())
+    if host.startswith('www.') and host.count('.') >= 2:
+        host = host[4:]
+        www = True
+
+    if not host or len(host) > MAX_HOST_LENGTH:
+        raise ValueError(f"Invalid domain {domain!r}")
+    if not IPV6_PATTERN.match(host) and not all(LABEL_PATTERN.match(label) for label in host.split('.')):
+        raise ValueError(f"Invalid domain {domain!r}")
+    _check_public_host(host, domain)
+
+    path = path.strip('/')
+    if any(character.isspace() for character in path):
+        raise ValueError(f"Invalid path in {domain!r}")
+    return CanonicalDomain(host=host, scheme=scheme, www=www, port=port, path=f"/{path}" if path else '')
+
+
+
+def protocol_variants(domain: str, protocols: Iterable[str]) -> List[Tuple[str, CanonicalDomain]]:
+    """The domain once per protocol; scheme and www come from the protocol, never the input"""
+    base = canonicalize(domain)
+    variants = []
+    for protocol in protocols:
+        scheme, _, rest = protocol.strip().lower().partition('://')
+        _check_scheme(scheme, protocol)
+        port = None if DEFAULT_PORTS.get(scheme) == base.port else base.port
+        variants.append((protocol, replace(base, scheme=scheme, www=rest.startswith('www'), port=port)))
+    return variants
@@ -0,0 +1,182 @@
+"""
+Domain Column Export for Infy AI
+Columnar snapshot of domain metrics: one typed NumPy array file per column
+plus a JSON manifest, written page by page from the keyset listing and read
+back through memory maps so millions of domains load without the ORM
+"""
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.domain_listing import EXPORT_PAGE_SIZE, iter_pages
+
+MANIFEST = 'manifest.json'
+FORMAT = 'infy-domain-columns'
+FORMAT_VERSION = 1
+READ_PAGE_ROWS = 1_000_000
+
+# name: (dtype, null sentinel); None means the column has no nulls to encode
+NUMERIC_COLUMNS = {
+    'id': ('<i8', None),
+    'canonical_id': ('<i8', -1),
+    'domain_authority': ('<i2', -1),
+    'page_authority': ('<i2', -1),
+    'sitemap_pages_count': ('<i4', -1),
+    'indexed_pages_count': ('<i4', -1),
+    'sitemap_found': ('|b1', None),
+    'google_indexed': ('|b1', None),
+    'bing_indexed': ('|b1', None),
+    'last_analyzed': ('<M8[s]', 'NaT'),
+    'updated_at': ('<M8[s]', 'NaT'),
+}
+# Dictionary-encoded: a uint8 code per row, the values listed in the manifest
+CATEGORY_COLUMNS = ('protocol', 'analysis_status')
+# Variable-length UTF-8: int64 offsets (rows + 1) into one byte file, as in Arrow
+STRING_COLUMNS = ('domain_name',)
+EXPORT_COLUMNS = tuple(NUMERIC_COLUMNS) + CATEGORY_COLUMNS + STRING_COLUMNS
+
+
+class ColumnWriter:
+    """Appends pages of rows to per-column files in a directory; the manifest is written last"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.rows = 0
+        self.categories: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORY_COLUMNS}
+        self._string_bytes = {name: 0 for name in STRING_COLUMNS}
+        self._files = {name: open(os.path.join(directory, f"{name}.bin"), 'wb') for name in NUMERIC_COLUMNS}
+        self._files.update({name: open(os.path.join(directory, f"{name}.bin"), 'wb') for name in CATEGORY_COLUMNS})
+        for name in STRING_COLUMNS:
+            self._files[name] = open(os.path.join(directory, f"{name}.bin"), 'wb')
+            self._files[f"{name}.offsets"] = open(os.path.join(directory, f"{name}.offsets.bin"), 'wb')
+            self._files[f"{name}.offsets"].write(np.zeros(1, dtype='<i8').tobytes())
+
+    def _codes(self, name: str, values: Sequence[Optional[str]]) -> np.ndarray:
+        codes = self.categories[name]
+        for value in set(values) - codes.keys():
+            if len(codes) == 256:
+                raise ValueError(f"{name} has more than 256 distinct values")
+            codes[value] = len(codes)
+        return np.fromiter((codes[value] for value in values), dtype='u1', count=len(values))
+
+    def write_page(self, rows: List[Tuple]):
+        """Append rows whose values are ordered as EXPORT_COLUMNS"""
+        if not rows:
+            return
+        columns = dict(zip(EXPORT_COLUMNS, zip(*rows)))
+        for name, (dtype, null) in NUMERIC_COLUMNS.items():
+            values = columns[name]
+            if dtype == '|b1':
+                values = [bool(value) for value in values]
+            elif null is not None and dtype != '<M8[s]':  # datetime64 turns None into NaT by itself
+                values = [null if value is None else value for value in values]
+            self._files[name].write(np.array(values, dtype=dtype).tobytes())
+        for name in CATEGORY_COLUMNS:
+            self._files[name].write(self._codes(name, columns[name]).tobytes())
+        for name in STRING_COLUMNS:
+            encoded = [(value or '').encode('utf-8') for value in columns[name]]
+            lengths = np.fromiter((len(value) for value in encoded), dtype='<i8', count=len(encoded))
+            offsets = self._string_bytes[name] + np.cumsum(lengths)
+            self._files[name].write(b''.join(encoded))
+            self._files[f"{name}.offsets"].write(offsets.tobytes())
+            self._string_bytes[name] = int(offsets[-1])
+        self.rows += len(rows)
+
+    def abort(self):
+        """Close the column files without a manifest, leaving the directory unreadable"""
+        for handle in self._files.values():
+            handle.close()
+
+    def close(self, **extra: Any) -> Dict[str, Any]:
+        """Flush every column file and publish the manifest"""
+        self.abort()
+        columns = {}
+        for name, (dtype, null) in NUMERIC_COLUMNS.items():
+            columns[name] = {'file': f"{name}.bin", 'dtype': dtype, 'null': null}
+        for name in CATEGORY_COLUMNS:
+            columns[name] = {'file': f"{name}.bin", 'dtype': '|u1',
+                             'categories': sorted(self.categories[name], key=self.categories[name].get)}
+        for name in STRING_COLUMNS:
+            columns[name] = {'file': f"{name}.bin", 'dtype': 'utf-8', 'offsets': f"{name}.offsets.bin",
+                             'bytes': self._string_bytes[name]}
+        manifest = dict(format=FORMAT, version=FORMAT_VERSION, rows=self.rows,
+                        created_at=datetime.utcnow().isoformat(), columns=columns, **extra)
+        # Readers only trust a directory once its manifest exists, so replace it atomically
+        path = os.path.join(self.directory, MANIFEST)
+        with open(f"{path}.tmp", 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(f"{path}.tmp", path)
+        return manifest
+
+
+def export_domains(session, directory: str, conditions: Optional[List[Any]] = None,
+                   page_size: int = EXPORT_PAGE_SIZE, **extra: Any) -> Dict[str, Any]:
+    """Write every domain matching conditions to directory; returns the manifest"""
+    writer = ColumnWriter(directory)
+    try:
+        for rows in iter_pages(session, list(conditions or []), page_size=page_size, columns=EXPORT_COLUMNS):
+            writer.write_page(rows)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close(**extra)
+
+
+class DomainColumns:
+    """Read-only view of an export; every column is memory-mapped on first use"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            self.manifest = json.load(handle)
+        if self.manifest.get('format') != FORMAT:
+            raise ValueError(f"{directory} is not a domain column export")
+        self.rows = self.manifest['rows']
+        self._maps: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _map(self, filename: str, dtype: str, count: int) -> np.ndarray:
+        if filename not in self._maps:
+            if count == 0:
+                self._maps[filename] = np.zeros(0, dtype=dtype)
+            else:
+                self._maps[filename] = np.memmap(os.path.join(self.directory, filename), dtype=dtype,
+                                                 mode='r', shape=(count,))
+        return self._maps[filename]
+
+    def column(self, name: str) -> np.ndarray:
+        """Typed array of a numeric or category-code column, backed by its file"""
+        spec = self.manifest['columns'][name]
+        if name in STRING_COLUMNS:
+            raise ValueError(f"{name} is a string column; use strings()")
+        return self._map(spec['file'], spec['dtype'], self.rows)
+
+    def categories(self, name: str) -> List[Optional[str]]:
+        """Values of a dictionary-encoded column, indexed by code"""
+        return self.manifest['columns'][name]['categories']
+
+    def strings(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Decoded values of a string column for rows start:stop"""
+        spec = self.manifest['columns'][name]
+        stop = self.rows if stop is None else min(stop, self.rows)
+        offsets = self._map(spec['offsets'], '<i8', self.rows + 1)[start:stop + 1]
+        data = self._map(spec['file'], '|u1', spec['bytes'])
+        if stop <= start:
+            return []
+        blob = bytes(data[offsets[0]:offsets[-1]])
+        base = int(offsets[0])
+        return [blob[begin - base:end - base].decode('utf-8')
+                for begin, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def pages(self, names: Optional[Sequence[str]] = None,
+              page_rows: int = READ_PAGE_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+        """Slices of the given numeric/category columns, page_rows at a time; pages are views, not copies"""
+        names = [name for name in (names or self.manifest['columns']) if name not in STRING_COLUMNS]
+        for start in range(0, self.rows, page_rows):
+            yield {name: self.column(name)[start:start + page_rows] for name in names}
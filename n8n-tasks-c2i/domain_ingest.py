@@ -0,0 +1,155 @@
+"""
+Streaming Domain Ingestion for Infy AI
+Parses CSV or NDJSON uploads (optionally gzip-compressed) straight from the
+request stream, normalizing and deduplicating rows and handing them to a
+sink in fixed-size chunks so memory stays flat regardless of upload size
+"""
+import csv
+import gzip
+import io
+import json
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Imported both as src.services.domain_ingest (domain routes) and flat (main.py)
+try:
+    from .domain_canonical import canonicalize, domain_id
+except ImportError:
+    from domain_canonical import canonicalize, domain_id
+
+DomainRow = Tuple[str, str]  # (canonical domain key, protocol)
+Sink = Callable[[List[DomainRow]], int]
+
+GZIP_MAGIC = b'\x1f\x8b'
+SUPPORTED_FORMATS = ('csv', 'ndjson')
+
+
+def open_upload(stream: BinaryIO, content_encoding: Optional[str] = None) -> io.BufferedReader:
+    """Wrap a raw upload stream, decompressing gzip on the fly when present"""
+    buffered = stream if isinstance(stream, io.BufferedReader) else io.BufferedReader(stream)
+    if (content_encoding or '').lower() == 'gzip' or buffered.peek(2)[:2] == GZIP_MAGIC:
+        return io.BufferedReader(gzip.GzipFile(fileobj=buffered, mode='rb'))
+    return buffered
+
+
+def detect_format(upload: io.BufferedReader, content_type: Optional[str] = None) -> str:
+    """Pick csv or ndjson from the content type, else from the first byte"""
+    content_type = (content_type or '').lower()
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if 'csv' in content_type:
+        return 'csv'
+    head = upload.peek(64).lstrip()
+    return 'ndjson' if head[:1] in (b'{', b'"') else 'csv'
+
+
+def iter_csv_rows(upload: BinaryIO) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (domain, protocol) from CSV; a header naming a 'domain' column is optional"""
+    reader = csv.reader(io.TextIOWrapper(upload, encoding='utf-8', errors='replace', newline=''))
+    domain_column, protocol_column = 0, 1
+    for line_number, record in enumerate(reader):
+        if not record:
+            continue
+        if line_number == 0:
+            header = [cell.strip().lower() for cell in record]
+            if 'domain' in header:
+                domain_column = header.index('domain')
+                protocol_column = header.index('protocol') if 'protocol' in header else None
+                continue
+        domain = record[domain_column] if domain_column < len(record) else ''
+        protocol = record[protocol_column] if protocol_column is not None and protocol_column < len(record) else None
+        yield domain, protocol
+
+
+def iter_ndjson_rows(upload: BinaryIO) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (domain, protocol) from one JSON object or string per line"""
+    for line in upload:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield '', None
+            continue
+        if isinstance(item, str):
+            yield item, None
+        elif isinstance(item, dict):
+            yield str(item.get('domain', '')), item.get('protocol')
+        else:
+            yield '', None
+
+
+def normalize_row(domain: str, protocol: Optional[str], default_protocol: str = 'https://') -> Optional[DomainRow]:
+    """Canonicalize a domain and protocol; None when the domain is invalid"""
+    try:
+        canonical = canonicalize(domain or '', protocol or None, default_protocol)
+    except ValueError:
+        return None
+    return canonical.key, canonical.protocol
+
+
+def row_url(row: DomainRow) -> str:
+    """Dedup key of a normalized row: its canonical URL, so each protocol variant is a separate domain"""
+    domain, protocol = row
+    return f"{protocol}{domain}"
+
+
+def ingest(rows: Iterable[Tuple[str, Optional[str]]], sink: Sink, chunk_size: int = 1000,
+           default_protocol: str = 'https://', dedup=None) -> Dict[str, Any]:
+    """Normalize, deduplicate by canonical URL and pass rows to the sink chunk_size at a time"""
+    counts = {'rows_read': 0, 'invalid': 0, 'duplicates': 0, 'accepted': 0, 'stored': 0, 'chunks': 0}
+    seen = set()
+    chunk: List[DomainRow] = []
+
+    def flush():
+        rows_to_store = chunk
+        if dedup is not None:
+            # A DedupIndex also catches rows from earlier uploads and replaces the seen-set
+            new_keys = set(dedup.filter_new(map(row_url, chunk)))
+            rows_to_store = []
+            for row in chunk:
+                key = row_url(row)
+                if key in new_keys:
+                    new_keys.discard(key)  # keep the first of in-chunk repeats
+                    rows_to_store.append(row)
+            counts['duplicates'] += len(chunk) - len(rows_to_store)
+        counts['accepted'] += len(rows_to_store)
+        if rows_to_store:
+            counts['stored'] += sink(rows_to_store)
+            if dedup is not None:
+                dedup.add(map(row_url, rows_to_store))
+        counts['chunks'] += 1
+        chunk.clear()
+
+    for domain, protocol in rows:
+        counts['rows_read'] += 1
+        row = normalize_row(domain, protocol, default_protocol)
+        if row is None:
+            counts['invalid'] += 1
+            continue
+        if dedup is None:
+            key = domain_id(row_url(row))  # 8-byte ids keep the seen-set small
+            if key in seen:
+                counts['duplicates'] += 1
+                continue
+            seen.add(key)
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return counts
+
+
+def ingest_upload(stream: BinaryIO, sink: Sink, content_type: Optional[str] = None,
+                  content_encoding: Optional[str] = None, file_format: Optional[str] = None,
+                  chunk_size: int = 1000, default_protocol: str = 'https://', dedup=None) -> Dict[str, Any]:
+    """Stream an upload body through parsing, normalization and chunked storage"""
+    upload = open_upload(stream, content_encoding)
+    file_format = (file_format or detect_format(upload, content_type)).lower()
+    if file_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format {file_format}; expected one of {', '.join(SUPPORTED_FORMATS)}")
+    rows = iter_csv_rows(upload) if file_format == 'csv' else iter_ndjson_rows(upload)
+    counts = ingest(rows, sink, chunk_size=chunk_size, default_protocol=default_protocol, dedup=dedup)
+    counts['format'] = file_format
+    return counts
@@ -0,0 +1,149 @@
+"""
+Domain Listing for Infy AI
+Filtered, keyset-paginated reads over Domain on (updated_at, id) with a lean
+flat-row serialization that selects only listed columns, so exports stream
+page by page without building ORM objects
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from sqlalchemy import or_, select
+
+from src.models.domain import Domain
+
+MAX_PAGE_SIZE = 1000
+EXPORT_PAGE_SIZE = 5000
+
+# Columns of the lean view, in output order
+LEAN_COLUMNS = (
+    'id', 'domain_name', 'protocol', 'full_url', 'canonical_id',
+    'domain_authority', 'page_authority',
+    'sitemap_found', 'sitemap_pages_count',
+    'google_indexed', 'bing_indexed', 'indexed_pages_count',
+    'analysis_status', 'last_analyzed', 'updated_at'
+)
+RANGE_FILTERS = {
+    'min_da': (Domain.domain_authority, '>='), 'max_da': (Domain.domain_authority, '<='),
+    'min_pa': (Domain.page_authority, '>='), 'max_pa': (Domain.page_authority, '<='),
+}
+FLAG_FILTERS = {
+    'google_indexed': Domain.google_indexed,
+    'bing_indexed': Domain.bing_indexed,
+    'sitemap_found': Domain.sitemap_found,
+}
+LIST_FILTERS = {
+    'status': Domain.analysis_status,
+    'protocol': Domain.protocol,
+}
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(updated_at: datetime, domain_id: int) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{domain_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, _, domain_id = raw.partition('|')
+        return datetime.fromisoformat(stamp), int(domain_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+
+def parse_filters(args: Mapping[str, str]) -> List[Any]:
+    """SQL conditions from query arguments; raises ValueError on malformed values"""
+    conditions = []
+    for name, (column, operator) in RANGE_FILTERS.items():
+        if args.get(name) not in (None, ''):
+            try:
+                value = int(args[name])
+            except ValueError:
+                raise ValueError(f"{name} must be an integer")
+            conditions.append(column >= value if operator == '>=' else column <= value)
+    for name, column in FLAG_FILTERS.items():
+        value = (args.get(name) or '').lower()
+        if value in TRUE_VALUES:
+            conditions.append(column.is_(True))
+        elif value in FALSE_VALUES:
+            conditions.append(column.is_(False))
+        elif value:
+            raise ValueError(f"{name} must be true or false")
+    for name, column in LIST_FILTERS.items():
+        values = [value.strip() for value in (args.get(name) or '').split(',') if value.strip()]
+        if values:
+            conditions.append(column.in_(values))
+    return conditions
+
+
+def page_query(conditions: List[Any], cursor: Optional[Cursor], limit: int, descending: bool = False,
+               columns: Optional[Tuple[str, ...]] = LEAN_COLUMNS):
+    """SELECT for one page; columns=None selects whole Domain entities"""
+    statement = select(*(getattr(Domain, name) for name in columns)) if columns else select(Domain)
+    if cursor is not None:
+        updated_at, domain_id = cursor
+        # The plain bound on updated_at lets the planner seek the index; the OR alone forces a scan from the start
+        if descending:
+            after = [Domain.updated_at <= updated_at,
+                     or_(Domain.updated_at < updated_at, Domain.id < domain_id)]
+        else:
+            after = [Domain.updated_at >= updated_at,
+                     or_(Domain.updated_at > updated_at, Domain.id > domain_id)]
+        conditions = conditions + after
+    if conditions:
+        statement = statement.where(*conditions)
+    order = (Domain.updated_at.desc(), Domain.id.desc()) if descending else (Domain.updated_at, Domain.id)
+    return statement.order_by(*order).limit(limit)
+
+
+def lean_row(row) -> Dict[str, Any]:
+    """Flat dict of a lean-view row; datetimes become ISO strings"""
+    record = dict(zip(LEAN_COLUMNS, row))
+    for name in ('last_analyzed', 'updated_at'):
+        if record[name] is not None:
+            record[name] = record[name].isoformat()
+    return record
+
+
+def list_page(session, conditions: List[Any], cursor: Optional[Cursor] = None, limit: int = 100,
+              descending: bool = False, full: bool = False) -> Dict[str, Any]:
+    """One page of domains and the cursor of the next page (None on the last)"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # One extra row tells whether another page exists without a COUNT
+    if full:
+        domains = session.execute(page_query(conditions, cursor, limit + 1, descending, None)).scalars().all()
+        keys = [(domain.updated_at, domain.id) for domain in domains]
+        records = [domain.to_dict() for domain in domains[:limit]]
+    else:
+        rows = session.execute(page_query(conditions, cursor, limit + 1, descending)).all()
+        keys = [(row.updated_at, row.id) for row in rows]
+        records = [lean_row(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(*keys[limit - 1]) if len(keys) > limit else None
+    return {'domains': records, 'count': len(records), 'next_cursor': next_cursor}
+
+
+def iter_pages(session, conditions: List[Any], cursor: Optional[Cursor] = None, descending: bool = False,
+               page_size: int = EXPORT_PAGE_SIZE, columns: Tuple[str, ...] = LEAN_COLUMNS) -> Iterator[List[Any]]:
+    """Rows of every matching domain, one keyset page at a time"""
+    if 'updated_at' not in columns or 'id' not in columns:
+        columns = columns + tuple(name for name in ('updated_at', 'id') if name not in columns)
+    while True:
+        rows = session.execute(page_query(conditions, cursor, page_size, descending, columns)).all()
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1].updated_at, rows[-1].id)
+
+
+def iter_ndjson(session, conditions: List[Any], cursor: Optional[Cursor] = None, descending: bool = False,
+                page_size: int = EXPORT_PAGE_SIZE) -> Iterator[str]:
+    """Every matching domain as lean NDJSON, one keyset page per yielded chunk"""
+    for rows in iter_pages(session, conditions, cursor, descending, page_size):
+        yield ''.join(json.dumps(lean_row(row), separators=(',', ':')) + '\n' for row in rows)
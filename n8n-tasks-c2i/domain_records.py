@@ -0,0 +1,396 @@
+"""
+Compact Domain Records for Infy AI
+Struct-of-arrays store for main.py's domain results: rows are found through
+an open-addressing table of canonical ids, protocols and statuses are interned
+codes, flags are packed bits, authorities small ints and timestamps epoch
+microseconds; records are decoded back into the usual dicts on access
+"""
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Imported both as src.services.domain_records and flat (main.py)
+try:
+    from .domain_canonical import domain_id
+except ImportError:
+    from domain_canonical import domain_id
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+MAX_SITEMAP_PAGES = 2 ** 32 - 1
+
+# Bits of the per-row flags column
+ALIVE = 1 << 0
+HAS_DOMAIN = 1 << 1
+HAS_DOMAIN_ID = 1 << 2
+HAS_FULL_URL = 1 << 3
+HAS_RANKING = 1 << 4
+HAS_SITEMAP = 1 << 5
+HAS_INDEXING = 1 << 6
+SITEMAP_FOUND = 1 << 7
+GOOGLE_INDEXED = 1 << 8
+BING_INDEXED = 1 << 9
+QUEUED_AT = 1 << 10
+ANALYZED_AT = 1 << 11
+SITEMAP_URL = 1 << 12
+
+_ABSENT = object()  # interned in place of a missing protocol or status key
+
+# Per-row columns: name -> dtype
+COLUMNS = {
+    'flags': np.uint16,
+    'protocol': np.uint8,
+    'status': np.uint8,
+    'domain_authority': np.int8,
+    'page_authority': np.int8,
+    'sitemap_pages': np.uint32,
+    'sitemap_path': np.uint8,  # sitemap URL as an interned suffix of full_url, e.g. /sitemap.xml
+    'stamp': np.int64,
+    'name_end': np.int64,  # names are stored back to back in one UTF-8 buffer
+}
+
+
+class IdIndex:
+    """Open-addressing hash table from non-negative canonical ids to row numbers, in two NumPy arrays"""
+
+    EMPTY = -1
+    DELETED = -2
+
+    def __init__(self, capacity: int = 1024):
+        self.ids = np.full(capacity, self.EMPTY, dtype=np.int64)
+        self.rows = np.zeros(capacity, dtype=np.int32)
+        self.used = 0  # live and deleted slots; both lengthen probe chains
+
+    def _find(self, key: int) -> int:
+        mask = len(self.ids) - 1
+        slot = key & mask  # ids are hash-derived, so low bits spread evenly
+        while True:
+            current = self.ids.item(slot)
+            if current == key or current == self.EMPTY:
+                return slot
+            slot = (slot + 1) & mask
+
+    def get(self, key: int) -> int:
+        """Row number for key, or -1"""
+        slot = self._find(key)
+        return self.rows.item(slot) if self.ids.item(slot) == key else -1
+
+    def put(self, key: int, row: int):
+        if (self.used + 1) * 2 > len(self.ids):
+            self._rehash()
+        mask = len(self.ids) - 1
+        slot, reuse = key & mask, None
+        while True:
+            current = self.ids.item(slot)
+            if current == key:
+                self.rows[slot] = row
+                return
+            if current == self.DELETED and reuse is None:
+                reuse = slot
+            elif current == self.EMPTY:
+                break
+            slot = (slot + 1) & mask
+        if reuse is None:
+            self.used += 1
+            reuse = slot
+        self.ids[reuse] = key
+        self.rows[reuse] = row
+
+    def remove(self, key: int):
+        slot = self._find(key)
+        if self.ids.item(slot) == key:
+            self.ids[slot] = self.DELETED
+
+    def _rehash(self):
+        live = self.ids >= 0
+        keys, rows = self.ids[live].tolist(), self.rows[live].tolist()
+        capacity = len(self.ids)
+        while len(keys) * 4 > capacity:
+            capacity *= 2
+        # Probing plain lists is several times faster than indexing NumPy scalars
+        ids, slots = [self.EMPTY] * capacity, [0] * capacity
+        mask = capacity - 1
+        for key, row in zip(keys, rows):
+            slot = key & mask
+            while ids[slot] != self.EMPTY:
+                slot = (slot + 1) & mask
+            ids[slot], slots[slot] = key, row
+        self.ids = np.array(ids, dtype=np.int64)
+        self.rows = np.array(slots, dtype=np.int32)
+        self.used = len(keys)
+
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.rows.nbytes
+
+
+class Interner:
+    """Small table of distinct values and their uint8 codes"""
+
+    def __init__(self, values: Tuple[Any, ...] = ()):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: Any) -> Optional[int]:
+        """The value's code; None once 256 values are interned and value is not one of them"""
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) == 256:
+                return None
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _small_int(value: Any, low: int, high: int) -> bool:
+    return type(value) is int and low <= value <= high
+
+
+def _epoch(stamp: Any) -> Optional[int]:
+    """Epoch microseconds of an ISO timestamp string that decodes back to the same string"""
+    if not isinstance(stamp, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(stamp)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None or moment.isoformat() != stamp:
+        return None
+    return (moment - EPOCH) // MICROSECOND
+
+
+class CompactDomainStore(MutableMapping):
+    """Mapping of canonical domain key to result dict, held as one row of columns per domain
+
+    Fields outside the compact layout (a sitemap URL or error, unexpected keys,
+    values out of range) are kept per row in a sparse dict, so every record
+    decodes to exactly what was stored. Deleted rows are not reused.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._index = IdIndex(max(1024, 1 << (capacity * 2 - 1).bit_length()))
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._names = bytearray()
+        self._rows = 0
+        self._live = 0
+        # Code 0 is a missing key; values beyond 256 distinct ones go to the row's extras
+        self._protocols = Interner((_ABSENT,))
+        self._statuses = Interner((_ABSENT,))
+        self._sitemap_paths = Interner()
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _encode(self, key: str, record: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, Any]]:
+        rest = dict(record)
+        values = {'domain_authority': 0, 'page_authority': 0, 'sitemap_pages': 0, 'sitemap_path': 0, 'stamp': 0}
+        flags = ALIVE
+
+        if rest.get('domain') == key:
+            del rest['domain']
+            flags |= HAS_DOMAIN
+        if rest.get('domain_id', _ABSENT) == domain_id(key):
+            del rest['domain_id']
+            flags |= HAS_DOMAIN_ID
+        protocol = rest.pop('protocol', _ABSENT)
+        values['protocol'] = self._protocols.code(protocol)
+        if values['protocol'] is None:
+            values['protocol'] = 0
+            rest['protocol'] = protocol
+            protocol = _ABSENT  # full_url and the sitemap URL are then kept as given
+        if isinstance(protocol, str) and rest.get('full_url') == f"{protocol}{key}":
+            del rest['full_url']
+            flags |= HAS_FULL_URL
+
+        ranking = rest.get('ranking')
+        if (isinstance(ranking, dict) and ranking.keys() == {'domain_authority', 'page_authority'}
+                and _small_int(ranking['domain_authority'], -128, 127)
+                and _small_int(ranking['page_authority'], -128, 127)):
+            del rest['ranking']
+            flags |= HAS_RANKING
+            values['domain_authority'] = ranking['domain_authority']
+            values['page_authority'] = ranking['page_authority']
+
+        sitemap = rest.get('sitemap')
+        if (isinstance(sitemap, dict) and {'found', 'url', 'pages_count'} <= sitemap.keys() <= {'found', 'url', 'pages_count', 'error'}
+                and type(sitemap['found']) is bool and _small_int(sitemap['pages_count'], 0, MAX_SITEMAP_PAGES)):
+            del rest['sitemap']
+            flags |= HAS_SITEMAP | (SITEMAP_FOUND if sitemap['found'] else 0)
+            values['sitemap_pages'] = sitemap['pages_count']
+            url = sitemap['url']
+            if isinstance(protocol, str) and isinstance(url, str) and url.startswith(f"{protocol}{key}"):
+                code = self._sitemap_paths.code(url[len(protocol) + len(key):])
+                if code is not None:
+                    values['sitemap_path'] = code
+                    flags |= SITEMAP_URL
+                    url = None
+            text = {'url': url} if url is not None else {}
+            if 'error' in sitemap:
+                text['error'] = sitemap['error']
+            if text:
+                rest['sitemap'] = text  # merged back into the decoded sitemap
+
+        indexing = rest.get('indexing')
+        if (isinstance(indexing, dict) and indexing.keys() == {'google_indexed', 'bing_indexed'}
+                and type(indexing['google_indexed']) is bool and type(indexing['bing_indexed']) is bool):
+            del rest['indexing']
+            flags |= (HAS_INDEXING | (GOOGLE_INDEXED if indexing['google_indexed'] else 0)
+                      | (BING_INDEXED if indexing['bing_indexed'] else 0))
+
+        status = rest.pop('status', _ABSENT)
+        values['status'] = self._statuses.code(status)
+        if values['status'] is None:
+            values['status'] = 0
+            rest['status'] = status
+
+        for name, bit in (('analyzed_at', ANALYZED_AT), ('queued_at', QUEUED_AT)):
+            stamp = _epoch(rest.get(name))
+            if stamp is not None:
+                del rest[name]
+                flags |= bit
+                values['stamp'] = stamp
+                break
+
+        values['flags'] = flags
+        return values, rest
+
+    def _decode(self, row: int) -> Dict[str, Any]:
+        columns = self._columns
+        flags = columns['flags'].item(row)
+        start = columns['name_end'].item(row - 1) if row else 0
+        key = self._names[start:columns['name_end'].item(row)].decode('utf-8')
+        extras = self._extras.get(row, {})
+
+        # Built in the order main.py writes results and queued placeholders
+        record: Dict[str, Any] = {}
+        if flags & HAS_DOMAIN:
+            record['domain'] = key
+        if flags & HAS_DOMAIN_ID:
+            record['domain_id'] = domain_id(key)
+        protocol = self._protocols.values[columns['protocol'].item(row)]
+        if protocol is not _ABSENT:
+            record['protocol'] = protocol
+        if flags & HAS_FULL_URL:
+            record['full_url'] = f"{protocol}{key}"
+        if flags & HAS_RANKING:
+            record['ranking'] = {'domain_authority': columns['domain_authority'].item(row),
+                                 'page_authority': columns['page_authority'].item(row)}
+        if flags & HAS_SITEMAP:
+            url = (f"{protocol}{key}{self._sitemap_paths.values[columns['sitemap_path'].item(row)]}"
+                   if flags & SITEMAP_URL else None)
+            record['sitemap'] = {'found': bool(flags & SITEMAP_FOUND), 'url': url,
+                                 'pages_count': columns['sitemap_pages'].item(row)}
+        if flags & HAS_INDEXING:
+            record['indexing'] = {'google_indexed': bool(flags & GOOGLE_INDEXED),
+                                  'bing_indexed': bool(flags & BING_INDEXED)}
+        status = self._statuses.values[columns['status'].item(row)]
+        if status is not _ABSENT:
+            record['status'] = status
+        if flags & (ANALYZED_AT | QUEUED_AT):
+            stamp = (EPOCH + columns['stamp'].item(row) * MICROSECOND).isoformat()
+            record['analyzed_at' if flags & ANALYZED_AT else 'queued_at'] = stamp
+
+        for name, value in extras.items():
+            if name == 'sitemap' and flags & HAS_SITEMAP:
+                record['sitemap'].update(value)
+            else:
+                record[name] = value
+        return record
+
+    def _row(self, key: str) -> int:
+        row = self._index.get(domain_id(key))
+        if row < 0:
+            return -1
+        start = self._columns['name_end'].item(row - 1) if row else 0
+        if self._names[start:self._columns['name_end'].item(row)] != key.encode('utf-8'):
+            return -1  # another key with the same 63-bit id
+        return row
+
+    def _grow(self):
+        capacity = len(self._columns['flags']) * 2
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[name] = grown
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        """Decode the stored record into a new dict; changing it does not change the store"""
+        with self._lock:
+            row = self._row(key)
+            if row < 0:
+                raise KeyError(key)
+            return self._decode(row)
+
+    def __setitem__(self, key: str, record: Dict[str, Any]):
+        with self._lock:
+            values, extras = self._encode(key, record)  # interning is not thread-safe on its own
+            row = self._row(key)
+            if row < 0:
+                # Rows are appended, so each row's name starts where the previous one ends
+                if self._index.get(domain_id(key)) >= 0:
+                    raise ValueError(f"Canonical id collision for {key}")
+                if self._rows == len(self._columns['flags']):
+                    self._grow()
+                row = self._rows
+                self._rows += 1
+                self._live += 1
+                self._names += key.encode('utf-8')
+                values['name_end'] = len(self._names)
+                self._index.put(domain_id(key), row)
+            for name, value in values.items():
+                self._columns[name][row] = value
+            if extras:
+                self._extras[row] = extras
+            else:
+                self._extras.pop(row, None)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            row = self._row(key)
+            if row < 0:
+                raise KeyError(key)
+            self._index.remove(domain_id(key))
+            self._columns['flags'][row] = 0
+            self._extras.pop(row, None)
+            self._live -= 1
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        with self._lock:
+            return self._row(key) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            alive = np.flatnonzero(self._columns['flags'][:self._rows] & ALIVE).tolist()
+            ends = self._columns['name_end'][:self._rows].tolist()
+            names = bytes(self._names)
+        for row in alive:
+            yield names[ends[row - 1] if row else 0:ends[row]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return self._live
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns, names, index and sparse extras (capacity included)"""
+        extras = sum(len(repr(value)) for value in self._extras.values())  # rough; extras are rare
+        return (sum(column.nbytes for column in self._columns.values()) + len(self._names)
+                + self._index.nbytes() + extras)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get row counts and memory use"""
+        with self._lock:
+            total = self.nbytes()
+            return {
+                'domains': self._live,
+                'rows': self._rows,
+                'capacity': len(self._columns['flags']),
+                'rows_with_extras': len(self._extras),
+                'protocols': len(self._protocols.values) - 1,  # less the missing-key code
+                'statuses': len(self._statuses.values) - 1,
+                'bytes': total,
+                'bytes_per_domain': round(total / self._live, 1) if self._live else 0.0
+            }
@@ -0,0 +1,147 @@
+"""
+Domain Routes for Infy AI
+Streaming bulk upload into the domain tables, filtered, cursor-paginated
+domain listing, NDJSON and columnar exports, and running domain statistics
+"""
+import os
+import tempfile
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from src.models.user import db
+from src.models.domain import DomainBatch
+from src.services.analysis_queue import analysis_scheduler
+from src.services.dedup_index import domain_dedup
+from src.services.domain_aggregates import domain_aggregates
+from src.services.domain_export import export_domains
+from src.services.domain_ingest import ingest_upload
+from src.services.domain_listing import decode_cursor, iter_ndjson, list_page, parse_filters
+from src.services.domain_upsert import upsert_sink
+
+domain_bp = Blueprint('domain', __name__)
+
+BULK_UPLOAD_CHUNK_SIZE = 1000
+
+@domain_bp.route('/domains/bulk-upload', methods=['POST'])
+def bulk_upload_domains():
+    """Stream a CSV or NDJSON body (optionally gzip-compressed) into the domains table
+
+    New domains are inserted and queued for analysis under a new DomainBatch,
+    one multi-row upsert per chunk; URLs the dedup index has seen are skipped
+    before reaching the database.
+    Query parameters: batch_name, format, protocol (default for rows without one)
+    and priority.
+    """
+    try:
+        priority = int(request.args.get('priority', 1))
+    except ValueError:
+        return jsonify({'error': 'priority must be an integer'}), 400
+
+    try:
+        batch = DomainBatch(
+            batch_name=request.args.get('batch_name', f'Batch_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}'),
+            file_type=request.args.get('format') or 'csv',
+            status='processing',
+            started_at=datetime.utcnow()
+        )
+        db.session.add(batch)
+        db.session.commit()
+
+        # Each chunk is upserted and committed as it is parsed; the body is never loaded whole
+        totals = {}
+        try:
+            counts = ingest_upload(
+                request.stream,
+                upsert_sink(db.session, batch_id=batch.id, priority=priority, totals=totals),
+                content_type=request.content_type,
+                content_encoding=request.headers.get('Content-Encoding'),
+                file_format=request.args.get('format'),
+                chunk_size=BULK_UPLOAD_CHUNK_SIZE,
+                default_protocol=request.args.get('protocol', 'https://').strip(),
+                dedup=domain_dedup
+            )
+        except ValueError as e:
+            db.session.rollback()
+            batch.status = 'failed'
+            batch.error_message = str(e)
+            db.session.commit()
+            return jsonify({'error': str(e)}), 400
+
+        # bulk_upsert_domains grew total_domains chunk by chunk
+        db.session.refresh(batch)
+        batch.file_type = counts['format']
+        db.session.commit()
+        return jsonify({
+            'message': f"Queued {batch.total_domains} domains for analysis",
+            'batch': batch.to_dict(),
+            'ingest': counts,
+            'upsert': totals
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Bulk upload error: {str(e)}'}), 500
+
+@domain_bp.route('/domains', methods=['GET'])
+def list_domains():
+    """List domains matching the filters, one keyset page at a time
+
+    Filters: min_da, max_da, min_pa, max_pa, google_indexed, bing_indexed,
+    sitemap_found, status and protocol (comma-separated lists). Pass the
+    returned next_cursor as cursor for the following page; order=desc lists
+    most recently updated first. format=ndjson streams every match in the
+    lean view, view=full returns Domain.to_dict() records.
+    """
+    try:
+        conditions = parse_filters(request.args)
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        limit = int(request.args.get('limit', 100))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    descending = request.args.get('order', 'asc').lower() == 'desc'
+
+    try:
+        if request.args.get('format') == 'ndjson':
+            return Response(
+                stream_with_context(iter_ndjson(db.session, conditions, cursor, descending)),
+                mimetype='application/x-ndjson'
+            )
+
+        page = list_page(db.session, conditions, cursor, limit, descending,
+                         full=request.args.get('view') == 'full')
+        return jsonify(page)
+
+    except Exception as e:
+        return jsonify({'error': f'Domain listing error: {str(e)}'}), 500
+
+@domain_bp.route('/domains/export', methods=['POST'])
+def export_domain_columns():
+    """Write matching domains as a columnar export under DOMAIN_EXPORT_DIR; takes the listing filters"""
+    try:
+        conditions = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        root = current_app.config.get('DOMAIN_EXPORT_DIR') or os.path.join(tempfile.gettempdir(), 'infy-domain-exports')
+        name = f"domains-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
+        manifest = export_domains(db.session, os.path.join(root, name), conditions,
+                                  filters=request.args.to_dict())
+        return jsonify({
+            'export': name,
+            'directory': os.path.join(root, name),
+            'rows': manifest['rows'],
+            'manifest': manifest
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': f'Domain export error: {str(e)}'}), 500
+
+@domain_bp.route('/domains/stats', methods=['GET'])
+def domain_stats():
+    """Authority distribution, indexing and sitemap shares, status and protocol counts,
+    plus the analysis workers' counters and throughput"""
+    try:
+        return jsonify({'stats': domain_aggregates.stats(), 'analysis': analysis_scheduler.stats()})
+    except Exception as e:
+        return jsonify({'error': f'Domain stats error: {str(e)}'}), 500
@@ -0,0 +1,101 @@
+"""
+Domain Schema Upgrade for Infy AI
+Brings domains and domain_analysis_queue tables created by earlier versions up
+to the current models in place: new nullable columns, canonical ids, the
+unique full_url index and the claim and open-entry queue indexes
+"""
+from typing import List
+
+from sqlalchemy import func, inspect, select, text, update
+
+from src.models.domain import Domain, DomainAnalysisQueue
+from src.services.domain_canonical import canonicalize
+
+BACKFILL_BATCH = 1000
+
+
+def _add_missing_columns(connection, table) -> List[str]:
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable or column.primary_key:
+            raise RuntimeError(f"Cannot add required column {table.name}.{column.name} in place; "
+                               f"recreate the table with reset_database()")
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _backfill_canonical_ids(connection) -> int:
+    """Fill canonical_id for rows written before it existed; rows that no longer canonicalize keep NULL"""
+    filled = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Domain.id, Domain.domain_name, Domain.protocol)
+            .where(Domain.canonical_id.is_(None), Domain.id > last_id)
+            .order_by(Domain.id).limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return filled
+        for row in rows:
+            try:
+                canonical_id = canonicalize(row.domain_name, row.protocol).id
+            except ValueError:
+                continue
+            connection.execute(update(Domain).where(Domain.id == row.id).values(canonical_id=canonical_id))
+            filled += 1
+        last_id = rows[-1].id
+
+
+def _check_unique(connection, index) -> None:
+    """Refuse to build a unique index over rows that would violate it"""
+    columns = [index.table.c[column.name] for column in index.columns]
+    query = select(*columns, func.count()).group_by(*columns).having(func.count() > 1)
+    where = index.dialect_options[connection.dialect.name].get('where')
+    if where is not None:  # a partial index only constrains the rows it covers
+        query = query.where(where)
+    duplicate = connection.execute(query.limit(1)).first()
+    if duplicate is not None:
+        raise RuntimeError(f"Cannot create unique index {index.name}: duplicate {tuple(duplicate[:-1])} "
+                           f"in {index.table.name}; remove the duplicates or recreate the table")
+
+
+def _sync_indexes(connection, table) -> List[str]:
+    existing = {index['name']: index for index in inspect(connection).get_indexes(table.name)}
+    changed = []
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        current = existing.get(index.name)
+        if current is not None and bool(current['unique']) == bool(index.unique):
+            continue
+        if index.unique:
+            _check_unique(connection, index)
+        if current is not None:
+            # Earlier versions indexed full_url without making it unique
+            connection.execute(text(f'DROP INDEX {index.name}'))
+        index.create(connection)
+        changed.append(index.name)
+    return changed
+
+
+def upgrade_domain_schema(db) -> List[str]:
+    """Upgrade the domain tables in place; returns the columns and indexes changed
+
+    Safe to run on every start: a current schema is left untouched.
+    """
+    changes = []
+    with db.engine.begin() as connection:
+        tables = set(inspect(connection).get_table_names())
+        for table in (Domain.__table__, DomainAnalysisQueue.__table__):
+            if table.name not in tables:
+                continue
+            changes += _add_missing_columns(connection, table)
+        if Domain.__tablename__ in tables and f"{Domain.__tablename__}.canonical_id" in changes:
+            _backfill_canonical_ids(connection)
+        for table in (Domain.__table__, DomainAnalysisQueue.__table__):
+            if table.name in tables:
+                changes += _sync_indexes(connection, table)
+    return changes
@@ -0,0 +1,241 @@
+"""
+Domain Bulk Upsert for Infy AI
+Multi-row INSERT ... ON CONFLICT writes for Domain (keyed on canonical full_url) and
+DomainAnalysisQueue (one open entry per domain), replacing per-row lookups
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.domain import Domain, DomainAnalysisQueue, DomainBatch
+from src.services.domain_aggregates import AGGREGATE_COLUMNS, domain_aggregates
+from src.services.domain_canonical import CanonicalDomain, canonicalize
+
+DomainInput = Union[Tuple[str, str], Dict[str, Any]]
+
+# Must match the predicate of uq_domain_analysis_queue_open_domain
+OPEN_QUEUE_PREDICATE = "status IN ('queued', 'processing')"
+
+# Columns a bulk upsert may overwrite on an existing Domain row
+UPDATABLE_COLUMNS = (
+    'domain_authority', 'page_authority', 'alexa_rank', 'sitemap_found', 'sitemap_url',
+    'sitemap_pages_count', 'google_indexed', 'bing_indexed', 'indexed_pages_count',
+    'analysis_status', 'analysis_notes', 'last_analyzed', 'is_active'
+)
+
+
+# Counts bulk_upsert_domains returns
+UPSERT_TOTALS = ('inserted', 'updated', 'skipped', 'duplicates', 'invalid', 'queued', 'requeued', 'chunks')
+
+
+def _dialect_insert(session, model):
+    # Core table inserts skip the ORM bulk-save bookkeeping
+    dialect = session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model.__table__)
+    if dialect == 'postgresql':
+        return postgresql.insert(model.__table__)
+    raise ValueError(f"Bulk upsert is not supported on {dialect}")
+
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _canonical(row: DomainInput) -> CanonicalDomain:
+    if isinstance(row, dict):
+        return canonicalize(row['domain_name'], row.get('protocol'))
+    return canonicalize(row[0], row[1])
+
+
+def _domain_key(row: DomainInput) -> Optional[str]:
+    """Dedup key of a row: its canonical full_url, the column rows are unique on"""
+    try:
+        return _canonical(row).url
+    except ValueError:
+        return None
+
+
+def _domain_values(row: DomainInput, now: datetime) -> Dict[str, Any]:
+    canonical = _canonical(row)
+    values = dict(row) if isinstance(row, dict) else {}
+    values.update(
+        domain_name=canonical.key,
+        protocol=canonical.protocol,
+        full_url=canonical.url,
+        canonical_id=canonical.id
+    )
+    values.setdefault('created_at', now)
+    values['updated_at'] = now
+    return values
+
+
+def upsert_domains(session, rows: Sequence[DomainInput], update_existing: bool = False,
+                   status: str = 'pending') -> Dict[str, Any]:
+    """Write one chunk of domains; returns counts, the ids of inserted rows and aggregate changes"""
+    now = datetime.utcnow()
+    values = {}
+    provided = set()
+    invalid = 0
+    for row in rows:
+        try:
+            row_values = _domain_values(row, now)
+        except ValueError:
+            invalid += 1
+            continue
+        provided.update(column for column in row_values if column in UPDATABLE_COLUMNS)
+        row_values.setdefault('analysis_status', status)
+        values[row_values['full_url']] = row_values  # last duplicate in a chunk wins
+    values = list(values.values())
+    duplicates = len(rows) - invalid - len(values)
+
+    statement = _dialect_insert(session, Domain)
+    if update_existing:
+        # Current aggregate columns too, so the aggregates can swap out what gets overwritten
+        existing = {row.full_url: dict(row._mapping) for row in session.execute(
+            select(Domain.full_url, *(getattr(Domain, column) for column in AGGREGATE_COLUMNS))
+            .where(Domain.full_url.in_([row['full_url'] for row in values]))
+        )}
+        # Only columns the caller supplied are overwritten, never the defaults
+        statement = statement.on_conflict_do_update(
+            index_elements=['full_url'],
+            set_=dict({column: statement.excluded[column] for column in sorted(provided)}, updated_at=now)
+        )
+    else:
+        existing = None
+        statement = statement.on_conflict_do_nothing(index_elements=['full_url'])
+
+    # Executed as paged multi-row VALUES statements; RETURNING yields only rows written
+    written = session.execute(statement.returning(Domain.id, Domain.full_url), values).all()
+    if existing is None:
+        inserted_ids = [row.id for row in written]
+        updated = 0
+    else:
+        inserted_ids = [row.id for row in written if row.full_url not in existing]
+        updated = len(written) - len(inserted_ids)
+
+    written_urls = {row.full_url for row in written}
+    changes = []
+    for row_values in values:
+        if row_values['full_url'] in written_urls:
+            previous = existing.get(row_values['full_url']) if existing is not None else None
+            if previous is None:
+                changes.append((None, row_values))
+            else:
+                changes.append((previous, dict(previous, **{column: row_values.get(column) for column in provided})))
+    return {
+        'inserted': len(inserted_ids),
+        'updated': updated,
+        'skipped': len(values) - len(inserted_ids) - updated,
+        'duplicates': duplicates,
+        'invalid': invalid,
+        'inserted_ids': inserted_ids,
+        'aggregate_changes': changes
+    }
+
+
+def enqueue_domains(session, domain_ids: Sequence[int], batch_id: int = None,
+                    priority: int = 1, max_attempts: int = 3) -> Dict[str, int]:
+    """Open a queue entry per domain; an already open entry keeps the higher priority"""
+    if not domain_ids:
+        return {'queued': 0, 'requeued': 0}
+    queue = DomainAnalysisQueue
+    now = datetime.utcnow()
+    # Domains with an open entry before the write are requeued; the rest get a new entry
+    already_open = set(session.execute(
+        select(queue.domain_id).where(queue.domain_id.in_(list(domain_ids)), text(OPEN_QUEUE_PREDICATE))
+    ).scalars())
+    statement = _dialect_insert(session, queue)
+    statement = statement.on_conflict_do_update(
+        index_elements=['domain_id'],
+        index_where=text(OPEN_QUEUE_PREDICATE),
+        set_={
+            'priority': case((statement.excluded.priority > queue.priority, statement.excluded.priority),
+                             else_=queue.priority),
+            'updated_at': now
+        }
+    )
+    written = session.execute(statement.returning(queue.id, queue.domain_id), [{
+        'domain_id': domain_id,
+        'batch_id': batch_id,
+        'priority': priority,
+        'status': 'queued',
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'created_at': now,
+        'updated_at': now
+    } for domain_id in domain_ids]).all()
+    queued = sum(1 for row in written if row.domain_id not in already_open)
+    return {'queued': queued, 'requeued': len(written) - queued}
+
+
+def bulk_upsert_domains(session, rows: Iterable[DomainInput], batch_id: int = None, priority: int = 1,
+                        enqueue: bool = True, update_existing: bool = False,
+                        chunk_size: int = 1000, dedup=None) -> Dict[str, int]:
+    """Upsert domains chunk by chunk, queueing new ones for analysis; commits per chunk"""
+    totals = dict.fromkeys(UPSERT_TOTALS, 0)
+    for chunk in _chunks(rows, chunk_size):
+        keys = None
+        if dedup is not None and not update_existing:
+            # Domains the DedupIndex has seen are skipped without a database round trip;
+            # invalid rows pass through so upsert_domains counts them
+            keys = [_domain_key(row) for row in chunk]
+            new_keys = set(dedup.filter_new(key for key in keys if key is not None))
+            known = len(chunk)
+            kept = []
+            for row, key in zip(chunk, keys):
+                if key is None or key in new_keys:
+                    new_keys.discard(key)  # first of in-chunk repeats
+                    kept.append(row)
+            chunk = kept
+            totals['skipped'] += known - len(chunk)
+            if not chunk:
+                totals['chunks'] += 1
+                continue
+
+        result = upsert_domains(session, chunk, update_existing=update_existing,
+                                status='queued' if enqueue else 'pending')
+        if enqueue:
+            result.update(enqueue_domains(session, result['inserted_ids'], batch_id=batch_id, priority=priority))
+            if batch_id is not None and result['queued']:
+                # Grown with each chunk so the scheduler's batch progress never outruns the upload
+                session.execute(update(DomainBatch).where(DomainBatch.id == batch_id)
+                                .values(total_domains=func.coalesce(DomainBatch.total_domains, 0) + result['queued'])
+                                .execution_options(synchronize_session=False))
+        session.commit()
+        domain_aggregates.replace_many(result['aggregate_changes'])
+        if keys is not None:
+            dedup.add(key for key in map(_domain_key, chunk) if key is not None)
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        totals['chunks'] += 1
+    return totals
+
+
+def upsert_sink(session, batch_id: int = None, priority: int = 1, totals: Dict[str, int] = None):
+    """Build a domain_ingest sink that bulk-upserts each chunk and returns rows inserted
+
+    Pass totals to collect the upsert counts (updated, queued, ...) across chunks.
+    """
+    if totals is not None:
+        for key in UPSERT_TOTALS:
+            totals.setdefault(key, 0)
+
+    def store(rows: List[Tuple[str, str]]) -> int:
+        # domain_ingest has already consulted the DedupIndex for these rows
+        result = bulk_upsert_domains(session, rows, batch_id=batch_id, priority=priority,
+                                     chunk_size=len(rows) or 1)
+        if totals is not None:
+            for key in UPSERT_TOTALS:
+                totals[key] += result[key]
+        return result['inserted']
+    return store
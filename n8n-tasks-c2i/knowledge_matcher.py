@@ -0,0 +1,217 @@
+"""
+Knowledge Matcher for Infy AI
+Matches chat messages to knowledge entries through a token -> entry inverted index
+"""
+import math
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# (document frequency, best (entry_id, weight) pairs)
+Posting = Tuple[int, List[Tuple[int, float]]]
+
+STOP_WORDS = frozenset([
+    'a', 'about', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do',
+    'does', 'for', 'from', 'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of',
+    'on', 'or', 'our', 'please', 'tell', 'that', 'the', 'this', 'to', 'us',
+    'was', 'we', 'what', 'when', 'where', 'which', 'who', 'why', 'will',
+    'with', 'you', 'your'
+])
+
+
+def _stem(token: str) -> str:
+    """Fold simple plurals so 'services' and 'service' share a token"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def phrase_text(text: str) -> str:
+    """Lowercased words of text separated by single spaces, stop words kept"""
+    return ' '.join(TOKEN_PATTERN.findall(text.lower()))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized word tokens without stop words"""
+    return [
+        _stem(token) for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+class KnowledgeMatcher:
+    """Inverted index over (topic, content) knowledge entries"""
+
+    TOPIC_WEIGHT = 3.0
+    KEYWORD_WEIGHT = 3.0
+    CONTENT_WEIGHT = 1.0
+
+    def __init__(self, max_postings: int = 32):
+        # Each token keeps only its best entries, so a lookup costs
+        # O(tokens in message) regardless of how many entries exist
+        self.max_postings = max_postings
+        # (entries, token postings, phrase postings, live entry count); a posting is
+        # (document frequency, best (entry_id, weight) pairs) and idf is applied per
+        # match, so a change re-ranks only the tokens of the entries it touches.
+        # Removed entries stay as None so entry ids never shift.
+        self.state: Tuple[List[Optional[Tuple[str, str]]], Dict[str, Posting], Dict[str, Posting], int] = \
+            ([], {}, {}, 0)
+        # Write side: every weight per token and phrase, the tokens and phrases
+        # of each entry, and the entry id per topic
+        self._weights: Dict[str, Dict[int, float]] = {}
+        self._phrase_weights: Dict[str, Dict[int, float]] = {}
+        self._entry_terms: List[Tuple[Tuple[str, ...], Tuple[str, ...]]] = []
+        self._entry_ids: Dict[str, int] = {}
+        self.version = 0
+
+    @property
+    def entries(self) -> List[Optional[Tuple[str, str]]]:
+        return self.state[0]
+
+    @property
+    def index(self) -> Dict[str, Posting]:
+        return self.state[1]
+
+    def build(self, entries: Iterable[Tuple[str, str]],
+              keywords: Optional[Mapping[str, Iterable[str]]] = None) -> int:
+        """Rebuild the index from (topic, content) pairs and return its version
+
+        keywords maps a topic to extra words that should reach it even though
+        its text never uses them, e.g. 'email' or 'reach' for a contact entry.
+        A keyword made only of stop words, such as 'what is', is matched as a
+        phrase: the message must contain those words in that order.
+        """
+        self.state = ([], {}, {}, 0)
+        self._weights, self._phrase_weights, self._entry_terms, self._entry_ids = {}, {}, [], {}
+        self._apply(entries, (), keywords or {})
+        return self.version
+
+    def extended(self, entries: Iterable[Tuple[str, str]], removed_topics: Iterable[str] = (),
+                 keywords: Optional[Mapping[str, Iterable[str]]] = None) -> 'KnowledgeMatcher':
+        """New matcher with removed_topics dropped and entries added or replaced by topic
+
+        Only the changed entries are tokenized; this matcher is left unchanged.
+        """
+        matcher = KnowledgeMatcher(self.max_postings)
+        matcher.state = self.state
+        matcher._weights, matcher._phrase_weights = self._weights, self._phrase_weights
+        matcher._entry_terms, matcher._entry_ids = self._entry_terms, self._entry_ids
+        matcher.version = self.version
+        matcher._apply(entries, removed_topics, keywords or {})
+        return matcher
+
+    def _apply(self, entries: Iterable[Tuple[str, str]], removed_topics: Iterable[str],
+               keywords: Mapping[str, Iterable[str]]):
+        entry_list, index, phrases, live = self.state
+        entry_list, index, phrases = list(entry_list), dict(index), dict(phrases)
+        weights, phrase_weights = dict(self._weights), dict(self._phrase_weights)
+        entry_terms, entry_ids = list(self._entry_terms), dict(self._entry_ids)
+        # Per-token weight tables are copied before their first change, so
+        # matchers sharing the untouched ones never see this update
+        touched: Dict[str, None] = {}
+        touched_phrases: Dict[str, None] = {}
+
+        def edit(table, touched_keys, key):
+            if key not in touched_keys:
+                table[key] = dict(table.get(key, {}))
+                touched_keys[key] = None
+            return table[key]
+
+        def drop(topic):
+            entry_id = entry_ids.pop(topic, None)
+            if entry_id is None:
+                return 0
+            tokens, entry_phrases = entry_terms[entry_id]
+            for token in tokens:
+                del edit(weights, touched, token)[entry_id]
+            for phrase in entry_phrases:
+                del edit(phrase_weights, touched_phrases, phrase)[entry_id]
+            entry_list[entry_id] = None
+            entry_terms[entry_id] = ((), ())
+            return 1
+
+        for topic in removed_topics:
+            live -= drop(topic)
+
+        for topic, content in entries:
+            live -= drop(topic)
+            entry_id = len(entry_list)
+            token_weights: Dict[str, float] = {}
+            fields = (
+                (topic, self.TOPIC_WEIGHT),
+                (' '.join(keywords.get(topic, ())), self.KEYWORD_WEIGHT),
+                (content or '', self.CONTENT_WEIGHT)
+            )
+            for text, weight in fields:
+                for token in set(tokenize(text)):
+                    token_weights[token] = token_weights.get(token, 0.0) + weight
+            entry_phrases = []
+            for keyword in keywords.get(topic, ()):
+                phrase = phrase_text(keyword)
+                if phrase and not tokenize(phrase) and phrase not in entry_phrases:
+                    entry_phrases.append(phrase)
+
+            for token, weight in token_weights.items():
+                edit(weights, touched, token)[entry_id] = weight
+            for phrase in entry_phrases:
+                edit(phrase_weights, touched_phrases, phrase)[entry_id] = self.KEYWORD_WEIGHT
+            entry_list.append((topic, content))
+            entry_terms.append((tuple(token_weights), tuple(entry_phrases)))
+            entry_ids[topic] = entry_id
+            live += 1
+
+        self._rank(weights, index, touched)
+        self._rank(phrase_weights, phrases, touched_phrases)
+        self._weights, self._phrase_weights = weights, phrase_weights
+        self._entry_terms, self._entry_ids = entry_terms, entry_ids
+        # Swap entries and indexes in one reference so readers never mix versions
+        self.state = (entry_list, index, phrases, live)
+        self.version += 1
+
+    def _rank(self, weights: Dict[str, Dict[int, float]], index: Dict[str, Posting], tokens: Iterable[str]):
+        """Refresh the postings of tokens: best entries first, capped at max_postings"""
+        for token in tokens:
+            postings = weights[token]
+            if not postings:
+                del weights[token]
+                index.pop(token, None)
+                continue
+            ranked = sorted(postings.items(), key=lambda posting: (-posting[1], posting[0]))
+            index[token] = (len(postings), ranked[:self.max_postings])
+
+    def match(self, message: str) -> Optional[Tuple[str, str]]:
+        """Return the best matching (topic, content) entry or None"""
+        entries, index, phrases, live = self.state
+        scores: Dict[int, float] = {}
+
+        def add(posting):
+            document_frequency, best = posting
+            idf = math.log(1.0 + live / document_frequency)
+            for entry_id, weight in best:
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight * idf
+
+        for token in set(tokenize(message)):
+            if token in index:
+                add(index[token])
+        if phrases:
+            padded = f" {phrase_text(message)} "
+            for phrase, posting in phrases.items():
+                if f" {phrase} " in padded:
+                    add(posting)
+
+        if not scores:
+            return None
+
+        best_id = min(scores, key=lambda entry_id: (-scores[entry_id], entry_id))
+        return entries[best_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Get index size statistics"""
+        return {
+            'entries': self.state[3],
+            'tokens': len(self.index),
+            'phrases': len(self.state[2]),
+            'postings': sum(len(best) for _, best in self.index.values()),
+            'version': self.version
+        }
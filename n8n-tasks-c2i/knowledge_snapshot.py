@@ -0,0 +1,374 @@
+"""
+Knowledge Snapshot for Infy AI
+Immutable, versioned view of topics, answers and protocols together with the
+indexes built over them; readers take one reference, writers swap in a new one.
+Admin edits derive the next snapshot from the current one and the changed rows
+only, on a single publisher thread.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+# Imported both as src.services.knowledge_snapshot (admin blueprints) and flat (main.py)
+try:
+    from .bm25_index import BM25Index
+    from .knowledge_matcher import KnowledgeMatcher
+    from .tfidf_index import TfidfIndex
+    from .trigram_index import TrigramIndex
+except ImportError:
+    from bm25_index import BM25Index
+    from knowledge_matcher import KnowledgeMatcher
+    from tfidf_index import TfidfIndex
+    from trigram_index import TrigramIndex
+
+
+def _freeze(item: Dict[str, Any]) -> Mapping[str, Any]:
+    return MappingProxyType(dict(item))
+
+
+def _entry_text(topic: str, content: str, keywords: Mapping[str, Tuple[str, ...]]) -> str:
+    """Indexed text of a knowledge entry: topic, its keywords, then content"""
+    return ' '.join((topic, *keywords.get(topic, ()), content))
+
+
+def _topic_terms(topic: str, keywords: Mapping[str, Tuple[str, ...]]) -> str:
+    """Text typo correction maps back to a topic: its name and keywords, never its content"""
+    return ' '.join((topic, *keywords.get(topic, ())))
+
+
+@dataclass(frozen=True)
+class KnowledgeSnapshot:
+    """Frozen knowledge plus the chat indexes built from it; never mutated after publish"""
+    version: int
+    knowledge_base: Mapping[str, str]
+    content_hashes: Mapping[str, str]  # stored KnowledgeBase.content_hash per topic, where known
+    topic_queries: Tuple[Mapping[str, Any], ...]
+    protocols: Tuple[Mapping[str, Any], ...]
+    keywords: Mapping[str, Tuple[str, ...]]
+    matcher: KnowledgeMatcher = field(repr=False)
+    passages: BM25Index = field(repr=False)
+    semantic: TfidfIndex = field(repr=False)
+    trigrams: TrigramIndex = field(repr=False)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def build(cls, version: int, knowledge_base: Dict[str, str],
+              topic_queries: Iterable[Dict[str, Any]], protocols: Iterable[Dict[str, Any]],
+              keywords: Optional[Mapping[str, Iterable[str]]] = None,
+              content_hashes: Optional[Mapping[str, str]] = None) -> 'KnowledgeSnapshot':
+        """Freeze the data and build every chat index over it"""
+        knowledge_base = MappingProxyType(dict(knowledge_base))
+        content_hashes = MappingProxyType({topic: content_hash
+                                           for topic, content_hash in (content_hashes or {}).items()
+                                           if topic in knowledge_base and content_hash})
+        topic_queries = tuple(_freeze(item) for item in topic_queries)
+        protocols = tuple(_freeze(item) for item in protocols)
+        keywords = MappingProxyType({topic: tuple(words) for topic, words in (keywords or {}).items()})
+
+        matcher = KnowledgeMatcher()
+        matcher.build(knowledge_base.items(), keywords)
+
+        passages = BM25Index()
+        passages.add_documents(
+            (topic, _entry_text(topic, content, keywords), content_hashes.get(topic), content)
+            for topic, content in knowledge_base.items()
+        )
+        passages.freeze()
+
+        # Derived snapshots add delta segments to copies of this index, merged in the background
+        semantic = TfidfIndex()
+        semantic.add_documents(
+            [(('knowledge', topic), _entry_text(topic, content, keywords), content)
+             for topic, content in knowledge_base.items()] +
+            [(('topic_query', item['id']), f"{item['query']} {item['answer']}", item['answer'])
+             for item in topic_queries]
+        )
+        semantic.merge()
+
+        trigrams = TrigramIndex()
+        trigrams.build(
+            [(_topic_terms(topic, keywords), topic) for topic in knowledge_base] +
+            [(_topic_terms(item['topic'], keywords), item['topic']) for item in topic_queries]
+        )
+
+        return cls(
+            version=version,
+            knowledge_base=knowledge_base,
+            content_hashes=content_hashes,
+            topic_queries=topic_queries,
+            protocols=protocols,
+            keywords=keywords,
+            matcher=matcher,
+            passages=passages,
+            semantic=semantic,
+            trigrams=trigrams
+        )
+
+    def derive(self, version: int, knowledge_base: Optional[Mapping[str, str]] = None,
+               content_hashes: Optional[Mapping[str, str]] = None, removed_topics: Iterable[str] = (),
+               topic_queries: Iterable[Dict[str, Any]] = (), query_topics: Iterable[str] = (),
+               keywords: Optional[Mapping[str, Iterable[str]]] = None,
+               protocols: Optional[Iterable[Dict[str, Any]]] = None) -> 'KnowledgeSnapshot':
+        """Next snapshot from this one and the changed parts only
+
+        knowledge_base holds added or edited entries and removed_topics the
+        topics no longer served. topic_queries replace every query of
+        query_topics. keywords replace the keywords of the topics they name;
+        an empty list drops them. Only changed entries are tokenized: BM25 and
+        the trigram index are extended, and the TF-IDF rows land in a delta
+        segment over the shared base. This snapshot is left unchanged.
+        """
+        knowledge_base = dict(knowledge_base or {})
+        content_hashes = content_hashes or {}
+        keywords = {topic: tuple(words) for topic, words in (keywords or {}).items()}
+        query_topics = set(query_topics)
+        removed = {topic for topic in removed_topics if topic in self.knowledge_base and topic not in knowledge_base}
+
+        all_keywords = {topic: words for topic, words in self.keywords.items() if topic not in keywords}
+        all_keywords.update((topic, words) for topic, words in keywords.items() if words)
+        knowledge = {topic: content for topic, content in self.knowledge_base.items() if topic not in removed}
+        # Entries whose keywords changed are re-indexed with their current content
+        changed = {topic: knowledge[topic] for topic in keywords if topic in knowledge}
+        changed.update(knowledge_base)
+        knowledge.update(knowledge_base)
+        hashes = {topic: content_hash for topic, content_hash in self.content_hashes.items()
+                  if topic in knowledge and topic not in knowledge_base}
+        hashes.update((topic, content_hashes[topic]) for topic in knowledge_base if content_hashes.get(topic))
+
+        new_queries = [_freeze(item) for item in topic_queries]
+        dropped_queries = [item for item in self.topic_queries if item['topic'] in query_topics]
+        queries = sorted([item for item in self.topic_queries if item['topic'] not in query_topics] + new_queries,
+                         key=lambda item: item['id'])
+
+        if self._needs_rebuild():
+            return KnowledgeSnapshot.build(version, knowledge, queries,
+                                           self.protocols if protocols is None else protocols,
+                                           all_keywords, hashes)
+
+        all_keywords = MappingProxyType(all_keywords)
+        matcher = self.matcher.extended(changed.items(), removed_topics=removed, keywords=all_keywords)
+        passages = self.passages.extended(
+            ((topic, _entry_text(topic, content, all_keywords), hashes.get(topic), content)
+             for topic, content in changed.items()),
+            removed=removed
+        )
+
+        semantic = self.semantic.copy()
+        semantic.discard([('knowledge', topic) for topic in removed] +
+                         [('topic_query', item['id']) for item in dropped_queries])
+        semantic.add_documents(
+            [(('knowledge', topic), _entry_text(topic, content, all_keywords), content)
+             for topic, content in changed.items()] +
+            [(('topic_query', item['id']), f"{item['query']} {item['answer']}", item['answer'])
+             for item in new_queries]
+        )
+
+        # Trigram values are topics reached from entries and queries alike; every
+        # affected topic is unmapped, then mapped again while anything serves it
+        affected = removed | set(changed) | set(keywords) | {item['topic'] for item in dropped_queries + new_queries}
+        served = set(knowledge) | {item['topic'] for item in queries}
+        trigrams = self.trigrams.extended(
+            [(_topic_terms(topic, all_keywords), topic) for topic in sorted(affected & served)],
+            removed_values=affected
+        )
+
+        return KnowledgeSnapshot(
+            version=version,
+            knowledge_base=MappingProxyType(knowledge),
+            content_hashes=MappingProxyType(hashes),
+            topic_queries=tuple(queries),
+            protocols=self.protocols if protocols is None else tuple(_freeze(item) for item in protocols),
+            keywords=all_keywords,
+            matcher=matcher,
+            passages=passages,
+            semantic=semantic,
+            trigrams=trigrams
+        )
+
+    def _needs_rebuild(self) -> bool:
+        """True once superseded rows outnumber live ones, so a full build reclaims them"""
+        passages, semantic = self.passages.stats(), self.semantic.stats()
+        return passages['superseded_rows'] > max(passages['documents'], 64) or \
+            semantic['superseded_rows'] > max(semantic['documents'], 64)
+
+    def correct(self, message: str) -> str:
+        """Map misspelled words of a chat message to topic names and keywords
+
+        Words the knowledge matcher already indexes are real knowledge words and
+        are left alone.
+        """
+        return self.trigrams.correct(message, known=self.matcher.index)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get snapshot and index statistics"""
+        return {
+            'version': self.version,
+            'created_at': self.created_at.isoformat(),
+            'topics': len(self.knowledge_base),
+            'topic_queries': len(self.topic_queries),
+            'protocols': len(self.protocols),
+            'knowledge_index': self.passages.stats(),
+            'semantic_index': self.semantic.stats(),
+            'knowledge_matcher': self.matcher.stats(),
+            'topic_trigrams': self.trigrams.stats()
+        }
+
+
+class KnowledgeStore:
+    """Holds the current KnowledgeSnapshot; publishing builds a new one and swaps it in"""
+
+    def __init__(self):
+        self._write_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.current: Optional[KnowledgeSnapshot] = None
+
+    def publish(self, knowledge_base: Optional[Dict[str, str]] = None,
+                topic_queries: Optional[Iterable[Dict[str, Any]]] = None,
+                protocols: Optional[Iterable[Dict[str, Any]]] = None,
+                keywords: Optional[Mapping[str, Iterable[str]]] = None,
+                content_hashes: Optional[Mapping[str, str]] = None) -> KnowledgeSnapshot:
+        """Build a snapshot with the given parts replaced and make it current
+
+        content_hashes go with knowledge_base: a new knowledge_base without
+        them is hashed from its content.
+        """
+        with self._write_lock:
+            previous = self.current
+            if content_hashes is None and knowledge_base is None and previous:
+                content_hashes = previous.content_hashes
+            snapshot = KnowledgeSnapshot.build(
+                version=previous.version + 1 if previous else 1,
+                knowledge_base=knowledge_base if knowledge_base is not None else (previous.knowledge_base if previous else {}),
+                topic_queries=topic_queries if topic_queries is not None else (previous.topic_queries if previous else ()),
+                protocols=protocols if protocols is not None else (previous.protocols if previous else ()),
+                keywords=keywords if keywords is not None else (previous.keywords if previous else {}),
+                content_hashes=content_hashes
+            )
+            # A single reference assignment: readers see the old or the new snapshot, never a mix
+            self.current = snapshot
+            return snapshot
+
+    def apply(self, on_publish: Optional[Callable[[KnowledgeSnapshot], Any]] = None,
+              **changes) -> KnowledgeSnapshot:
+        """Derive a snapshot from the current one and changes (see KnowledgeSnapshot.derive) and make it current
+
+        on_publish runs once the new snapshot is current, e.g. to drop cached answers.
+        """
+        with self._write_lock:
+            previous = self.current or KnowledgeSnapshot.build(0, {}, (), ())
+            snapshot = previous.derive(previous.version + 1, **changes)
+            self.current = snapshot
+        if on_publish is not None:
+            on_publish(snapshot)
+        return snapshot
+
+    def submit(self, task: Callable[[], Any]) -> Future:
+        """Run task on the publisher thread; tasks run one at a time in submission order"""
+        with self._write_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='knowledge-publish')
+            future = self._executor.submit(task)
+        future.add_done_callback(_report_failure)
+        return future
+
+
+def _report_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error publishing knowledge snapshot: {future.exception()}")
+
+
+def load_knowledge(session, knowledge_model, topic_query_model) -> Dict[str, Any]:
+    """Read active knowledge entries and topic queries as KnowledgeStore.publish parts
+
+    Entries are keyed by topic; when several active rows share a topic the one
+    with the highest priority, then the newest, is served. The row's stored
+    content_hash travels with it when the model has that column.
+    """
+    knowledge_base = {}
+    content_hashes = {}
+    stored_hash = getattr(knowledge_model, 'content_hash', None)
+    columns = (knowledge_model.topic, knowledge_model.content) + ((stored_hash,) if stored_hash is not None else ())
+    rows = session.query(*columns).filter(
+        knowledge_model.is_active == True
+    ).order_by(knowledge_model.priority, knowledge_model.id)
+    for topic, content, *content_hash in rows:
+        knowledge_base[topic] = content
+        content_hashes[topic] = content_hash[0] if content_hash else None
+
+    topic_queries = [
+        {'id': row.id, 'topic': row.topic, 'query': row.query, 'answer': row.answer}
+        for row in session.query(topic_query_model).filter(
+            topic_query_model.is_active == True
+        ).order_by(topic_query_model.id)
+    ]
+    return {'knowledge_base': knowledge_base, 'content_hashes': content_hashes, 'topic_queries': topic_queries}
+
+
+def load_changes(session, knowledge_model, topic_query_model, topics: Iterable[str] = (),
+                 query_topics: Iterable[str] = ()) -> Dict[str, Any]:
+    """Read the current rows of changed topics as KnowledgeStore.apply changes
+
+    topics are re-read from knowledge_model, with the same winner per topic as
+    load_knowledge; a topic left without an active row is removed. Every
+    active query of query_topics is re-read from topic_query_model. Only the
+    named topics are queried.
+    """
+    topics, query_topics = sorted(set(topics)), sorted(set(query_topics))
+    knowledge_base = {}
+    content_hashes = {}
+    if topics:
+        stored_hash = getattr(knowledge_model, 'content_hash', None)
+        columns = (knowledge_model.topic, knowledge_model.content) + ((stored_hash,) if stored_hash is not None else ())
+        rows = session.query(*columns).filter(
+            knowledge_model.is_active == True,
+            knowledge_model.topic.in_(topics)
+        ).order_by(knowledge_model.priority, knowledge_model.id)
+        for topic, content, *content_hash in rows:
+            knowledge_base[topic] = content
+            content_hashes[topic] = content_hash[0] if content_hash else None
+
+    topic_queries = []
+    if query_topics:
+        topic_queries = [
+            {'id': row.id, 'topic': row.topic, 'query': row.query, 'answer': row.answer}
+            for row in session.query(topic_query_model).filter(
+                topic_query_model.is_active == True,
+                topic_query_model.topic.in_(query_topics)
+            ).order_by(topic_query_model.id)
+        ]
+    return {
+        'knowledge_base': knowledge_base,
+        'content_hashes': content_hashes,
+        'removed_topics': [topic for topic in topics if topic not in knowledge_base],
+        'topic_queries': topic_queries,
+        'query_topics': query_topics
+    }
+
+
+# Shared store of the knowledge snapshot served to chat readers
+knowledge_store = KnowledgeStore()
+
+
+def publish_from_database(session, knowledge_model, topic_query_model,
+                          keywords: Optional[Mapping[str, Iterable[str]]] = None) -> KnowledgeSnapshot:
+    """Build a snapshot from every committed row and make it the one chat reads (startup)"""
+    return knowledge_store.publish(keywords=keywords,
+                                   **load_knowledge(session, knowledge_model, topic_query_model))
+
+
+def publish_changes(app, load: Callable[[], Dict[str, Any]],
+                    on_publish: Optional[Callable[[KnowledgeSnapshot], Any]] = None) -> Future:
+    """Publish the snapshot derived from load()'s changes without blocking the request
+
+    load (e.g. a load_changes call) runs on the publisher thread inside an app
+    context, so it reads the rows as committed when the publish runs and a
+    slow request never overwrites a newer edit with older rows.
+    """
+    def publish():
+        with app.app_context():
+            changes = load()
+        return knowledge_store.apply(on_publish, **changes)
+    return knowledge_store.submit(publish)
@@ -3,10 +3,29 @@ import sys
 import json
 import hashlib
 import random
+import re
+import tempfile
+import threading
+import time
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 
+from analysis_cache import AnalysisCache
+from analysis_jobs import analysis_jobs, check_callback_url
+from chat_stream import StreamTimings, chunk_text, sse_event
+from conversation_log import conversation_log, jsonl_sink
+from dedup_index import domain_dedup
+from domain_aggregates import AggregatedStore, domain_aggregates
+from domain_canonical import canonicalize, protocol_variants
+from domain_ingest import ingest, ingest_upload
+from domain_records import CompactDomainStore
+from knowledge_matcher import tokenize
+from knowledge_snapshot import knowledge_store
+from response_cache import normalize_message, response_cache
+from session_store import session_store
+from sitemap_fetcher import sitemap_fetcher
+
 # Initialize Flask app
 app = Flask(__name__, static_folder='../static', static_url_path='/static')
 
@@ -18,40 +37,207 @@ CORS(app, origins="*")
 # In production, this would be replaced with a proper database
 data_store = {
     'admin_codes': ['SECOINFI2024'],
-    'knowledge_base': {
+    # Domain results live as columns keyed by canonical id and decode to dicts
+    # on access; every write also updates domain_aggregates
+    'domains': AggregatedStore(domain_aggregates, CompactDomainStore()),
+    'batches': [],
+    'protocol_usage': {}
+}
+protocol_usage_lock = threading.Lock()
+
+# Number of ranked passages returned alongside each chat answer
+CHAT_TOP_K = 3
+
+# Minimum TF-IDF similarity for a stored topic query to answer directly
+TOPIC_QUERY_MIN_SCORE = 0.45
+
+# Maximum characters per streamed answer chunk
+STREAM_CHUNK_CHARS = 240
+
+# Maximum number of messages accepted by the batch chat endpoint
+CHAT_BATCH_MAX_ITEMS = 1000
+
+# Messages with at most this many content words may be read as follow-ups
+# to the previous question in the same session ("tell me more", "and pricing?")
+# when they match nothing on their own or carry a follow-up cue
+FOLLOW_UP_MAX_TOKENS = 3
+FOLLOW_UP_CUE_WORDS = frozenset(['it', 'its', 'that', 'this', 'they', 'them', 'those', 'these', 'more'])
+FOLLOW_UP_CUE_PREFIXES = ('what about', 'how about', 'and', 'also')
+WORD_PATTERN = re.compile(r"[a-z']+")
+
+# Rows handed to storage at a time by the streaming bulk upload
+BULK_UPLOAD_CHUNK_SIZE = 1000
+
+# Seconds analyze_domain waits for a live sitemap probe
+SITEMAP_PROBE_TIMEOUT = 30
+
+# Stored analyses younger than this are served as is; older ones within the
+# stale window are served while a background re-analysis runs
+ANALYSIS_FRESH_SECONDS = int(os.environ.get('ANALYSIS_FRESH_SECONDS', 3600))
+ANALYSIS_STALE_SECONDS = int(os.environ.get('ANALYSIS_STALE_SECONDS', 7 * 86400))
+
+# Seconds a bulk analysis job waits for one chunk's sitemap probes
+ANALYSIS_JOB_CHUNK_TIMEOUT = 120
+
+# Session id used by clients that do not send one; it carries no context
+ANONYMOUS_SESSION_ID = 'default'
+
+# JSON-lines file the conversation log flushes chat exchanges to when no
+# database is configured; kept out of the source tree by default
+CONVERSATION_LOG_PATH = os.environ.get('CONVERSATION_LOG_PATH',
+                                       os.path.join(tempfile.gettempdir(), 'infy-conversations.jsonl'))
+
+stream_timings = StreamTimings()
+analysis_cache = AnalysisCache(data_store['domains'], fresh_seconds=ANALYSIS_FRESH_SECONDS,
+                               stale_seconds=ANALYSIS_STALE_SECONDS)
+
+# The dedup index guards this in-memory store, so it starts from the store's
+# contents rather than from whatever an earlier process left on disk
+domain_dedup.rebuild(record['full_url'] for record in data_store['domains'].values())
+
+# The flat conversation_log module is a different object from the
+# src.services one; database_init attaches the ConversationLog sink to both,
+# so the file only serves when no database was initialised first
+if conversation_log.sink is None:
+    conversation_log.start(jsonl_sink(CONVERSATION_LOG_PATH))
+
+def publish_knowledge(**parts):
+    """Swap in a new knowledge snapshot (knowledge_base, keywords, topic_queries, protocols)"""
+    snapshot = knowledge_store.publish(**parts)
+    response_cache.invalidate()
+    return snapshot
+
+# Knowledge is read-only for request threads: topics, answers and protocols
+# live in an immutable snapshot that writers replace through publish_knowledge
+publish_knowledge(
+    knowledge_base={
         'SECOINFI': 'SECOINFI is a blockchain business development company led by CEO Dileep Kumar D. We provide comprehensive blockchain services, domain analysis, and AI-powered solutions for businesses looking to integrate blockchain technology.',
         'Services': 'SECOINFI offers blockchain development, smart contract creation, domain analysis and ranking, SEO optimization, and AI voice assistant services. We help businesses leverage blockchain technology for growth and innovation.',
         'Domain Analysis': 'Our domain analysis service provides comprehensive insights including domain authority, page authority, sitemap analysis, search engine indexing status, and link submission tracking. We support multiple protocols and can process thousands of domains in bulk.',
         'Contact': 'CEO: Dileep Kumar D, Phone/WhatsApp: +91 9620058644, Website: seco.in.net, Metamask: 0x4a100E184ac1f17491Fbbcf549CeBfB676694eF7'
     },
-    'protocols': [
+    # Words that should reach a topic although its text does not use them
+    keywords={
+        'SECOINFI': ['secoinfi', 'company', 'what is'],
+        'Services': ['service', 'offer', 'provide'],
+        'Domain Analysis': ['domain', 'analysis', 'ranking'],
+        'Contact': ['contact', 'phone', 'email', 'reach']
+    },
+    topic_queries=[
+        {'id': 1, 'topic': 'SECOINFI Services', 'query': 'What services does SECOINFI provide?', 'answer': 'SECOINFI provides blockchain development, smart contract creation, domain analysis, SEO optimization, and AI voice assistant services.'},
+        {'id': 2, 'topic': 'Domain Analysis', 'query': 'How does domain analysis work?', 'answer': 'Our domain analysis examines domain authority, page authority, sitemap structure, search engine indexing, and provides comprehensive SEO insights.'},
+        {'id': 3, 'topic': 'Contact Information', 'query': 'How can I contact SECOINFI?', 'answer': 'You can contact CEO Dileep Kumar D at +91 9620058644 or visit our website at seco.in.net'}
+    ],
+    protocols=[
         {'protocol': 'http://', 'description': 'Standard HTTP protocol'},
         {'protocol': 'https://', 'description': 'Secure HTTPS protocol'},
         {'protocol': 'http://www.', 'description': 'HTTP with www subdomain'},
         {'protocol': 'https://www.', 'description': 'HTTPS with www subdomain'},
         {'protocol': 'wsl://', 'description': 'Windows Subsystem for Linux protocol'},
         {'protocol': 'upi://', 'description': 'Unified Payments Interface protocol'}
-    ],
-    'conversations': [],
-    'domains': {},
-    'batches': []
-}
+    ]
+)
 
-def find_knowledge_response(message):
+def find_knowledge_response(message, snapshot=None):
     """Find relevant response from knowledge base"""
-    message_lower = message.lower()
+    snapshot = snapshot or knowledge_store.current
+    entry = snapshot.matcher.match(message)
+    if entry:
+        return entry[1]
+    return "I'm Infy, your AI assistant for SECOINFI! I can help you with blockchain services, domain analysis, and more. How can I assist you today?"
+
+def answer_message(message, snapshot):
+    """Resolve a chat message to (response, sources) against one knowledge snapshot"""
+    # Speech-to-text misspellings ("secoinfy", "domane") are mapped to known terms
+    query = snapshot.correct(message)
     
-    # Check for specific keywords
-    if any(word in message_lower for word in ['secoinfi', 'company', 'what is']):
-        return data_store['knowledge_base']['SECOINFI']
-    elif any(word in message_lower for word in ['service', 'offer', 'provide']):
-        return data_store['knowledge_base']['Services']
-    elif any(word in message_lower for word in ['domain', 'analysis', 'ranking']):
-        return data_store['knowledge_base']['Domain Analysis']
-    elif any(word in message_lower for word in ['contact', 'phone', 'email', 'reach']):
-        return data_store['knowledge_base']['Contact']
+    # A close match on a stored topic query answers directly; otherwise
+    # rank passages and fall back to the topic matcher when nothing scores
+    matches = snapshot.passages.search(query, top_k=CHAT_TOP_K)
+    similar = snapshot.semantic.search(query, top_k=1)
+    if similar and similar[0]['doc_id'][0] == 'topic_query' and similar[0]['score'] >= TOPIC_QUERY_MIN_SCORE:
+        response = similar[0]['passage']
+    elif matches:
+        response = matches[0]['passage']
     else:
-        return "I'm Infy, your AI assistant for SECOINFI! I can help you with blockchain services, domain analysis, and more. How can I assist you today?"
+        response = find_knowledge_response(query, snapshot)
+    
+    sources = [{
+        'topic': match['doc_id'],
+        'score': match['score'],
+        'content_hash': match['content_hash']
+    } for match in matches]
+    return response, sources
+
+def session_history(session_id):
+    """Recent (user_query, infy_response) turns of a session, oldest first"""
+    if session_id == ANONYMOUS_SESSION_ID:
+        return []
+    return session_store.get(session_id)
+
+def has_follow_up_cue(message):
+    """True for messages that point back at the previous turn ("what about it?", "and pricing")"""
+    words = WORD_PATTERN.findall(message.lower())
+    text = ' '.join(words)
+    return any(word in FOLLOW_UP_CUE_WORDS for word in words) or \
+        any(text == prefix or text.startswith(f"{prefix} ") for prefix in FOLLOW_UP_CUE_PREFIXES)
+
+def matches_knowledge(message, snapshot):
+    """True when the message alone reaches a passage or topic"""
+    query = snapshot.correct(message)
+    return bool(snapshot.passages.search(query, top_k=1)) or snapshot.matcher.match(query) is not None
+
+def contextual_message(message, history, snapshot=None):
+    """Prefix a short follow-up with the session's previous question for retrieval
+
+    Only messages that match nothing by themselves, or that carry a follow-up
+    cue, are read as follow-ups; "domain analysis" after "services" is a new
+    question.
+    """
+    if not history or len(tokenize(message)) > FOLLOW_UP_MAX_TOKENS:
+        return message
+    if not has_follow_up_cue(message) and matches_knowledge(message, snapshot or knowledge_store.current):
+        return message
+    return f"{history[-1][0]} {message}"
+
+def pin_knowledge():
+    """(snapshot, cache generation) read together for answering against one snapshot
+
+    The generation is read first: publish_knowledge swaps the snapshot before
+    invalidating the cache, so an answer from a snapshot replaced after this
+    point is never stored.
+    """
+    generation = response_cache.generation
+    return knowledge_store.current, generation
+
+def get_chat_answer(message, pinned=None):
+    """Resolve a chat message through the response cache: (response, sources, cached)
+
+    pinned is a pin_knowledge() pair shared by several answers; by default the
+    current snapshot is pinned for this message alone.
+    """
+    snapshot, generation = pinned or pin_knowledge()
+    cache_key = normalize_message(message)
+    # Cached answers belong to the current generation; a request pinned to an
+    # older snapshot computes its own
+    cached = response_cache.get(cache_key) if generation == response_cache.generation else None
+    if cached is not None:
+        return cached[0], cached[1], True
+    
+    response, sources = answer_message(message, snapshot)
+    response_cache.set(cache_key, (response, sources), generation=generation)
+    return response, sources, False
+
+def log_conversation(session_id, message, response):
+    """Queue a chat exchange; written to ConversationLog in batches off the request path"""
+    conversation_log.append({
+        'session_id': session_id,
+        'user_query': message,
+        'infy_response': response,
+        'timestamp': datetime.utcnow()
+    })
+    if session_id != ANONYMOUS_SESSION_ID:
+        session_store.append(session_id, message, response)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -78,20 +264,16 @@ def infy_chat():
         if not message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Find response
-        response = find_knowledge_response(message)
-        
-        # Log conversation
-        conversation = {
-            'session_id': session_id,
-            'user_message': message,
-            'bot_response': response,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        data_store['conversations'].append(conversation)
+        pinned = pin_knowledge()
+        query = contextual_message(message, session_history(session_id), pinned[0])
+        response, sources, cached = get_chat_answer(query, pinned)
+        log_conversation(session_id, message, response)
         
         return jsonify({
             'response': response,
+            'sources': sources,
+            'cached': cached,
+            'contextual': query != message,
             'timestamp': datetime.utcnow().isoformat(),
             'session_id': session_id
         })
@@ -99,6 +281,149 @@ def infy_chat():
     except Exception as e:
         return jsonify({'error': f'Chat error: {str(e)}'}), 500
 
+@app.route('/api/infy/chat/batch', methods=['POST'])
+def infy_chat_batch():
+    """Answer many chat messages in one request, preserving order"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        items = data.get('messages')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'messages must be a non-empty array'}), 400
+        
+        if len(items) > CHAT_BATCH_MAX_ITEMS:
+            return jsonify({'error': f'At most {CHAT_BATCH_MAX_ITEMS} messages per batch'}), 413
+        
+        results = []
+        rows = []
+        answers = {}  # identical questions in one batch are resolved once
+        now = datetime.utcnow()
+        pinned = pin_knowledge()  # every item sees the same knowledge
+        snapshot = pinned[0]
+        
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Item must be an object with message and session_id')
+                message = str(item.get('message', '')).strip()
+                session_id = item.get('session_id', 'default')
+                if not message:
+                    raise ValueError('Message is required')
+                
+                key = normalize_message(message)
+                if key not in answers:
+                    answers[key] = get_chat_answer(message, pinned)
+                response, sources, cached = answers[key]
+                
+                rows.append({
+                    'session_id': session_id,
+                    'user_query': message,
+                    'infy_response': response,
+                    'timestamp': now
+                })
+                results.append({
+                    'index': index,
+                    'session_id': session_id,
+                    'response': response,
+                    'sources': sources,
+                    'cached': cached
+                })
+            except Exception as e:
+                results.append({'index': index, 'error': str(e)})
+        
+        # One queue operation; the flusher writes the rows with a bulk insert
+        conversation_log.extend(rows)
+        
+        return jsonify({
+            'responses': results,
+            'count': len(results),
+            'failed': len(results) - len(rows),
+            'knowledge_version': snapshot.version,
+            'timestamp': now.isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Batch chat error: {str(e)}'}), 500
+
+@app.route('/api/infy/chat/stream', methods=['POST'])
+def infy_chat_stream():
+    """Streaming chat endpoint: the answer is sent in chunks as Server-Sent Events"""
+    started = time.perf_counter()
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+            
+        message = data.get('message', '').strip()
+        session_id = data.get('session_id', 'default')
+        
+        if not message:
+            return jsonify({'error': 'Message is required'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Chat error: {str(e)}'}), 500
+    
+    def generate():
+        try:
+            # Acknowledge before answering so the client sees the first byte
+            # without waiting on retrieval
+            yield sse_event('start', {'session_id': session_id})
+            first_event_ms = (time.perf_counter() - started) * 1000
+            
+            pinned = pin_knowledge()
+            query = contextual_message(message, session_history(session_id), pinned[0])
+            response, sources, cached = get_chat_answer(query, pinned)
+            yield sse_event('meta', {
+                'session_id': session_id,
+                'topic': sources[0]['topic'] if sources else None,
+                'sources': sources,
+                'cached': cached,
+                'contextual': query != message
+            })
+            
+            first_chunk_ms = None
+            for chunk in chunk_text(response, STREAM_CHUNK_CHARS):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                yield sse_event('chunk', {'text': chunk})
+            
+            total_ms = (time.perf_counter() - started) * 1000
+            first_chunk_ms = total_ms if first_chunk_ms is None else first_chunk_ms
+            stream_timings.record(first_chunk_ms, total_ms, first_event_ms)
+            log_conversation(session_id, message, response)
+            
+            yield sse_event('done', {
+                'first_event_ms': round(first_event_ms, 3),
+                'first_chunk_ms': round(first_chunk_ms, 3),
+                'total_ms': round(total_ms, 3),
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            yield sse_event('error', {'error': f'Chat error: {str(e)}'})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/infy/stats', methods=['GET'])
+def infy_stats():
+    """Chat subsystem counters"""
+    try:
+        return jsonify({
+            'conversation_log': conversation_log.stats(),
+            'response_cache': response_cache.stats(),
+            'streaming': stream_timings.stats(),
+            'sessions': session_store.stats(),
+            'sitemap_fetcher': sitemap_fetcher.stats(),
+            'analysis_cache': analysis_cache.stats(),
+            'domain_records': data_store['domains'].store.stats(),
+            'knowledge': knowledge_store.current.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': f'Stats error: {str(e)}'}), 500
+
 @app.route('/api/admin/authenticate', methods=['POST'])
 def admin_authenticate():
     """Admin authentication endpoint"""
@@ -127,6 +452,65 @@ def admin_authenticate():
     except Exception as e:
         return jsonify({'error': f'Authentication error: {str(e)}'}), 500
 
+def sitemap_summary(probe):
+    """Sitemap section of an analysis from a fetcher probe; None when nothing was probed"""
+    if probe is None:
+        return {'found': False, 'url': None, 'pages_count': 0}
+    if isinstance(probe, Exception):
+        return {'found': False, 'url': None, 'pages_count': 0, 'error': str(probe) or type(probe).__name__}
+    return {'found': probe['found'], 'url': probe['url'], 'pages_count': probe['pages_count']}
+
+def probe_sitemap(url):
+    """Look up a site's sitemap over the shared connection pool"""
+    if not url.startswith(('http://', 'https://')):
+        return sitemap_summary(None)
+    return sitemap_summary(sitemap_fetcher.probe_blocking([url], timeout=SITEMAP_PROBE_TIMEOUT)[0])
+
+def run_domain_analysis(canonical, sitemap=None):
+    """Analyze one canonical domain; stored by analysis_cache under its key"""
+    return {
+        'domain': canonical.key,
+        'domain_id': canonical.id,
+        'protocol': canonical.protocol,
+        'full_url': canonical.url,
+        'ranking': {
+            'domain_authority': random.randint(20, 95),
+            'page_authority': random.randint(15, 85)
+        },
+        'sitemap': sitemap if sitemap is not None else probe_sitemap(canonical.url),
+        'indexing': {
+            'google_indexed': random.choice([True, False]),
+            'bing_indexed': random.choice([True, False])
+        },
+        'status': 'completed',
+        'analyzed_at': datetime.utcnow().isoformat()
+    }
+
+def analyze_domain_chunk(domain_keys):
+    """Analyze a chunk of stored domains for a bulk job, probing their sitemaps concurrently"""
+    domains = data_store['domains']
+    canonicals = []
+    for domain_key in domain_keys:
+        try:
+            canonicals.append(canonicalize(domain_key, domains.get(domain_key, {}).get('protocol')))
+        except ValueError as e:
+            canonicals.append(e)
+    urls = [canonical.url for canonical in canonicals
+            if not isinstance(canonical, Exception) and canonical.url.startswith(('http://', 'https://'))]
+    probes = dict(zip(urls, sitemap_fetcher.probe_blocking(urls, timeout=ANALYSIS_JOB_CHUNK_TIMEOUT)))
+    
+    results = []
+    for domain_key, canonical in zip(domain_keys, canonicals):
+        if isinstance(canonical, Exception):
+            results.append(canonical)
+            continue
+        result = run_domain_analysis(canonical, sitemap_summary(probes.get(canonical.url)))
+        domains[domain_key] = result
+        results.append(result)
+    return results
+
+analysis_jobs.start(analyze_domain_chunk)
+
 @app.route('/api/domain/analyze', methods=['POST'])
 def analyze_domain():
     """Domain analysis endpoint"""
@@ -141,50 +525,115 @@ def analyze_domain():
         if not domain:
             return jsonify({'error': 'Domain is required'}), 400
         
-        full_url = f"{protocol}{domain}"
-        domain_key = f"{protocol}{domain}"
+        try:
+            canonical = canonicalize(domain, protocol or None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Check if already analyzed
-        if domain_key in data_store['domains']:
-            analysis_result = data_store['domains'][domain_key]
-        else:
-            # Simulate analysis
-            analysis_result = {
-                'domain': domain,
-                'protocol': protocol,
-                'full_url': full_url,
-                'ranking': {
-                    'domain_authority': random.randint(20, 95),
-                    'page_authority': random.randint(15, 85)
-                },
-                'sitemap': {
-                    'found': random.choice([True, False]),
-                    'pages_count': random.randint(10, 1000)
-                },
-                'indexing': {
-                    'google_indexed': random.choice([True, False]),
-                    'bing_indexed': random.choice([True, False])
-                },
-                'status': 'completed',
-                'analyzed_at': datetime.utcnow().isoformat()
-            }
-            
-            # Store result
-            data_store['domains'][domain_key] = analysis_result
+        # Spelling variants of one domain (case, www, trailing dot or slash,
+        # default port, punycode) share a single key and analysis
+        analysis_result, cache_state = analysis_cache.get(canonical.key, lambda: run_domain_analysis(canonical))
         
-        return jsonify({'analysis': analysis_result})
+        return jsonify({
+            'analysis': analysis_result,
+            'cache': {'state': cache_state, 'age_seconds': round(analysis_cache.age(analysis_result) or 0.0, 3)}
+        })
         
     except Exception as e:
         return jsonify({'error': f'Domain analysis error: {str(e)}'}), 500
 
+@app.route('/api/domain/analyze/protocols', methods=['POST'])
+def analyze_domain_protocols():
+    """Probe every active protocol variant of a domain in one call"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        domain = data.get('domain', '').strip()
+        if not domain:
+            return jsonify({'error': 'Domain is required'}), 400
+        
+        protocols = [protocol['protocol'] for protocol in knowledge_store.current.protocols
+                     if protocol.get('is_active', True)]
+        try:
+            variants = protocol_variants(domain, protocols)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        fanout = sitemap_fetcher.probe_variants_blocking(
+            [[(protocol, canonical.url) for protocol, canonical in variants]], timeout=SITEMAP_PROBE_TIMEOUT)[0]
+        if isinstance(fanout, Exception):
+            raise fanout
+        
+        # One locked update for every probed protocol instead of a write per probe
+        with protocol_usage_lock:
+            usage = data_store['protocol_usage']
+            for protocol in fanout['probed']:
+                usage[protocol] = usage.get(protocol, 0) + 1
+        
+        canonical = variants[0][1] if variants else canonicalize(domain)
+        return jsonify({'analysis': dict(fanout, domain=canonical.key, domain_id=canonical.id)})
+        
+    except Exception as e:
+        return jsonify({'error': f'Protocol analysis error: {str(e)}'}), 500
+
 @app.route('/api/domain/protocols', methods=['GET'])
 def get_protocols():
     """Get available protocols"""
     try:
-        return jsonify({'protocols': data_store['protocols']})
+        protocols = knowledge_store.current.protocols
+        usage = data_store['protocol_usage']
+        return jsonify({'protocols': [dict(protocol, usage_count=usage.get(protocol['protocol'], 0))
+                                      for protocol in protocols]})
     except Exception as e:
         return jsonify({'error': f'Protocols error: {str(e)}'}), 500
 
+def store_queued_domains(rows, stored_keys=None):
+    """Queue a chunk of new (domain key, protocol) rows for analysis; stored results are kept"""
+    domains = data_store['domains']
+    queued_at = datetime.utcnow().isoformat()
+    stored = 0
+    for domain_key, protocol in rows:
+        if domain_key not in domains:
+            domains[domain_key] = {
+                'domain': domain_key,
+                'protocol': protocol,
+                'full_url': f"{protocol}{domain_key}",
+                'status': 'queued',
+                'queued_at': queued_at
+            }
+            stored += 1
+            if stored_keys is not None:
+                stored_keys.append(domain_key)
+    return stored
+
+def callback_url_error(callback_url):
+    """Why a callback URL is refused, or None; its host is resolved and checked only when the callback is sent"""
+    if callback_url is None:
+        return None
+    try:
+        check_callback_url(callback_url)
+    except ValueError as e:
+        return str(e)
+    return None
+
+def submit_analysis_job(batch, domain_keys, callback_url):
+    """Register a bulk batch and start analyzing its queued domains in the background"""
+    batch.update(processed_domains=0, failed_domains=0, progress_percentage=0.0, status='queued')
+    data_store['batches'].append(batch)
+    job = analysis_jobs.submit(domain_keys, batch, callback_url)
+    return {'job': job.snapshot(), 'status_url': f"/api/domain/jobs/{job.id}"}
+
+def uploaded_domain_rows(domains_data):
+    """Yield (domain, protocol) pairs from the JSON bulk upload's domains_data"""
+    for domain_info in domains_data:
+        if isinstance(domain_info, dict):
+            yield str(domain_info.get('domain', '')), domain_info.get('protocol')
+        else:
+            print(f"Error processing domain {domain_info}: expected an object")
+            yield '', None
+
 @app.route('/api/domain/bulk-upload', methods=['POST'])
 def bulk_upload_domains():
     """Bulk domain upload endpoint"""
@@ -200,50 +649,106 @@ def bulk_upload_domains():
         if not domains_data:
             return jsonify({'error': 'Domains data is required'}), 400
         
-        # Create batch record
+        callback_url = data.get('callback_url')
+        error = callback_url_error(callback_url)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Normalize and drop domains already queued by any earlier upload
+        queued_keys = []
+        counts = ingest(
+            uploaded_domain_rows(domains_data),
+            lambda rows: store_queued_domains(rows, queued_keys),
+            chunk_size=BULK_UPLOAD_CHUNK_SIZE,
+            dedup=domain_dedup
+        )
+        
         batch = {
             'id': len(data_store['batches']) + 1,
             'batch_name': batch_name,
-            'total_domains': len(domains_data),
-            'processed_domains': 0,
-            'status': 'processing',
+            'file_type': file_type,
+            'total_domains': len(queued_keys),
             'created_at': datetime.utcnow().isoformat()
         }
+        job = submit_analysis_job(batch, queued_keys, callback_url)
         
-        # Process domains
-        processed_count = 0
-        for domain_info in domains_data:
-            try:
-                domain = domain_info.get('domain', '').strip()
-                protocol = domain_info.get('protocol', 'https://').strip()
-                
-                if domain:
-                    domain_key = f"{protocol}{domain}"
-                    if domain_key not in data_store['domains']:
-                        data_store['domains'][domain_key] = {
-                            'domain': domain,
-                            'protocol': protocol,
-                            'full_url': f"{protocol}{domain}",
-                            'status': 'queued',
-                            'queued_at': datetime.utcnow().isoformat()
-                        }
-                        processed_count += 1
-            except Exception as e:
-                print(f"Error processing domain {domain_info}: {e}")
+        # Analysis runs in the background; poll status_url for progress
+        return jsonify(dict(job, message=f'Queued {len(queued_keys)} domains for analysis',
+                            batch=batch, ingest=counts)), 202
+        
+    except Exception as e:
+        return jsonify({'error': f'Bulk upload error: {str(e)}'}), 500
+
+@app.route('/api/domain/bulk-upload/stream', methods=['POST'])
+def bulk_upload_domains_stream():
+    """Streaming bulk upload: raw CSV or NDJSON body, optionally gzip-compressed"""
+    try:
+        batch_name = request.args.get('batch_name', f'Batch_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}')
+        default_protocol = request.args.get('protocol', 'https://').strip()
+        callback_url = request.args.get('callback_url')
+        error = callback_url_error(callback_url)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Update batch
-        batch['processed_domains'] = processed_count
-        batch['status'] = 'completed'
-        data_store['batches'].append(batch)
+        # The body is parsed as it arrives; it is never loaded whole
+        queued_keys = []
+        counts = ingest_upload(
+            request.stream,
+            lambda rows: store_queued_domains(rows, queued_keys),
+            content_type=request.content_type,
+            content_encoding=request.headers.get('Content-Encoding'),
+            file_format=request.args.get('format'),
+            chunk_size=BULK_UPLOAD_CHUNK_SIZE,
+            default_protocol=default_protocol,
+            dedup=domain_dedup
+        )
         
-        return jsonify({
-            'message': f'Successfully queued {processed_count} domains for analysis',
-            'batch': batch
-        })
+        batch = {
+            'id': len(data_store['batches']) + 1,
+            'batch_name': batch_name,
+            'file_type': counts['format'],
+            'total_domains': len(queued_keys),
+            'created_at': datetime.utcnow().isoformat()
+        }
+        job = submit_analysis_job(batch, queued_keys, callback_url)
+        
+        return jsonify(dict(job, message=f"Queued {len(queued_keys)} domains for analysis",
+                            batch=batch, ingest=counts)), 202
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Bulk upload error: {str(e)}'}), 500
 
+@app.route('/api/domain/stats', methods=['GET'])
+def get_domain_stats():
+    """Authority distribution, indexing and sitemap shares, status and protocol counts"""
+    try:
+        return jsonify({'stats': domain_aggregates.stats()})
+    except Exception as e:
+        return jsonify({'error': f'Domain stats error: {str(e)}'}), 500
+
+@app.route('/api/domain/jobs', methods=['GET'])
+def list_analysis_jobs():
+    """Recent bulk analysis jobs, newest first"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 1000)
+        return jsonify({'jobs': [job.snapshot() for job in analysis_jobs.recent(limit)],
+                        'stats': analysis_jobs.stats()})
+    except Exception as e:
+        return jsonify({'error': f'Jobs error: {str(e)}'}), 500
+
+@app.route('/api/domain/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Poll a bulk analysis job: progress, throughput and ETA"""
+    try:
+        job = analysis_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'job': job.snapshot(), 'batch': job.batch})
+    except Exception as e:
+        return jsonify({'error': f'Job status error: {str(e)}'}), 500
+
 @app.route('/', methods=['GET'])
 def serve_frontend():
     """Serve frontend or API info"""
@@ -263,10 +768,18 @@ def serve_frontend():
         'api_endpoints': [
             '/api/health',
             '/api/infy/chat',
+            '/api/infy/chat/batch',
+            '/api/infy/chat/stream',
+            '/api/infy/stats',
             '/api/admin/authenticate',
             '/api/domain/analyze',
+            '/api/domain/analyze/protocols',
             '/api/domain/protocols',
-            '/api/domain/bulk-upload'
+            '/api/domain/bulk-upload',
+            '/api/domain/bulk-upload/stream',
+            '/api/domain/stats',
+            '/api/domain/jobs',
+            '/api/domain/jobs/<job_id>'
         ],
         'timestamp': datetime.utcnow().isoformat()
     })
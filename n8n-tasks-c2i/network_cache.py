@@ -0,0 +1,226 @@
+"""
+Network Caches for Infy AI
+DNS and robots.txt caches shared by every domain probe, with TTLs, a size
+bound, negative caching of failures and single-flight lookups, so protocol
+variants of one domain cost one resolution and one robots.txt fetch.
+Hosts resolving to an address on this machine or a private network are refused
+"""
+import asyncio
+import ipaddress
+import socket
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from aiohttp.abc import AbstractResolver, ResolveResult
+from aiohttp.resolver import DefaultResolver
+
+# Imported both as src.services.network_cache (scheduler) and flat (main.py)
+try:
+    from .response_cache import ResponseCache
+except ImportError:
+    from response_cache import ResponseCache
+
+ROBOTS_MAX_BYTES = 500 * 1024  # parse limit from RFC 9309
+
+Fetch = Callable[[str], Awaitable[Tuple[int, bytes]]]
+
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is globally routable, i.e. not loopback, private, link-local or reserved"""
+    try:
+        # Scoped IPv6 addresses come back as fe80::1%eth0
+        parsed = ipaddress.ip_address(address.split('%', 1)[0])
+    except ValueError:
+        return False
+    if parsed.version == 6 and parsed.ipv4_mapped is not None:
+        parsed = parsed.ipv4_mapped
+    return parsed.is_global
+
+
+class NonPublicAddressError(OSError):
+    """A host resolves to an address on this machine or a private network"""
+
+
+def _fresh_error(error: Exception) -> Exception:
+    # Raising a cached instance again would keep growing its traceback
+    return error.with_traceback(None)
+
+
+class CachingResolver(AbstractResolver):
+    """aiohttp resolver caching addresses per host; ports are filled in per request
+
+    A host with any non-public address fails like an unresolvable one, so
+    probes of stored domains cannot reach this machine or its network.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0, negative_ttl_seconds: float = 30.0,
+                 resolver: Optional[AbstractResolver] = None):
+        self.cache = ResponseCache(max_entries, ttl_seconds)
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._resolver = resolver
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        self.requests = 0
+        self.lookups = 0
+        self.failures = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.blocked = 0
+
+    async def _lookup(self, key: str, host: str, family: int) -> Any:
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self.lookups += 1
+        try:
+            result = await self._resolver.resolve(host, 0, family)
+            blocked = [address['host'] for address in result if not is_public_address(address['host'])]
+            if blocked:
+                self.blocked += 1
+                raise NonPublicAddressError(f"{host} resolves to non-public address {blocked[0]}")
+            self.cache.set(key, result)
+        except OSError as e:
+            self.failures += 1
+            result = e
+            self.cache.set(key, result, ttl_seconds=self.negative_ttl_seconds)
+        except BaseException:
+            future.cancel()  # waiters must not hang on a cancelled lookup
+            raise
+        finally:
+            del self._pending[key]
+        future.set_result(result)
+        return result
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> List[ResolveResult]:
+        self.requests += 1
+        key = f"{int(family)}:{host.lower()}"
+        result = self.cache.get(key)
+        if result is None:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                result = await asyncio.shield(pending)
+            else:
+                result = await self._lookup(key, host, family)
+        elif isinstance(result, Exception):
+            self.negative_hits += 1
+        if isinstance(result, Exception):
+            raise _fresh_error(result)
+        return [dict(address, port=port) for address in result]
+
+    async def close(self) -> None:
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get lookup counters; hit_ratio counts every request served without a lookup"""
+        cache = self.cache.stats()
+        return {
+            'entries': cache['entries'],
+            'max_entries': cache['max_entries'],
+            'ttl_seconds': cache['ttl_seconds'],
+            'negative_ttl_seconds': self.negative_ttl_seconds,
+            'requests': self.requests,
+            'lookups': self.lookups,
+            'failures': self.failures,
+            'negative_hits': self.negative_hits,
+            'coalesced': self.coalesced,
+            'blocked': self.blocked,
+            'hit_ratio': round(1 - self.lookups / self.requests, 4) if self.requests else 0.0,
+            'evictions': cache['evictions'],
+            'expirations': cache['expirations']
+        }
+
+
+class RobotsCache:
+    """Parsed robots.txt per host:port, shared by the http/https variants of a site"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0, negative_ttl_seconds: float = 300.0):
+        self.cache = ResponseCache(max_entries, ttl_seconds)
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        self.requests = 0
+        self.fetches = 0
+        self.failures = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Cache key: the URL's host and port, ignoring scheme"""
+        return urlsplit(url).netloc.lower()
+
+    async def _load(self, key: str, robots_url: str, fetch: Fetch) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self.fetches += 1
+        ttl = None
+        try:
+            status, body = await fetch(robots_url)
+            result = RobotFileParser(robots_url)
+            if status == 200:
+                result.parse(body[:ROBOTS_MAX_BYTES].decode('utf-8', errors='replace').splitlines())
+            elif 400 <= status < 500:
+                result.allow_all = True  # no robots.txt: everything allowed, no sitemaps declared
+            else:
+                # Server errors are cached briefly as allow-all so a flaky host is retried soon
+                result.allow_all = True
+                ttl = self.negative_ttl_seconds
+        except Exception as e:
+            self.failures += 1
+            result = e
+            ttl = self.negative_ttl_seconds
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._pending[key]
+        self.cache.set(key, result, ttl_seconds=ttl)
+        future.set_result(result)
+        return result
+
+    async def get(self, base_url: str, fetch: Fetch) -> RobotFileParser:
+        """Parsed robots.txt for a site; fetch failures are re-raised while cached"""
+        self.requests += 1
+        key = self.key(base_url)
+        result = self.cache.get(key)
+        if result is None:
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                result = await asyncio.shield(pending)
+            else:
+                parts = urlsplit(base_url)
+                result = await self._load(key, f"{parts.scheme}://{parts.netloc}/robots.txt", fetch)
+        elif isinstance(result, Exception):
+            self.negative_hits += 1
+        if isinstance(result, Exception):
+            raise _fresh_error(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Get fetch counters; hit_ratio counts every request served without a fetch"""
+        cache = self.cache.stats()
+        return {
+            'entries': cache['entries'],
+            'max_entries': cache['max_entries'],
+            'ttl_seconds': cache['ttl_seconds'],
+            'negative_ttl_seconds': self.negative_ttl_seconds,
+            'requests': self.requests,
+            'fetches': self.fetches,
+            'failures': self.failures,
+            'negative_hits': self.negative_hits,
+            'coalesced': self.coalesced,
+            'hit_ratio': round(1 - self.fetches / self.requests, 4) if self.requests else 0.0,
+            'evictions': cache['evictions'],
+            'expirations': cache['expirations']
+        }
+
+
+# Shared caches for the sitemap fetcher and the domain analyzers
+dns_cache = CachingResolver()
+robots_cache = RobotsCache()
@@ -0,0 +1,131 @@
+"""
+Response Cache for Infy AI
+LRU + TTL cache of chat answers keyed on the normalized user message
+"""
+import itertools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_message(message: str) -> str:
+    """Casefold, strip punctuation and collapse whitespace"""
+    message = PUNCTUATION_PATTERN.sub(' ', message.casefold())
+    return WHITESPACE_PATTERN.sub(' ', message).strip()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[int] = None):
+        """Store a value, evicting the least recently used entry when full
+
+        Pass the generation read before computing the value; if the cache was
+        invalidated in the meantime the value is stale and is not stored.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+def invalidate_on_model_changes(cache: ResponseCache, *models):
+    """Invalidate the cache whenever a commit touches rows of the given models"""
+    # Each registration keeps its own session flag, so one listener's commit
+    # handling never consumes another's
+    flag = ('response_cache_dirty', id(cache), models)
+
+    def touches_models(session):
+        return any(isinstance(obj, models) for obj in itertools.chain(session.new, session.dirty, session.deleted))
+
+    def after_flush(session, flush_context):
+        if touches_models(session):
+            session.info[flag] = True
+
+    def do_orm_execute(orm_execute_state):
+        # Query.update()/delete() bypass the unit of work, so catch them here
+        mapper = orm_execute_state.bind_mapper
+        if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+                mapper is not None and mapper.class_ in models:
+            orm_execute_state.session.info[flag] = True
+
+    def after_commit(session):
+        if session.info.pop(flag, False):
+            cache.invalidate()
+
+    def after_rollback(session):
+        session.info.pop(flag, None)
+
+    event.listen(Session, 'after_flush', after_flush)
+    event.listen(Session, 'do_orm_execute', do_orm_execute)
+    event.listen(Session, 'after_commit', after_commit)
+    event.listen(Session, 'after_rollback', after_rollback)
+
+
+# Shared cache for /api/infy/chat answers
+response_cache = ResponseCache()
@@ -0,0 +1,132 @@
+"""
+Session Context Store for Infy AI
+Keeps the last few chat turns per session in memory, bounded by total bytes,
+with idle-TTL expiry and least-recently-used eviction as a fallback
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+# Fixed per-turn and per-session bookkeeping cost added to the text size
+TURN_OVERHEAD_BYTES = 64
+SESSION_OVERHEAD_BYTES = 256
+
+
+class SessionContext:
+    """Recent (user_query, infy_response) turns of one session"""
+    __slots__ = ('turns', 'size', 'last_seen')
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.size = SESSION_OVERHEAD_BYTES
+        self.last_seen = time.monotonic()
+
+
+def _turn_size(user_query: str, infy_response: str) -> int:
+    return len(user_query.encode('utf-8')) + len(infy_response.encode('utf-8')) + TURN_OVERHEAD_BYTES
+
+
+class SessionContextStore:
+    """Byte-bounded map of session id -> recent turns in least-recently-used order"""
+
+    def __init__(self, max_turns: int = 6, max_bytes: int = 64 * 1024 * 1024,
+                 idle_ttl_seconds: float = 1800.0):
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._sessions: 'OrderedDict[str, SessionContext]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _remove(self, session_id: str) -> SessionContext:
+        context = self._sessions.pop(session_id)
+        self.total_bytes -= context.size
+        return context
+
+    def _expire_idle(self, now: float):
+        # Sessions are kept in access order, so idle ones sit at the front
+        cutoff = now - self.idle_ttl_seconds
+        while self._sessions:
+            session_id, context = next(iter(self._sessions.items()))
+            if context.last_seen > cutoff:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+    def _evict_to_budget(self):
+        while self.total_bytes > self.max_bytes and len(self._sessions) > 1:
+            self._remove(next(iter(self._sessions)))
+            self.evicted += 1
+
+    def get(self, session_id: str) -> List[Tuple[str, str]]:
+        """Return the session's recent turns, oldest first"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            context = self._sessions.get(session_id)
+            if context is None:
+                self.misses += 1
+                return []
+            self.hits += 1
+            context.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return list(context.turns)
+
+    def append(self, session_id: str, user_query: str, infy_response: str):
+        """Record a turn, dropping the session's oldest turn beyond max_turns"""
+        now = time.monotonic()
+        size = _turn_size(user_query, infy_response)
+        with self._lock:
+            self._expire_idle(now)
+            context = self._sessions.get(session_id)
+            if context is None:
+                context = SessionContext(self.max_turns)
+                self._sessions[session_id] = context
+                self.total_bytes += context.size
+            else:
+                self._sessions.move_to_end(session_id)
+
+            if len(context.turns) == context.turns.maxlen:
+                oldest_query, oldest_response = context.turns[0]
+                released = _turn_size(oldest_query, oldest_response)
+                context.size -= released
+                self.total_bytes -= released
+            context.turns.append((user_query, infy_response))
+            context.size += size
+            context.last_seen = now
+            self.total_bytes += size
+            self._evict_to_budget()
+
+    def clear(self, session_id: str) -> bool:
+        """Forget one session"""
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._remove(session_id)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store size and eviction counters"""
+        lookups = self.hits + self.misses
+        sessions = len(self._sessions)
+        return {
+            'sessions': sessions,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'bytes_per_session': round(self.total_bytes / sessions, 1) if sessions else 0.0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+# Shared per-session chat context
+session_store = SessionContextStore()
@@ -0,0 +1,444 @@
+"""
+Sitemap Fetcher for Infy AI
+asyncio sitemap probes over pooled keep-alive connections, with global and
+per-host concurrency caps, a per-host token bucket for crawl delay and
+robots.txt Disallow and Crawl-delay rules. Only public addresses are fetched,
+redirects included
+"""
+import asyncio
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+# Imported both as src.services.sitemap_fetcher (scheduler) and flat (main.py)
+try:
+    from .network_cache import CachingResolver, RobotsCache, dns_cache, is_public_address, robots_cache
+    from .sitemap_parser import READ_CHUNK, SitemapBudget, SitemapError, SitemapWalk
+except ImportError:
+    from network_cache import CachingResolver, RobotsCache, dns_cache, is_public_address, robots_cache
+    from sitemap_parser import READ_CHUNK, SitemapBudget, SitemapError, SitemapWalk
+
+SITEMAP_PATHS = ('/sitemap.xml', '/sitemap_index.xml')
+WEB_SCHEMES = ('http://', 'https://')
+VARIANT_BODY_LIMIT = 1024 * 1024  # drained so the connection returns to the pool
+USER_AGENT = 'InfyBot/1.0 (+https://seco.in.net)'
+ROBOTS_USER_AGENT = 'InfyBot'
+MAX_CRAWL_DELAY = 30.0  # a robots.txt Crawl-delay above this is capped
+MAX_REDIRECTS = 10
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+class BlockedURLError(aiohttp.ClientError):
+    """A URL, or a redirect, to a non-web scheme or a non-public IP address"""
+
+
+def check_fetch_url(url: str):
+    """Raise BlockedURLError unless url is http(s) to a host name or a public IP address
+
+    Host names are checked by the resolver, which aiohttp skips for IP literals.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise BlockedURLError(f"Refusing to fetch {url}")
+    try:
+        ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    if not is_public_address(parts.hostname):
+        raise BlockedURLError(f"Refusing to fetch {url}: {parts.hostname} is not a public address")
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent waiting"""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class HostSlot:
+    """Concurrency cap and crawl-delay bucket for one host"""
+
+    def __init__(self, limit: int, crawl_delay: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.crawl_delay = 0.0
+        self.bucket: Optional[TokenBucket] = None
+        self.users = 0  # requests holding or waiting on the slot; busy slots are never evicted
+        self.requested = False
+        self.set_crawl_delay(crawl_delay)
+
+    def set_crawl_delay(self, crawl_delay: float):
+        """Space requests crawl_delay seconds apart; the bucket keeps its tokens across changes"""
+        if crawl_delay == self.crawl_delay:
+            return
+        self.crawl_delay = crawl_delay
+        if crawl_delay <= 0:
+            self.bucket = None
+        elif self.bucket is None:
+            self.bucket = TokenBucket(1.0 / crawl_delay)
+            if self.requested:
+                self.bucket.tokens = 0.0  # the host was just hit, e.g. for the robots.txt declaring the delay
+        else:
+            self.bucket.rate = 1.0 / crawl_delay
+
+
+class SitemapFetcher:
+    """Finds and counts a site's sitemap through robots.txt and well-known paths"""
+
+    def __init__(self, max_in_flight: int = 100, per_host_limit: int = 2, crawl_delay: float = 1.0,
+                 max_hosts: int = 10000, timeout: float = 10.0, max_bytes: int = 50 * 1024 * 1024,
+                 max_sitemap_depth: int = 2, max_sitemaps: int = 50, max_sitemap_urls: int = 2_500_000,
+                 resolver: Optional[CachingResolver] = None, robots: Optional[RobotsCache] = None):
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.crawl_delay = crawl_delay
+        self.max_hosts = max_hosts
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_sitemap_depth = max_sitemap_depth
+        self.max_sitemaps = max_sitemaps
+        self.max_sitemap_urls = max_sitemap_urls
+        # Caches outlive sessions, so reopening the pool keeps resolved hosts and robots.txt
+        self.resolver = resolver or CachingResolver()
+        self.robots = robots or RobotsCache()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        # Least recently used hosts first; a slot, and with it the host's crawl-delay
+        # spacing, lives until max_hosts newer hosts push it out
+        self._hosts: 'OrderedDict[str, HostSlot]' = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+        self.requests = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self.throttle_seconds = 0.0
+        self.disallowed = 0
+        self.hosts_evicted = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.probes = 0
+        self.sitemaps_found = 0
+        self.sitemaps_read = 0
+        self.sitemaps_skipped = 0
+        self.walks_truncated = 0
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_created)
+            trace.on_connection_reuseconn.append(self._on_connection_reused)
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.per_host_limit,
+                                               keepalive_timeout=30, resolver=self.resolver,
+                                               use_dns_cache=False),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT},
+                trace_configs=[trace]
+            )
+        return self._session
+
+    async def _on_connection_created(self, session, context, params):
+        self.connections_created += 1
+
+    async def _on_connection_reused(self, session, context, params):
+        self.connections_reused += 1
+
+    def _host_slot(self, url: str) -> HostSlot:
+        host = RobotsCache.key(url)  # host:port, shared by the http/https variants like robots.txt
+        slot = self._hosts.get(host)
+        if slot is not None:
+            self._hosts.move_to_end(host)
+            return slot
+        slot = HostSlot(self.per_host_limit, self.crawl_delay)
+        self._hosts[host] = slot
+        if len(self._hosts) > self.max_hosts:
+            idle = next((key for key, candidate in self._hosts.items()
+                         if candidate.users == 0 and candidate is not slot), None)
+            if idle is not None:
+                del self._hosts[idle]
+                self.hosts_evicted += 1
+        return slot
+
+    @asynccontextmanager
+    async def request(self, url: str) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Open a GET response under the host and global limits, following checked redirects"""
+        session = await self._get_session()
+        slot = self._host_slot(url)
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                if slot.bucket is not None:
+                    self.throttle_seconds += await slot.bucket.acquire()
+                async with self._in_flight:
+                    self.requests += 1
+                    slot.requested = True
+                    try:
+                        response = await self._follow(session, url)
+                        try:
+                            yield response
+                        finally:
+                            response.release()
+                    except (aiohttp.ClientError, asyncio.TimeoutError):
+                        self.errors += 1
+                        raise
+        finally:
+            slot.users -= 1
+
+    async def _follow(self, session: aiohttp.ClientSession, url: str) -> aiohttp.ClientResponse:
+        """GET url, checking it and every redirect target with check_fetch_url"""
+        for _ in range(MAX_REDIRECTS + 1):
+            check_fetch_url(url)
+            response = await session.get(url, allow_redirects=False)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            response.release()
+            url = urljoin(str(response.url), location)
+        raise aiohttp.TooManyRedirects(response.request_info, response.history,
+                                       message=f"More than {MAX_REDIRECTS} redirects")
+
+    async def fetch(self, url: str) -> Tuple[int, bytes]:
+        """GET a URL under the host and global limits; returns (status, body)"""
+        async with self.request(url) as response:
+            if response.status != 200:
+                return response.status, b''
+            chunks, size = [], 0
+            async for chunk in response.content.iter_chunked(READ_CHUNK):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ValueError(f"{url} exceeds {self.max_bytes} bytes")
+                chunks.append(chunk)
+            self.bytes_read += size
+            return response.status, b''.join(chunks)
+
+    async def site_robots(self, url: str):
+        """The site's cached robots.txt; its Crawl-delay, if longer than ours, spaces the host's requests"""
+        robots = await self.robots.get(url, self.fetch)
+        delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+        self._host_slot(url).set_crawl_delay(min(MAX_CRAWL_DELAY, max(self.crawl_delay, float(delay or 0))))
+        return robots
+
+    async def allowed(self, url: str) -> bool:
+        """Whether robots.txt lets this fetcher GET url"""
+        robots = await self.site_robots(url)
+        if robots.can_fetch(ROBOTS_USER_AGENT, url):
+            return True
+        self.disallowed += 1
+        return False
+
+    async def robots_sitemaps(self, base_url: str) -> List[str]:
+        """Sitemap URLs declared in the site's cached robots.txt"""
+        robots = await self.site_robots(base_url)
+        return [urljoin(base_url, sitemap_url) for sitemap_url in robots.site_maps() or []]
+
+    def budget(self) -> SitemapBudget:
+        """Fresh walk budget from this fetcher's limits"""
+        return SitemapBudget(max_depth=self.max_sitemap_depth, max_sitemaps=self.max_sitemaps,
+                             max_urls=self.max_sitemap_urls, max_bytes=self.max_sitemaps * self.max_bytes)
+
+    async def iter_urls(self, sitemap_url: str, budget: Optional[SitemapBudget] = None) -> AsyncIterator[str]:
+        """Stream page URLs from a sitemap, following nested indexes within the budget"""
+        walk = SitemapWalk(sitemap_url, budget or self.budget(), self.max_bytes)
+        while True:
+            item = walk.next_sitemap()
+            if item is None:
+                break
+            url, depth = item
+            parser = walk.parser()
+            try:
+                if not await self.allowed(url):
+                    raise SitemapError(f"{url} is disallowed by robots.txt")
+                async with self.request(url) as response:
+                    if response.status != 200:
+                        raise SitemapError(f"{url} returned HTTP {response.status}")
+                    async for chunk in response.content.iter_chunked(READ_CHUNK):
+                        for page_url in walk.accept(parser.feed(chunk), url, depth):
+                            yield page_url
+                        if walk.done:
+                            break
+                if not walk.done:
+                    for page_url in walk.accept(parser.close(), url, depth):
+                        yield page_url
+            except (SitemapError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not walk.skip(depth, e):
+                    raise
+            finally:
+                walk.finish(parser)
+                self.sitemaps_read += 1
+                self.bytes_read += parser.bytes_read
+        self.sitemaps_skipped += walk.budget.skipped
+        self.walks_truncated += walk.budget.truncated
+
+    async def count_pages(self, sitemap_url: str) -> Tuple[int, SitemapBudget]:
+        """Count page URLs under a sitemap; returns the count and the spent budget"""
+        budget, pages = self.budget(), 0
+        async for _ in self.iter_urls(sitemap_url, budget):
+            pages += 1
+        return pages, budget
+
+    async def probe(self, base_url: str) -> Dict[str, Any]:
+        """Locate a site's sitemap and count its pages"""
+        started = time.perf_counter()
+        self.probes += 1
+        candidates = await self.robots_sitemaps(base_url)
+        candidates += [urljoin(base_url, path) for path in SITEMAP_PATHS if urljoin(base_url, path) not in candidates]
+        # An unreachable host fails on robots.txt; a bad candidate only moves on to the next
+        for sitemap_url in candidates:
+            try:
+                pages, budget = await self.count_pages(sitemap_url)
+            except (SitemapError, aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            self.sitemaps_found += 1
+            return {'found': True, 'url': sitemap_url, 'pages_count': pages, 'truncated': budget.truncated,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+        return {'found': False, 'url': None, 'pages_count': 0, 'truncated': False,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    async def probe_many(self, base_urls: List[str]) -> List[Any]:
+        """Probe several sites concurrently; failed probes are returned as exceptions"""
+        return await asyncio.gather(*(self.probe(url) for url in base_urls), return_exceptions=True)
+
+    async def probe_url(self, url: str) -> Dict[str, Any]:
+        """GET a URL following redirects; returns status, final URL and timing"""
+        started = time.perf_counter()
+        status, final_url, error = None, None, None
+        try:
+            if not await self.allowed(url):
+                error = 'disallowed by robots.txt'
+            else:
+                async with self.request(url) as response:
+                    status, final_url = response.status, str(response.url)
+                    size = 0
+                    async for chunk in response.content.iter_chunked(READ_CHUNK):
+                        size += len(chunk)
+                        if size > VARIANT_BODY_LIMIT:
+                            break
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = str(e) or type(e).__name__
+        return {'url': url, 'status': status, 'final_url': final_url,
+                'reachable': status is not None and status < 400,
+                'redirected': final_url is not None and final_url.rstrip('/') != url.rstrip('/'),
+                'error': error, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    async def probe_variants(self, variants: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Probe every (protocol, url) variant of one domain at once and merge the results
+
+        Variants share the pool, the DNS cache and robots.txt, and redirects
+        land on connections opened by sibling variants. The sitemap is probed
+        once, on the preferred reachable variant.
+        """
+        started = time.perf_counter()
+        web = [(protocol, url) for protocol, url in variants if url.startswith(WEB_SCHEMES)]
+        probes = await asyncio.gather(*(self.probe_url(url) for protocol, url in web))
+        results = [dict(probe, protocol=protocol) for (protocol, url), probe in zip(web, probes)]
+        results += [{'protocol': protocol, 'url': url, 'status': None, 'final_url': None, 'reachable': False,
+                     'redirected': False, 'error': 'unsupported protocol', 'elapsed_ms': 0.0}
+                    for protocol, url in variants if not url.startswith(WEB_SCHEMES)]
+
+        reachable = [result for result in results if result['reachable']]
+        # A variant that answers without redirecting is the site's own choice; https breaks ties
+        preferred = min(reachable, key=lambda result: (result['redirected'], not result['url'].startswith('https://')),
+                        default=None)
+        sitemap = None
+        if preferred:
+            try:
+                sitemap = await self.probe(preferred['final_url'])
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                sitemap = {'found': False, 'url': None, 'pages_count': 0, 'truncated': False,
+                           'error': str(e) or type(e).__name__}
+        return {
+            'variants': results,
+            'probed': [protocol for protocol, url in web],
+            'reachable': [result['protocol'] for result in reachable],
+            'preferred': {'protocol': preferred['protocol'], 'url': preferred['final_url']} if preferred else None,
+            'sitemap': sitemap,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # One background event loop shares the connection pool between all callers
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='sitemap-fetcher', daemon=True).start()
+            return self._loop
+
+    def probe_blocking(self, base_urls: List[str], timeout: Optional[float] = None) -> List[Any]:
+        """Run probe_many on the shared background loop from synchronous code"""
+        future = asyncio.run_coroutine_threadsafe(self.probe_many(base_urls), self._ensure_loop())
+        return future.result(timeout)
+
+    def probe_variants_blocking(self, domains: List[List[Tuple[str, str]]],
+                                timeout: Optional[float] = None) -> List[Any]:
+        """probe_variants for several domains at once; failures are returned as exceptions"""
+        async def run():
+            return await asyncio.gather(*(self.probe_variants(variants) for variants in domains),
+                                        return_exceptions=True)
+        return asyncio.run_coroutine_threadsafe(run(), self._ensure_loop()).result(timeout)
+
+    def close(self):
+        """Close the connection pool and stop the background loop"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request, pooling and throttling counters"""
+        return {
+            'probes': self.probes,
+            'sitemaps_found': self.sitemaps_found,
+            'sitemaps_read': self.sitemaps_read,
+            'sitemaps_skipped': self.sitemaps_skipped,
+            'walks_truncated': self.walks_truncated,
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes_read': self.bytes_read,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'throttle_seconds': round(self.throttle_seconds, 3),
+            'disallowed': self.disallowed,
+            'active_hosts': len(self._hosts),
+            'max_hosts': self.max_hosts,
+            'hosts_evicted': self.hosts_evicted,
+            'max_in_flight': self.max_in_flight,
+            'per_host_limit': self.per_host_limit,
+            'crawl_delay': self.crawl_delay,
+            'dns_cache': self.resolver.stats(),
+            'robots_cache': self.robots.stats()
+        }
+
+
+# Shared sitemap fetcher; its background loop starts on first blocking probe
+sitemap_fetcher = SitemapFetcher(resolver=dns_cache, robots=robots_cache)
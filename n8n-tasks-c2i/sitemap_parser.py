@@ -0,0 +1,253 @@
+"""
+Sitemap Parser for Infy AI
+Incremental sitemap parsing: gzip is inflated and XML parsed chunk by chunk,
+<loc> entries come out as soon as they close, and sitemap indexes are walked
+breadth-first within a depth, size and count budget
+"""
+import xml.etree.ElementTree as ElementTree
+import zlib
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+GZIP_MAGIC = b'\x1f\x8b'
+SITEMAP_ROOTS = {'urlset': 'url', 'sitemapindex': 'sitemap'}  # root tag -> entry tag
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024  # uncompressed limit per file from sitemaps.org
+INFLATE_CHUNK = 256 * 1024
+READ_CHUNK = 64 * 1024
+
+Entry = Tuple[str, str]  # ('url' or 'sitemap', location)
+
+
+class SitemapError(ValueError):
+    """Document is not a usable sitemap"""
+
+
+class SitemapTooLarge(SitemapError):
+    """Document or walk went over its byte budget"""
+
+
+class _EntryTarget:
+    """XMLParser target that records top-level <loc> entries and builds no element tree"""
+
+    def __init__(self):
+        self.root_tag: Optional[str] = None
+        self.entries: List[Entry] = []
+        self._depth = 0
+        self._in_location = False
+        self._text: List[str] = []
+        self._location: Optional[str] = None
+
+    def start(self, tag: str, attrib: Dict[str, str]):
+        self._depth += 1
+        tag = tag.rsplit('}', 1)[-1]
+        if self._depth == 1:
+            if tag not in SITEMAP_ROOTS:
+                raise SitemapError(f"Not a sitemap: <{tag}>")
+            self.root_tag = tag
+        # Depth keeps extension tags such as <image:loc> out of the entries
+        self._in_location = self._depth == 3 and tag == 'loc'
+
+    def end(self, tag: str):
+        if self._in_location:
+            self._location = ''.join(self._text).strip() or None
+            self._in_location = False
+            self._text.clear()
+        elif self._depth == 2:
+            if self._location:
+                self.entries.append((SITEMAP_ROOTS[self.root_tag], self._location))
+            self._location = None
+        self._depth -= 1
+
+    def data(self, text: str):
+        if self._in_location:
+            self._text.append(text)
+
+    def close(self):
+        return None
+
+
+class SitemapParser:
+    """Push parser: feed raw, optionally gzipped bytes and get completed <loc> entries back"""
+
+    def __init__(self, max_bytes: int = MAX_SITEMAP_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.bytes_parsed = 0
+
+        self._target = _EntryTarget()
+        self._xml = ElementTree.XMLParser(target=self._target)
+        self._head = b''
+        self._started = False
+        self._inflater = None
+
+    def feed(self, data: bytes) -> List[Entry]:
+        """Parse the next chunk; returns entries completed by it"""
+        self.bytes_read += len(data)
+        if not self._started:
+            # Two bytes are enough to tell gzip from XML
+            self._head += data
+            if len(self._head) < 2:
+                return []
+            data, self._head, self._started = self._head, b'', True
+            if data[:2] == GZIP_MAGIC:
+                self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        if self._inflater is None:
+            self._parse(data)
+            return self._take()
+        try:
+            while data and not self._inflater.eof:
+                # Bounded pieces keep a gzip bomb from inflating in one call
+                self._parse(self._inflater.decompress(data, INFLATE_CHUNK))
+                data = self._inflater.unconsumed_tail
+        except zlib.error as e:
+            raise SitemapError(f"Corrupt gzip sitemap: {e}")
+        return self._take()
+
+    def close(self) -> List[Entry]:
+        """Finish the document; raises SitemapError if it was not a complete sitemap"""
+        if self._head:
+            self._parse(self._head)
+            self._head = b''
+        if self._inflater is not None and not self._inflater.eof:
+            raise SitemapError('Truncated gzip sitemap')
+        try:
+            self._xml.close()
+        except ElementTree.ParseError as e:
+            raise SitemapError(f"Malformed sitemap XML: {e}")
+        if self._target.root_tag is None:
+            raise SitemapError('Empty sitemap document')
+        return self._take()
+
+    def _parse(self, data: bytes):
+        if not data:
+            return
+        self.bytes_parsed += len(data)
+        if self.bytes_parsed > self.max_bytes:
+            raise SitemapTooLarge(f"Sitemap exceeds {self.max_bytes} bytes")
+        try:
+            self._xml.feed(data)
+        except ElementTree.ParseError as e:
+            raise SitemapError(f"Malformed sitemap XML: {e}")
+
+    def _take(self) -> List[Entry]:
+        entries, self._target.entries = self._target.entries, []
+        return entries
+
+    @property
+    def root_tag(self) -> Optional[str]:
+        """'urlset' or 'sitemapindex' once the root element has been read"""
+        return self._target.root_tag
+
+class SitemapBudget:
+    """Limits shared by every document of one sitemap walk"""
+
+    def __init__(self, max_depth: int = 2, max_sitemaps: int = 50, max_urls: int = 2_500_000,
+                 max_bytes: int = 500 * 1024 * 1024):
+        self.max_depth = max_depth
+        self.max_sitemaps = max_sitemaps
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+
+        self.sitemaps = 0
+        self.skipped = 0
+        self.urls = 0
+        self.bytes_parsed = 0
+        self.truncated = False
+
+
+class SitemapWalk:
+    """Breadth-first queue of sitemap documents, bounded by a SitemapBudget"""
+
+    def __init__(self, root_url: str, budget: Optional[SitemapBudget] = None,
+                 max_document_bytes: int = MAX_SITEMAP_BYTES):
+        self.budget = budget or SitemapBudget()
+        self.max_document_bytes = max_document_bytes
+        self.done = False
+        self._queue: Deque[Tuple[str, int]] = deque([(root_url, 0)])
+        self._seen = {root_url}
+
+    def next_sitemap(self) -> Optional[Tuple[str, int]]:
+        """(url, depth) of the next document to read, or None when the walk is over"""
+        if self.done or not self._queue:
+            return None
+        self.budget.sitemaps += 1
+        return self._queue.popleft()
+
+    def parser(self) -> SitemapParser:
+        """Parser for the next document, capped by what is left of the byte budget"""
+        remaining = self.budget.max_bytes - self.budget.bytes_parsed
+        return SitemapParser(max(0, min(self.max_document_bytes, remaining)))
+
+    def accept(self, entries: List[Entry], sitemap_url: str, depth: int) -> List[str]:
+        """Queue child sitemaps and return the page URLs that fit the budget"""
+        pages = []
+        for kind, location in entries:
+            if kind == 'sitemap':
+                child = urljoin(sitemap_url, location)
+                if child in self._seen:
+                    continue
+                if depth >= self.budget.max_depth or len(self._seen) >= self.budget.max_sitemaps:
+                    self.budget.truncated = True
+                    continue
+                self._seen.add(child)
+                self._queue.append((child, depth + 1))
+            elif self.budget.urls >= self.budget.max_urls:
+                self.budget.truncated = True
+                self.done = True
+                break
+            else:
+                self.budget.urls += 1
+                pages.append(location)
+        return pages
+
+    def finish(self, parser: SitemapParser):
+        """Charge a document's parsed bytes to the budget"""
+        self.budget.bytes_parsed += parser.bytes_parsed
+        if self.budget.bytes_parsed >= self.budget.max_bytes:
+            self.done = True
+
+    def skip(self, depth: int, error: Exception) -> bool:
+        """Record a failed document; False when the error should end the walk"""
+        if isinstance(error, SitemapTooLarge):
+            self.budget.truncated = True
+            return True
+        if depth == 0:
+            return False
+        self.budget.skipped += 1
+        return True
+
+
+def file_chunks(path: str, chunk_size: int = READ_CHUNK) -> Iterator[bytes]:
+    """Read a local sitemap file in chunks"""
+    with open(path, 'rb') as handle:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_sitemap_urls(sitemap_url: str, open_chunks: Callable[[str], Iterable[bytes]] = file_chunks,
+                      budget: Optional[SitemapBudget] = None,
+                      max_document_bytes: int = MAX_SITEMAP_BYTES) -> Iterator[str]:
+    """Yield page URLs from a sitemap, following nested indexes within the budget"""
+    walk = SitemapWalk(sitemap_url, budget, max_document_bytes)
+    while True:
+        item = walk.next_sitemap()
+        if item is None:
+            return
+        url, depth = item
+        parser = walk.parser()
+        try:
+            for chunk in open_chunks(url):
+                yield from walk.accept(parser.feed(chunk), url, depth)
+                if walk.done:
+                    return
+            yield from walk.accept(parser.close(), url, depth)
+        except (SitemapError, OSError) as e:
+            if not walk.skip(depth, e):
+                raise
+        finally:
+            walk.finish(parser)
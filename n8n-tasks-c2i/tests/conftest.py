@@ -0,0 +1,97 @@
+"""
+Test setup for Infy AI
+The modules live flat in this directory: main.py imports them by bare name,
+while the blueprints and the database app import them as src.services.* and
+src.models.*. Both layouts are made importable here so tests exercise each.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Flat modules that are SQLAlchemy models (src.models.*) or Flask blueprints (src.routes.*)
+MODEL_MODULES = ('domain', 'knowledge', 'navigation')
+ROUTE_MODULES = ('admin', 'admin_training', 'blockchain_routes', 'domain_routes', 'infy', 'user', 'voice')
+# Apps and scripts rather than importable services
+APP_MODULES = ('main', 'database_init')
+
+# src/models/user.py, which holds the shared Flask-SQLAlchemy handle, is not
+# part of this directory; the layout provides the handle the models import
+USER_MODEL = "from flask_sqlalchemy import SQLAlchemy\n\ndb = SQLAlchemy()\n"
+
+
+def service_modules():
+    """Names of the flat modules that are imported as src.services.*"""
+    excluded = set(MODEL_MODULES) | set(ROUTE_MODULES) | set(APP_MODULES) | {'__init__'}
+    return sorted(name[:-3] for name in os.listdir(ROOT)
+                  if name.endswith('.py') and name[:-3] not in excluded)
+
+
+def _link(source, target):
+    try:
+        os.symlink(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def build_src_layout(directory):
+    """Lay the flat modules out as the src package the blueprints import"""
+    packages = {'services': service_modules(), 'models': MODEL_MODULES, 'routes': ROUTE_MODULES}
+    os.makedirs(os.path.join(directory, 'src'))
+    open(os.path.join(directory, 'src', '__init__.py'), 'w').close()
+    for package, modules in packages.items():
+        package_dir = os.path.join(directory, 'src', package)
+        os.makedirs(package_dir)
+        open(os.path.join(package_dir, '__init__.py'), 'w').close()
+        for name in modules:
+            _link(os.path.join(ROOT, f"{name}.py"), os.path.join(package_dir, f"{name}.py"))
+    with open(os.path.join(directory, 'src', 'models', 'user.py'), 'w') as handle:
+        handle.write(USER_MODEL)
+
+
+def pytest_configure(config):
+    layout = tempfile.mkdtemp(prefix='infy-src-layout-')
+    build_src_layout(layout)
+    config._infy_src_layout = layout
+    # Keep main.py's conversation log out of the source tree
+    os.environ.setdefault('CONVERSATION_LOG_PATH', os.path.join(layout, 'conversations.jsonl'))
+    # The flat directory first, as when main.py runs; src.* resolves from the layout
+    sys.path[:0] = [ROOT, layout]
+
+
+def pytest_unconfigure(config):
+    # main.py's conversation log writes into the layout; flush it first
+    if 'main' in sys.modules:
+        sys.modules['main'].conversation_log.close()
+    layout = getattr(config, '_infy_src_layout', None)
+    if layout:
+        shutil.rmtree(layout, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def src_layout(request):
+    """Directory holding the src package; on its own it is the layout the blueprints run in"""
+    return request.config._infy_src_layout
+
+
+@pytest.fixture
+def db_app(tmp_path):
+    """Flask app bound to a fresh SQLite database with every src.models table"""
+    from flask import Flask
+    from src.models.user import db
+    import src.models.domain  # noqa: F401 - registers the tables
+    import src.models.knowledge  # noqa: F401
+    import src.models.navigation  # noqa: F401
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'infy.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
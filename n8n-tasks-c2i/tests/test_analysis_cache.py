@@ -0,0 +1,123 @@
+"""
+Analysis results are served fresh, stale while one background refresh runs,
+or analyzed once for any number of concurrent callers
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from analysis_cache import AnalysisCache, analyzed_at
+
+
+def result(age_seconds, **fields):
+    stamp = (datetime.utcnow() - timedelta(seconds=age_seconds)).isoformat()
+    return dict({'domain': 'example.com', 'analyzed_at': stamp, 'pages': 1}, **fields)
+
+
+class Analyzer:
+    """Counts calls; blocks on a gate when given one"""
+
+    def __init__(self, gate=None, error=None):
+        self.calls = 0
+        self.gate = gate
+        self.error = error
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return result(0, pages=2)
+
+
+def drain(cache):
+    """Wait for background refreshes; the cache starts a new pool on the next stale read"""
+    cache._executor.shutdown(wait=True)
+    cache._executor = None
+
+
+def test_fresh_result_is_served_without_analysis():
+    store = {'example.com': result(10)}
+    cache = AnalysisCache(store, fresh_seconds=60)
+    analyze = Analyzer()
+    served, state = cache.get('example.com', analyze)
+    assert (state, served['pages'], analyze.calls) == ('fresh', 1, 0)
+
+
+def test_stale_result_is_served_while_one_refresh_runs():
+    store = {'example.com': result(120)}
+    cache = AnalysisCache(store, fresh_seconds=60, stale_seconds=3600)
+    gate = threading.Event()
+    analyze = Analyzer(gate)
+
+    states = [cache.get('example.com', analyze) for _ in range(5)]
+    assert all(state == 'stale' and served['pages'] == 1 for served, state in states)
+    assert analyze.started.wait(5)
+    gate.set()
+    drain(cache)
+
+    assert analyze.calls == 1
+    assert store['example.com']['pages'] == 2
+    assert cache.get('example.com', analyze)[1] == 'fresh'
+    stats = cache.stats()
+    assert (stats['stale_hits'], stats['refreshes'], stats['in_flight']) == (5, 1, 0)
+
+
+def test_failed_refresh_keeps_the_stale_result():
+    store = {'example.com': result(120)}
+    cache = AnalysisCache(store, fresh_seconds=60, stale_seconds=3600)
+    cache.get('example.com', Analyzer(error=ConnectionError('down')))
+    drain(cache)
+    assert store['example.com']['pages'] == 1
+    assert cache.stats()['refresh_failures'] == 1
+    # The next stale read tries again
+    assert cache.get('example.com', Analyzer())[1] == 'stale'
+
+
+@pytest.mark.parametrize('stored', [None, result(10 * 86400), {'domain': 'example.com', 'status': 'queued'}])
+def test_missing_expired_or_queued_results_are_analyzed_once(stored):
+    store = {} if stored is None else {'example.com': stored}
+    cache = AnalysisCache(store, fresh_seconds=60, stale_seconds=3600)
+    gate = threading.Event()
+    analyze = Analyzer(gate)
+    outcomes = []
+
+    def call():
+        outcomes.append(cache.get('example.com', analyze))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert analyze.started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()['coalesced'] < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert analyze.calls == 1
+    assert sorted(state for _, state in outcomes) == ['coalesced'] * 4 + ['miss']
+    assert all(served['pages'] == 2 for served, _ in outcomes)
+
+
+def test_analysis_errors_reach_every_waiter():
+    cache = AnalysisCache({}, fresh_seconds=60)
+    with pytest.raises(ConnectionError):
+        cache.get('example.com', Analyzer(error=ConnectionError('down')))
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_analyzed_at_reads_both_result_shapes():
+    stamp = datetime(2026, 10, 17, 9, 30)
+    assert analyzed_at({'analyzed_at': stamp.isoformat()}) == stamp
+    assert analyzed_at({'last_analyzed': stamp, 'status': 'completed'}) == stamp
+    assert analyzed_at({'analyzed_at': 'yesterday'}) is None
+    assert analyzed_at({'status': 'queued', 'queued_at': stamp.isoformat()}) is None
@@ -0,0 +1,162 @@
+"""
+Bulk analysis jobs only ever call back to public http(s) URLs: the URL is
+checked when the job is submitted, and the host is resolved once when the
+callback is sent and delivered to the address that was checked
+"""
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import analysis_jobs
+from analysis_jobs import AnalysisJob, AnalysisJobRunner, check_callback_url, resolve_callback_url
+
+ADDRESSES = {
+    'hooks.example.com': ['93.184.216.34'],
+    'internal.example.com': ['10.1.2.3'],
+    'metadata.example.com': ['169.254.169.254'],
+    'split.example.com': ['93.184.216.34', '127.0.0.1'],
+    'v6.example.com': ['2606:2800:220:1:248:1893:25c8:1946'],
+    'scoped.example.com': ['fe80::1%eth0'],
+}
+
+
+@pytest.fixture(autouse=True)
+def resolver(monkeypatch):
+    """Serve ADDRESSES in place of DNS; IP literals resolve to themselves. Returns the hosts looked up"""
+    lookups = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        lookups.append(host)
+        if host in ADDRESSES:
+            addresses = ADDRESSES[host]
+        elif host.replace('.', '').isdigit() or ':' in host:
+            addresses = [host]
+        elif host == 'localhost':
+            addresses = ['127.0.0.1', '::1']
+        else:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        return [(socket.AF_INET6 if ':' in address else socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                 (address, port)) for address in addresses]
+    monkeypatch.setattr(analysis_jobs.socket, 'getaddrinfo', getaddrinfo)
+    return lookups
+
+
+@pytest.mark.parametrize('url', ['https://hooks.example.com/done', 'http://hooks.example.com:8080/x',
+                                 'https://v6.example.com/', 'https://93.184.216.34/hook'])
+def test_public_callbacks_are_accepted(url):
+    check_callback_url(url)
+    assert resolve_callback_url(url) in ('93.184.216.34', '2606:2800:220:1:248:1893:25c8:1946')
+
+
+@pytest.mark.parametrize('url', ['http://localhost:5000/hook', 'http://app.localhost/', 'http://127.0.0.1/hook',
+                                 'http://[::1]/hook', 'http://169.254.169.254/latest', 'ftp://hooks.example.com/',
+                                 'hooks.example.com/x', ''])
+def test_private_or_malformed_callbacks_are_rejected(url, resolver):
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+    assert resolver == []
+
+
+@pytest.mark.parametrize('url', ['https://internal.example.com/hook', 'https://metadata.example.com/',
+                                 'https://split.example.com/', 'https://scoped.example.com/',
+                                 'https://nowhere.invalid/'])
+def test_private_or_unknown_hosts_are_refused_when_resolved(url):
+    check_callback_url(url)
+    with pytest.raises(ValueError):
+        resolve_callback_url(url)
+
+
+def test_submit_refuses_private_callback_without_resolving(resolver):
+    runner = AnalysisJobRunner()
+    with pytest.raises(ValueError, match='non-public'):
+        runner.submit(['example.com'], {}, 'http://10.1.2.3/hook')
+    assert runner.stats()['submitted'] == 0
+    runner.submit(['example.com'], {}, 'https://internal.example.com/hook')
+    assert resolver == []
+
+
+def test_notify_resolves_once_and_delivers_to_that_address(monkeypatch, resolver):
+    opened = []
+
+    class Response:
+        status = 204
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+    monkeypatch.setattr(analysis_jobs, '_callback_opener', lambda address: SimpleNamespace(
+        open=lambda request, timeout: opened.append((address, request.full_url)) or Response()))
+    job = AnalysisJob(['example.com'], {}, 'https://hooks.example.com/done')
+    AnalysisJobRunner()._notify(job)
+    assert opened == [('93.184.216.34', 'https://hooks.example.com/done')]
+    assert resolver == ['hooks.example.com']
+    assert job.callback_status == 'delivered: HTTP 204'
+
+
+def test_notify_rechecks_before_sending(monkeypatch):
+    sent = []
+    monkeypatch.setattr(analysis_jobs, '_callback_opener', lambda address: SimpleNamespace(
+        open=lambda *args, **kwargs: sent.append(args)))
+    monkeypatch.setattr(analysis_jobs.time, 'sleep', lambda seconds: None)
+
+    # The host was public at submit time and now resolves into the private network
+    job = AnalysisJob(['example.com'], {}, 'https://hooks.example.com/done')
+    monkeypatch.setitem(ADDRESSES, 'hooks.example.com', ['10.0.0.7'])
+    runner = AnalysisJobRunner()
+    runner._notify(job)
+    assert sent == []
+    assert job.callback_status.startswith('failed:') and '10.0.0.7' in job.callback_status
+    assert runner.stats()['callbacks_failed'] == 1
+
+
+def test_callback_redirects_are_not_followed():
+    handler = analysis_jobs._NoRedirects()
+    assert handler.redirect_request(None, None, 302, 'Found', {}, 'http://127.0.0.1/') is None
+
+
+def test_opener_connects_to_the_pinned_address(resolver):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.headers['Host'], self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        # hooks.example.com stands for a host that would resolve elsewhere if looked up again
+        url = f"http://hooks.example.com:{server.server_address[1]}/done"
+        request = analysis_jobs.urllib.request.Request(url, data=b'{}', method='POST')
+        with analysis_jobs._callback_opener('127.0.0.1').open(request, timeout=5) as response:
+            assert response.status == 204
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert received == [(f"hooks.example.com:{server.server_address[1]}", b'{}')]
+    assert 'hooks.example.com' not in resolver
+
+
+@pytest.mark.parametrize('callback_url', ['http://127.0.0.1:5000/hook', 'http://localhost/hook',
+                                          'http://169.254.169.254/latest/meta-data'])
+def test_bulk_upload_rejects_private_callback(callback_url):
+    import main
+    client = main.app.test_client()
+    response = client.post('/api/domain/bulk-upload', json={
+        'domains_data': [{'domain': 'example.com'}], 'callback_url': callback_url})
+    assert response.status_code == 400
+    assert 'callback_url' in response.get_json()['error']
+
+    stream = client.post('/api/domain/bulk-upload/stream', query_string={'callback_url': callback_url},
+                         data=b'example.com\n', content_type='text/csv')
+    assert stream.status_code == 400
@@ -0,0 +1,100 @@
+"""
+The analysis scheduler leases queue rows, retries transient failures with
+backoff, and fails rows that ran out of attempts, including rows whose worker
+died holding the lease
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def queue(db_app):
+    from src.models.domain import Domain, DomainAnalysisQueue, DomainBatch
+    from src.models.user import db
+    from src.services.analysis_queue import AnalysisScheduler
+
+    batch = DomainBatch(batch_name='test', file_type='csv', total_domains=2)
+    db.session.add(batch)
+    domains = [Domain('example.com'), Domain('example.org')]
+    db.session.add_all(domains)
+    db.session.flush()
+    db.session.add_all([DomainAnalysisQueue(domain_id=domain.id, batch_id=batch.id) for domain in domains])
+    db.session.commit()
+
+    outcomes = {}
+
+    def analyzer(row):
+        outcome = outcomes.get(row['domain_name'], {'analysis_notes': 'HTTP 200'})
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    scheduler = AnalysisScheduler(analyzer=analyzer, base_backoff_seconds=0)
+    scheduler.db = db
+    return scheduler, outcomes, db, batch.id
+
+
+def rows(db):
+    from src.models.domain import DomainAnalysisQueue
+    db.session.expire_all()
+    return {row.domain.domain_name: row for row in DomainAnalysisQueue.query}
+
+
+def test_run_once_completes_rows_and_batch(queue):
+    from src.models.domain import DomainBatch
+    scheduler, _, db, batch_id = queue
+    assert scheduler.run_once() == 2
+    assert {row.status for row in rows(db).values()} == {'completed'}
+    batch = db.session.get(DomainBatch, batch_id)
+    assert (batch.processed_domains, batch.status, batch.progress_percentage) == (2, 'completed', 100.0)
+
+
+def test_transient_failures_retry_until_attempts_run_out(queue):
+    scheduler, outcomes, db, _ = queue
+    outcomes['example.org'] = ConnectionError('timed out')
+    for attempt in range(1, 4):
+        scheduler.run_once()
+        row = rows(db)['example.org']
+        assert row.attempts == attempt
+        assert row.status == ('failed' if attempt == 3 else 'queued')
+    assert rows(db)['example.org'].domain.analysis_status == 'failed'
+    assert scheduler.stats()['retried'] == 2
+
+
+def expire_lease(db, row, attempts):
+    row.status, row.lease_owner = 'processing', 'dead-worker'
+    row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    row.attempts = attempts
+    db.session.commit()
+
+
+def test_expired_lease_is_reclaimed_while_attempts_remain(queue):
+    scheduler, _, db, _ = queue
+    expire_lease(db, rows(db)['example.com'], attempts=1)
+    assert scheduler.run_once() == 2
+    row = rows(db)['example.com']
+    assert (row.status, row.attempts) == ('completed', 2)
+
+
+def test_expired_lease_on_last_attempt_fails_the_row(queue):
+    from src.models.domain import DomainBatch
+    scheduler, _, db, batch_id = queue
+    expire_lease(db, rows(db)['example.com'], attempts=3)
+
+    assert scheduler.run_once() == 1  # only example.org is claimed
+    row = rows(db)['example.com']
+    assert (row.status, row.attempts, row.lease_owner) == ('failed', 3, None)
+    assert row.domain.analysis_status == 'failed'
+    assert 'Lease expired' in row.error_message
+    batch = db.session.get(DomainBatch, batch_id)
+    assert (batch.processed_domains, batch.failed_domains, batch.status) == (1, 1, 'completed')
+    assert scheduler.stats()['exhausted'] == 1
+
+
+def test_domain_stats_include_the_scheduler(db_app):
+    from src.routes.domain_routes import domain_bp
+    db_app.register_blueprint(domain_bp, url_prefix='/api')
+    body = db_app.test_client().get('/api/domains/stats').get_json()
+    assert {'claimed', 'completed', 'failed', 'exhausted'} <= set(body['analysis'])
+    assert 'stats' in body
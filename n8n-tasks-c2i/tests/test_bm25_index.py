@@ -0,0 +1,93 @@
+"""
+BM25 scores match the Okapi formula, before and after the index is frozen
+"""
+import math
+
+import pytest
+
+from bm25_index import BM25Index
+from knowledge_matcher import tokenize
+
+DOCUMENTS = [
+    ('secoinfi', 'SECOINFI is a blockchain business development company'),
+    ('services', 'blockchain development, smart contracts, domain analysis and blockchain audits'),
+    ('domains', 'domain analysis covers domain authority and sitemaps'),
+    ('contact', 'contact the CEO by phone')
+]
+
+
+def okapi(query, documents, k1=1.5, b=0.75):
+    """Reference BM25 scores computed term by term"""
+    tokenized = {doc_id: tokenize(text) for doc_id, text in documents}
+    avgdl = sum(len(tokens) for tokens in tokenized.values()) / len(tokenized)
+    scores = {}
+    for term in set(tokenize(query)):
+        df = sum(term in tokens for tokens in tokenized.values())
+        if not df:
+            continue
+        idf = math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+        for doc_id, tokens in tokenized.items():
+            tf = tokens.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(tokens) / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return sorted(((doc_id, round(score, 4)) for doc_id, score in scores.items()), key=lambda item: -item[1])
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add_documents((doc_id, text, None, None) for doc_id, text in DOCUMENTS)
+    return index
+
+
+@pytest.mark.parametrize('query', ['blockchain', 'domain analysis', 'contact phone', 'payments'])
+@pytest.mark.parametrize('frozen', [False, True])
+def test_scores_match_okapi(index, query, frozen):
+    if frozen:
+        index.freeze()
+    results = [(result['doc_id'], result['score']) for result in index.search(query, top_k=10)]
+    expected = okapi(query, DOCUMENTS)
+    assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-3)
+
+
+def test_top_k_and_passages(index):
+    index.add_document('voice', 'voice assistant', passage='Infy answers by voice')
+    results = index.search('blockchain voice', top_k=2)
+    assert len(results) == 2
+    assert index.search('voice')[0]['passage'] == 'Infy answers by voice'
+
+
+def test_frozen_index_rejects_writes(index):
+    index.freeze()
+    with pytest.raises(RuntimeError):
+        index.add_document('late', 'late document')
+
+
+def test_extended_index_scores_like_a_rebuild(index):
+    index.freeze()
+    before = index.search('blockchain development', top_k=10)
+    extended = index.extended(
+        [('contact', 'contact the CEO by phone or email', None, None),
+         ('payments', 'blockchain payments and wallets', None, None)],
+        removed=['secoinfi']
+    )
+    survivors = [('services', DOCUMENTS[1][1]), ('domains', DOCUMENTS[2][1]),
+                 ('contact', 'contact the CEO by phone or email'), ('payments', 'blockchain payments and wallets')]
+    for query in ('blockchain', 'contact phone email', 'domain analysis'):
+        results = [(result['doc_id'], result['score']) for result in extended.search(query, top_k=10)]
+        expected = okapi(query, survivors)
+        assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected], abs=1e-3)
+    assert len(extended) == 4 and extended.stats()['superseded_rows'] == 2
+    # Readers of the original index see it unchanged
+    assert index.search('blockchain development', top_k=10) == before
+    assert len(index) == 4
+
+
+def test_discarded_documents_leave_search(index):
+    index.discard(['services', 'missing'])
+    assert [result['doc_id'] for result in index.search('blockchain', top_k=10)] == ['secoinfi']
+    with pytest.raises(RuntimeError):
+        index.extended([])
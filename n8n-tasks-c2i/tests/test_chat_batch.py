@@ -0,0 +1,57 @@
+"""
+A batch answers every message against one knowledge snapshot, and answers
+from a snapshot replaced mid-batch never reach the response cache
+"""
+import pytest
+
+NEW_CONTACT = 'Write to hello@seco.in.net'
+
+
+@pytest.fixture
+def main():
+    import main
+    original = main.knowledge_store.current
+    main.response_cache.invalidate()
+    yield main
+    main.publish_knowledge(knowledge_base=dict(original.knowledge_base))
+
+
+def test_batch_answers_in_order_and_dedupes(main):
+    reply = main.app.test_client().post('/api/infy/chat/batch', json={'messages': [
+        {'message': 'how can I reach you'},
+        {'message': 'What services do you offer?'},
+        {'message': ''},
+        {'message': 'HOW can I reach you!'}
+    ]})
+    body = reply.get_json()
+    assert reply.status_code == 200
+    assert [item['index'] for item in body['responses']] == [0, 1, 2, 3]
+    assert body['failed'] == 1 and 'error' in body['responses'][2]
+    assert body['responses'][0]['response'] == body['responses'][3]['response']
+    assert body['knowledge_version'] == main.knowledge_store.current.version
+
+
+def test_batch_limits_are_enforced(main):
+    client = main.app.test_client()
+    assert client.post('/api/infy/chat/batch', json={'messages': []}).status_code == 400
+    too_many = [{'message': 'hi'}] * (main.CHAT_BATCH_MAX_ITEMS + 1)
+    assert client.post('/api/infy/chat/batch', json={'messages': too_many}).status_code == 413
+
+
+def test_answer_from_replaced_snapshot_is_not_cached(main):
+    pinned = main.pin_knowledge()
+    old_contact = pinned[0].knowledge_base['Contact']
+    main.publish_knowledge(knowledge_base={**pinned[0].knowledge_base, 'Contact': NEW_CONTACT})
+
+    response, _, cached = main.get_chat_answer('how can I reach you', pinned)
+    assert (response, cached) == (old_contact, False)
+    assert main.get_chat_answer('how can I reach you')[0] == NEW_CONTACT
+
+
+def test_pinned_request_ignores_answers_cached_for_a_newer_snapshot(main):
+    pinned = main.pin_knowledge()
+    old_contact = pinned[0].knowledge_base['Contact']
+    main.publish_knowledge(knowledge_base={**pinned[0].knowledge_base, 'Contact': NEW_CONTACT})
+
+    assert main.get_chat_answer('how can I reach you')[0] == NEW_CONTACT
+    assert main.get_chat_answer('how can I reach you', pinned)[0] == old_contact
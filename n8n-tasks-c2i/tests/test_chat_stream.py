@@ -0,0 +1,65 @@
+"""
+The streaming chat endpoint sends its first event before the answer is
+computed, then the answer in sentence-aligned chunks
+"""
+import json
+
+from chat_stream import StreamTimings, chunk_text, sse_event
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_sse_event_format():
+    assert sse_event('chunk', {'text': 'hi'}) == 'event: chunk\ndata: {"text": "hi"}\n\n'
+
+
+def test_chunks_are_sentence_aligned_and_bounded():
+    text = 'First sentence. Second sentence is longer! ' + 'word ' * 30
+    chunks = list(chunk_text(text, max_chars=40))
+    assert chunks[0] == 'First sentence.'
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert ' '.join(chunks).split() == text.split()
+
+
+def test_timings_summarise_each_stage():
+    timings = StreamTimings()
+    timings.record(5.0, 10.0, first_event_ms=1.0)
+    stats = timings.stats()
+    assert stats['streams'] == 1
+    assert stats['first_event_ms']['p50'] == 1.0
+    assert stats['first_chunk_ms']['p50'] == 5.0
+
+
+def test_first_event_is_sent_before_the_answer(monkeypatch):
+    import main
+    calls = []
+    answer = main.answer_message
+
+    def recording_answer(message, snapshot):
+        calls.append(message)
+        return answer(message, snapshot)
+
+    monkeypatch.setattr(main, 'answer_message', recording_answer)
+    main.response_cache.invalidate()
+
+    reply = main.app.test_client().post('/api/infy/chat/stream', json={'message': 'what services do you offer'},
+                                        buffered=False)
+    stream = iter(reply.response)
+    first = next(stream)
+    first = first.decode() if isinstance(first, bytes) else first
+    assert first.startswith('event: start')
+    assert calls == []
+
+    rest = ''.join(part.decode() if isinstance(part, bytes) else part for part in stream)
+    events = parse_events(first + rest)
+    assert [name for name, _ in events][:2] == ['start', 'meta']
+    assert events[1][1]['topic'] == 'Services'
+    assert events[-1][0] == 'done'
+    assert ''.join(data['text'] for name, data in events if name == 'chunk')
+    assert calls == ['what services do you offer']
@@ -0,0 +1,84 @@
+"""
+Conversation rows reach a sink in batches, and rows that cannot be written
+are counted rather than lost silently
+"""
+import json
+
+from conversation_log import WriteBehindLog, jsonl_sink
+
+
+def test_rows_flush_to_the_sink_in_batches():
+    batches = []
+    log = WriteBehindLog(batch_size=2)
+    log.sink = batches.append
+    log.extend([{'n': n} for n in range(5)])
+    assert log.flush() == 5
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert log.stats()['flushed'] == 5
+
+
+def test_overflow_without_sink_is_counted():
+    log = WriteBehindLog(capacity=3)
+    for n in range(5):
+        log.append({'n': n})
+    stats = log.stats()
+    assert stats['dropped'] == 2
+    assert stats['dropped_without_sink'] == 2
+    assert not stats['sink_attached']
+    assert [row['n'] for row in log.recent()] == [2, 3, 4]
+
+
+def test_failed_batches_are_counted_as_dropped():
+    def failing(rows):
+        raise RuntimeError('database unavailable')
+
+    log = WriteBehindLog()
+    log.sink = failing
+    log.extend([{'n': 1}, {'n': 2}])
+    assert log.flush() == 0
+    assert log.stats()['failed_batches'] == 1
+    assert log.stats()['dropped'] == 2
+
+
+def test_jsonl_sink_appends_rows(tmp_path):
+    from datetime import datetime
+    path = tmp_path / 'conversations.jsonl'
+    sink = jsonl_sink(str(path))
+    sink([{'session_id': 's', 'timestamp': datetime(2026, 1, 1)}])
+    sink([{'session_id': 't', 'timestamp': datetime(2026, 1, 2)}])
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rows == [{'session_id': 's', 'timestamp': '2026-01-01T00:00:00'},
+                    {'session_id': 't', 'timestamp': '2026-01-02T00:00:00'}]
+
+
+def test_main_app_writes_chat_exchanges():
+    import main
+    assert main.conversation_log.stats()['sink_attached']
+    client = main.app.test_client()
+    reply = client.post('/api/infy/chat', json={'message': 'how can I reach you', 'session_id': 'log-test'})
+    assert reply.status_code == 200
+    main.conversation_log.flush()
+    with open(main.CONVERSATION_LOG_PATH) as handle:
+        rows = [json.loads(line) for line in handle]
+    assert {'session_id': 'log-test', 'user_query': 'how can I reach you'}.items() <= rows[-1].items()
+
+
+def test_database_sink_reaches_both_copies_of_the_log(db_app):
+    import main
+    from src.models.knowledge import ConversationLog
+    from src.models.user import db
+    from src.services import conversation_log as services_log
+    from conversation_log import sqlalchemy_sink, start_everywhere
+
+    assert main.conversation_log is not services_log.conversation_log
+    try:
+        assert start_everywhere(sqlalchemy_sink(db_app, db, ConversationLog)) == 2
+        main.log_conversation('db-test', 'how can I reach you', 'Call us')
+        services_log.conversation_log.append({'session_id': 'db-test', 'user_query': 'hi', 'infy_response': 'Hello'})
+        main.conversation_log.flush()
+        services_log.conversation_log.flush()
+        stored = ConversationLog.query.filter_by(session_id='db-test').order_by(ConversationLog.id).all()
+        assert [row.user_query for row in stored] == ['how can I reach you', 'hi']
+    finally:
+        main.conversation_log.start(jsonl_sink(main.CONVERSATION_LOG_PATH))
+        services_log.conversation_log.sink = None
@@ -0,0 +1,75 @@
+"""
+The dedup index keys on canonical URLs, so uploads dedup the same way with or
+without it, and it lives exactly as long as the store it guards
+"""
+from dedup_index import DedupIndex
+from domain_ingest import ingest
+
+ROWS = [('example.com', 'https://'), ('http://example.com', None), ('EXAMPLE.com', 'https://'),
+        ('seco.in.net', 'http://'), ('bad domain', None)]
+
+
+def stored_rows(dedup):
+    stored = []
+    counts = ingest(iter(ROWS), lambda rows: stored.extend(rows) or len(rows), chunk_size=2, dedup=dedup)
+    return stored, counts
+
+
+def test_ingest_dedups_the_same_with_and_without_the_index():
+    without, counts_without = stored_rows(None)
+    with_index, counts_with = stored_rows(DedupIndex())
+    assert with_index == without
+    assert without == [('example.com', 'https://'), ('example.com', 'http://'), ('seco.in.net', 'http://')]
+    assert counts_with == counts_without
+
+
+def test_index_skips_urls_from_earlier_uploads():
+    index = DedupIndex()
+    stored_rows(index)
+    stored, counts = stored_rows(index)
+    assert stored == []
+    assert counts['duplicates'] == 4
+
+
+def test_persistent_index_is_reused_until_rebuilt(tmp_path):
+    index = DedupIndex(str(tmp_path))
+    index.add(['https://example.com', 'http://example.com'])
+    index.flush()
+
+    reopened = DedupIndex(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.filter_new(['https://example.com', 'https://seco.in.net']) == ['https://seco.in.net']
+
+    # Rebuilding from the guarded store forgets URLs that store no longer holds
+    reopened.rebuild(['https://seco.in.net'])
+    assert len(reopened) == 1
+    assert reopened.filter_new(['https://example.com', 'https://seco.in.net']) == ['https://example.com']
+
+
+def test_shared_index_is_in_memory_by_default(monkeypatch):
+    import importlib
+    import dedup_index
+
+    monkeypatch.delenv('DOMAIN_DEDUP_DIR', raising=False)
+    try:
+        assert importlib.reload(dedup_index).domain_dedup.stats()['persistent'] is False
+    finally:
+        importlib.reload(dedup_index)
+
+
+def test_main_index_follows_its_store():
+    import main
+    assert len(main.domain_dedup) == len(main.data_store['domains'])
+
+
+def test_bulk_upsert_dedups_the_same_with_and_without_the_index(db_app):
+    from src.models.domain import Domain
+    from src.models.user import db
+    from src.services.domain_upsert import bulk_upsert_domains
+
+    index = DedupIndex()
+    first = bulk_upsert_domains(db.session, [('example.com', 'https://'), ('example.com', 'http://')], dedup=index)
+    assert first['inserted'] == 2
+    again = bulk_upsert_domains(db.session, [('example.com', 'http://'), ('seco.in.net', 'https://')], dedup=index)
+    assert (again['inserted'], again['skipped']) == (1, 1)
+    assert Domain.query.count() == 3
@@ -0,0 +1,126 @@
+"""
+Domain aggregates stay equal to a full recount through inserts, rewrites and
+deletes, percentiles stay within the sketch accuracy, and shards merge
+"""
+import random
+
+import pytest
+
+from domain_aggregates import AggregatedStore, DomainAggregates, QuantileSketch
+
+
+def result(key, authority, status='completed', protocol='https://', google=False, pages=None):
+    return {
+        'domain': key,
+        'protocol': protocol,
+        'ranking': {'domain_authority': authority, 'page_authority': authority // 2},
+        'sitemap': {'found': pages is not None, 'pages_count': pages or 0},
+        'indexing': {'google_indexed': google, 'bing_indexed': False},
+        'status': status
+    }
+
+
+def recount(records):
+    aggregates = DomainAggregates()
+    aggregates.rebuild(records)
+    return aggregates.stats()
+
+
+def comparable(stats):
+    return {key: value for key, value in stats.items() if key != 'updates'}
+
+
+def test_incremental_updates_match_a_recount():
+    aggregates = DomainAggregates()
+    store = AggregatedStore(aggregates)
+    generator = random.Random(17)
+    for step in range(500):
+        key = f"site{generator.randrange(60)}.example"
+        if key in store and generator.random() < 0.2:
+            del store[key]
+        else:
+            store[key] = result(key, generator.randrange(101), generator.choice(['completed', 'queued', 'failed']),
+                                generator.choice(['https://', 'http://']), generator.random() < 0.5,
+                                generator.choice([None, 10, 2500]))
+    assert comparable(aggregates.stats()) == comparable(recount(store.values()))
+    assert aggregates.stats()['domains'] == len(store)
+
+
+def test_counters_shares_and_histograms():
+    aggregates = DomainAggregates()
+    store = AggregatedStore(aggregates)
+    store['a.example'] = result('a.example', 5, google=True, pages=100)
+    store['b.example'] = result('b.example', 55, protocol='http://')
+    store['c.example'] = result('c.example', 100, google=True)
+    store['d.example'] = {'domain': 'd.example', 'protocol': 'https://', 'status': 'queued'}
+
+    stats = aggregates.stats()
+    assert (stats['domains'], stats['analyzed']) == (4, 3)
+    assert stats['by_status'] == {'completed': 3, 'queued': 1}
+    assert stats['by_protocol'] == {'https://': 3, 'http://': 1}
+    # Shares are of analyzed domains only
+    assert stats['google_indexed'] == {'count': 2, 'share': 0.6667}
+    assert stats['sitemap_found'] == {'count': 1, 'share': 0.3333}
+    counts = [bucket['count'] for bucket in stats['domain_authority']['histogram']]
+    assert counts == [1, 0, 0, 0, 0, 1, 0, 0, 0, 1]  # 100 lands in the last bucket
+    assert stats['domain_authority']['histogram'][-1] == {'min': 90, 'max': 100, 'count': 1}
+
+    # A queued domain that completes moves between statuses
+    store['d.example'] = result('d.example', 30)
+    stats = aggregates.stats()
+    assert stats['by_status'] == {'completed': 4}
+    assert stats['analyzed'] == 4
+
+
+def test_percentiles_are_within_the_relative_accuracy():
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    values = sorted(random.Random(3).uniform(1, 10 ** 6) for _ in range(10000))
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_removed_values_leave_no_trace():
+    sketch = QuantileSketch()
+    for value in (0, 3, 40, 500):
+        sketch.add(value)
+    for value in (0, 40, 500):
+        sketch.add(value, -1)
+    assert sketch.count == 1 and sketch.zeros == 0
+    assert sketch.quantile(0.99) == pytest.approx(3, rel=0.01)
+
+
+def test_shards_merge_into_the_combined_statistics():
+    records = [result(f"site{number}.example", number % 101, pages=number * 7 if number % 2 else None)
+               for number in range(300)]
+    first, second = DomainAggregates(), DomainAggregates()
+    first.rebuild(records[:120])
+    second.rebuild(records[120:])
+    first.merge(second)
+    assert comparable(first.stats()) == comparable(recount(records))
+
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_flat_domain_rows_and_to_dict_records_aggregate_alike():
+    flat = {'analysis_status': 'completed', 'protocol': 'https://', 'domain_authority': 40, 'page_authority': 20,
+            'google_indexed': True, 'bing_indexed': False, 'sitemap_found': True, 'sitemap_pages_count': 90}
+    nested = {'protocol': 'https://', 'ranking': {'domain_authority': 40, 'page_authority': 20},
+              'sitemap': {'found': True, 'pages_count': 90}, 'indexing': {'google_indexed': True},
+              'analysis': {'status': 'completed'}}
+    assert comparable(recount([flat])) == comparable(recount([nested]))
+
+
+def test_stats_endpoints(db_app):
+    import main
+    from src.routes.domain_routes import domain_bp
+    db_app.register_blueprint(domain_bp, url_prefix='/api')
+    body = db_app.test_client().get('/api/domains/stats').get_json()
+    assert 'domain_authority' in body['stats'] and 'analysis' in body
+
+    stats = main.app.test_client().get('/api/domain/stats').get_json()['stats']
+    assert stats['domains'] == len(main.data_store['domains'])
@@ -0,0 +1,69 @@
+"""
+Every spelling of a domain collapses to one key and id, and only domains the
+analyzers may safely probe are accepted
+"""
+import pytest
+
+from domain_canonical import canonicalize, protocol_variants, supported_protocol
+from domain_ingest import normalize_row
+
+
+@pytest.mark.parametrize('spelling', [
+    'example.com', 'EXAMPLE.com.', 'https://example.com/', 'http://www.example.com:80',
+    'https://user@example.com:443/?q=1#top', 'www.example.com'
+])
+def test_spellings_share_key_and_id(spelling):
+    canonical = canonicalize(spelling)
+    assert canonical.key == 'example.com'
+    assert canonical.id == canonicalize('example.com').id
+
+
+def test_url_keeps_scheme_www_port_and_path():
+    assert canonicalize('www.Example.com:8443/Shop/', 'https://').url == 'https://www.example.com:8443/Shop'
+    assert canonicalize('bücher.de').key == 'xn--bcher-kva.de'
+
+
+@pytest.mark.parametrize('protocol', ['http://', 'https://', 'http://www.', 'https://www.', 'wsl://', 'upi://'])
+def test_protocol_list_schemes_are_accepted(protocol):
+    assert canonicalize('example.com', protocol).protocol == protocol
+
+
+@pytest.mark.parametrize('domain, protocol', [
+    ('example.com', 'file://'), ('example.com', 'gopher://'), ('example.com', 'ftp://'),
+    ('ftp://example.com', None), ('javascript://example.com', None)
+])
+def test_other_schemes_are_rejected(domain, protocol):
+    with pytest.raises(ValueError, match='Unsupported protocol'):
+        canonicalize(domain, protocol)
+
+
+@pytest.mark.parametrize('domain', [
+    'localhost', 'http://localhost:8080', 'api.localhost', 'printer.local', 'intranet',
+    '127.0.0.1', '127.1', '2130706433', '0.0.0.0', '10.0.0.5', '192.168.1.1', '172.16.0.1',
+    '169.254.169.254', 'http://169.254.169.254/latest/meta-data', '[::1]', '[fe80::1]',
+    '[::ffff:127.0.0.1]', '[fd00::1]'
+])
+def test_local_and_private_hosts_are_rejected(domain):
+    with pytest.raises(ValueError):
+        canonicalize(domain)
+    assert normalize_row(domain, None) is None
+
+
+@pytest.mark.parametrize('domain', ['8.8.8.8', '[2001:4860:4860::8888]', 'seco.in.net'])
+def test_public_hosts_are_accepted(domain):
+    assert canonicalize(domain).host == domain
+
+
+def test_protocol_variants_check_schemes():
+    variants = protocol_variants('https://www.example.com', ['http://', 'upi://'])
+    assert [canonical.url for _, canonical in variants] == ['http://example.com', 'upi://example.com']
+    with pytest.raises(ValueError):
+        protocol_variants('example.com', ['file://'])
+    with pytest.raises(ValueError):
+        protocol_variants('169.254.169.254', ['http://'])
+
+
+def test_supported_protocol_matches_canonicalize():
+    assert supported_protocol('https://www.')
+    assert supported_protocol('UPI://')
+    assert not supported_protocol('file://')
@@ -0,0 +1,113 @@
+"""
+Columnar domain export: every matching domain is written page by page and
+reads back through the memory-mapped columns exactly as stored
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from domain_export import DomainColumns, export_domains
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+@pytest.fixture
+def domains(db_app):
+    from src.models.domain import Domain
+    from src.models.user import db
+    for number in range(12):
+        domain = Domain(f"site{number}.example", 'https://' if number % 3 else 'http://')
+        domain.domain_authority = number * 5
+        domain.page_authority = number
+        domain.google_indexed = number % 2 == 0
+        domain.sitemap_pages_count = number * 1000
+        domain.analysis_status = 'completed' if number < 8 else 'pending'
+        domain.last_analyzed = START + timedelta(hours=number) if number < 8 else None
+        domain.updated_at = START + timedelta(minutes=number)
+        db.session.add(domain)
+    db.session.commit()
+    # The column default fills None on insert; clear one afterwards to export a null
+    Domain.query.filter_by(domain_name='site4.example').update(
+        {'page_authority': None, 'updated_at': START + timedelta(minutes=4)})
+    db.session.commit()
+    return db
+
+
+@pytest.fixture
+def client(db_app, domains, tmp_path):
+    from src.routes.domain_routes import domain_bp
+    db_app.config['DOMAIN_EXPORT_DIR'] = str(tmp_path / 'exports')
+    db_app.register_blueprint(domain_bp, url_prefix='/api')
+    return db_app.test_client()
+
+
+def test_export_reads_back_through_memory_maps(client, tmp_path):
+    response = client.post('/api/domains/export')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['rows'] == 12
+    assert body['directory'].startswith(str(tmp_path / 'exports'))
+
+    columns = DomainColumns(body['directory'])
+    assert len(columns) == 12
+    assert isinstance(columns.column('domain_authority'), np.memmap)
+    assert columns.strings('domain_name') == [f"site{number}.example" for number in range(12)]
+    assert columns.strings('domain_name', 3, 5) == ['site3.example', 'site4.example']
+    assert columns.column('domain_authority').tolist() == [number * 5 for number in range(12)]
+    assert columns.column('page_authority')[4] == -1  # null sentinel
+    assert columns.column('google_indexed').tolist() == [number % 2 == 0 for number in range(12)]
+    assert columns.column('sitemap_pages_count').sum() == 66000
+
+    statuses = columns.categories('analysis_status')
+    decoded = [statuses[code] for code in columns.column('analysis_status')]
+    assert decoded == ['completed'] * 8 + ['pending'] * 4
+    protocols = columns.categories('protocol')
+    assert sorted(protocols) == ['http://', 'https://']
+
+    analyzed = columns.column('last_analyzed')
+    assert analyzed[1] == np.datetime64(START + timedelta(hours=1), 's')
+    assert np.isnat(analyzed[8:]).all()
+
+
+def test_filters_and_pages_match_a_single_pass(domains, tmp_path):
+    from domain_listing import parse_filters
+    conditions = parse_filters({'status': 'completed', 'min_da': '10'})
+    paged = export_domains(domains.session, str(tmp_path / 'paged'), conditions, page_size=2)
+    whole = export_domains(domains.session, str(tmp_path / 'whole'), conditions)
+    assert paged['rows'] == whole['rows'] == 6
+
+    paged, whole = DomainColumns(str(tmp_path / 'paged')), DomainColumns(str(tmp_path / 'whole'))
+    assert paged.strings('domain_name') == whole.strings('domain_name')
+    for name in ('id', 'page_authority', 'updated_at', 'analysis_status'):
+        assert paged.column(name).tolist() == whole.column(name).tolist()
+    assert [page['domain_authority'].tolist() for page in paged.pages(['domain_authority'], page_rows=4)] == \
+           [[10, 15, 20, 25], [30, 35]]
+
+
+def test_empty_export_has_a_manifest(domains, tmp_path):
+    from domain_listing import parse_filters
+    manifest = export_domains(domains.session, str(tmp_path / 'empty'), parse_filters({'status': 'failed'}),
+                              filters={'status': 'failed'})
+    assert manifest['rows'] == 0 and manifest['filters'] == {'status': 'failed'}
+    columns = DomainColumns(str(tmp_path / 'empty'))
+    assert columns.strings('domain_name') == []
+    assert columns.column('id').tolist() == []
+
+
+def test_failed_export_leaves_no_manifest(domains, tmp_path, monkeypatch):
+    import domain_export
+
+    def broken_pages(*args, **kwargs):
+        yield from ()
+        raise RuntimeError('connection lost')
+
+    monkeypatch.setattr(domain_export, 'iter_pages', broken_pages)
+    with pytest.raises(RuntimeError):
+        export_domains(domains.session, str(tmp_path / 'broken'))
+    with pytest.raises(FileNotFoundError):
+        DomainColumns(str(tmp_path / 'broken'))
+
+
+def test_malformed_filters_are_rejected(client):
+    assert client.post('/api/domains/export?min_da=lots').status_code == 400
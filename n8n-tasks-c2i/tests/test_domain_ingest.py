@@ -0,0 +1,52 @@
+"""
+Bulk uploads stream through parsing, normalization and deduplication to a
+sink in fixed-size chunks, whatever the body's format or compression
+"""
+import gzip
+import io
+
+import pytest
+
+from domain_ingest import detect_format, ingest, ingest_upload, open_upload
+
+CSV_BODY = b"domain,protocol\nExample.com,https://\nexample.org,http://\n,https://\nexample.com.,https://\n"
+NDJSON_BODY = b'{"domain": "Example.com"}\n"example.org"\nnot json\n[1]\n{"domain": "example.com"}\n'
+
+
+class Sink:
+    def __init__(self):
+        self.chunks = []
+
+    def __call__(self, rows):
+        self.chunks.append(list(rows))
+        return len(rows)
+
+
+@pytest.mark.parametrize('body, expected_format', [(CSV_BODY, 'csv'), (NDJSON_BODY, 'ndjson')])
+@pytest.mark.parametrize('compress', [False, True])
+def test_upload_formats(body, expected_format, compress):
+    sink = Sink()
+    stream = io.BytesIO(gzip.compress(body) if compress else body)
+    counts = ingest_upload(stream, sink, chunk_size=10)
+    assert counts['format'] == expected_format
+    assert counts['accepted'] == counts['stored'] == 2
+    assert counts['duplicates'] == 1
+    assert [key for chunk in sink.chunks for key, _ in chunk] == ['example.com', 'example.org']
+
+
+def test_content_type_wins_over_sniffing():
+    upload = open_upload(io.BytesIO(b'{"domain": "example.com"}\n'))
+    assert detect_format(upload, 'text/csv') == 'csv'
+    assert detect_format(upload, 'application/x-ndjson') == 'ndjson'
+
+
+def test_rows_reach_the_sink_in_chunks():
+    sink = Sink()
+    counts = ingest(((f"site-{index}.example.com", None) for index in range(25)), sink, chunk_size=10)
+    assert [len(chunk) for chunk in sink.chunks] == [10, 10, 5]
+    assert counts['chunks'] == 3 and counts['stored'] == 25
+
+
+def test_unsupported_format_is_rejected():
+    with pytest.raises(ValueError):
+        ingest_upload(io.BytesIO(CSV_BODY), Sink(), file_format='xml')
@@ -0,0 +1,99 @@
+"""
+Domain listing: keyset pages cover every match exactly once, even when rows
+share an updated_at, filters narrow the pages, and NDJSON streams the lean view
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain_listing import decode_cursor, encode_cursor
+
+START = datetime(2026, 10, 1, 12, 0)
+
+
+@pytest.fixture
+def client(db_app):
+    from src.models.domain import Domain
+    from src.models.user import db
+    from src.routes.domain_routes import domain_bp
+    for number in range(25):
+        domain = Domain(f"site{number}.example", 'https://' if number % 2 else 'http://')
+        domain.domain_authority, domain.page_authority = number * 4, number
+        domain.google_indexed, domain.sitemap_found = number % 3 == 0, number % 5 == 0
+        domain.analysis_status = 'completed' if number < 20 else 'pending'
+        # Groups of three share a timestamp, so pages must break ties on id
+        domain.updated_at = START + timedelta(minutes=number // 3)
+        db.session.add(domain)
+    db.session.commit()
+    db_app.register_blueprint(domain_bp, url_prefix='/api')
+    return db_app.test_client()
+
+
+def walk(client, query):
+    """Every page of a listing; returns the domain names in order and the page count"""
+    names, pages, cursor = [], 0, None
+    while True:
+        response = client.get(f"/api/domains?{query}" + (f"&cursor={cursor}" if cursor else ''))
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['count'] == len(body['domains'])
+        names += [domain['domain_name'] for domain in body['domains']]
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return names, pages
+
+
+def test_pages_cover_every_domain_once_in_keyset_order(client):
+    names, pages = walk(client, 'limit=7')
+    assert names == [f"site{number}.example" for number in range(25)]
+    assert pages == 4
+
+    names, _ = walk(client, 'limit=4&order=desc')
+    assert names == [f"site{number}.example" for number in reversed(range(25))]
+
+
+def test_last_full_page_has_no_cursor(client):
+    body = client.get('/api/domains?limit=25').get_json()
+    assert body['count'] == 25 and body['next_cursor'] is None
+
+
+def test_filters_narrow_the_pages(client):
+    names, _ = walk(client, 'limit=2&min_da=40&max_da=80&google_indexed=true')
+    assert names == ['site12.example', 'site15.example', 'site18.example']
+
+    names, _ = walk(client, 'limit=3&status=pending,failed&protocol=https://')
+    assert names == ['site21.example', 'site23.example']
+
+    names, _ = walk(client, 'sitemap_found=no&min_pa=18')
+    assert names == [f"site{number}.example" for number in range(18, 25) if number % 5]
+
+
+def test_lean_and_full_views(client):
+    lean = client.get('/api/domains?limit=1').get_json()['domains'][0]
+    assert lean['full_url'] == 'http://site0.example'
+    assert lean['updated_at'] == START.isoformat()
+    assert 'analysis_notes' not in lean
+
+    full = client.get('/api/domains?limit=1&view=full').get_json()['domains'][0]
+    assert full['full_url'] == 'http://site0.example'
+    assert full['analysis']['status'] == 'completed'
+
+
+def test_ndjson_streams_every_match(client):
+    response = client.get('/api/domains?format=ndjson&status=completed')
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['domain_name'] for record in records] == [f"site{number}.example" for number in range(20)]
+
+
+@pytest.mark.parametrize('query', ['cursor=not-a-cursor', 'min_da=high', 'google_indexed=maybe', 'limit=ten'])
+def test_malformed_arguments_are_rejected(client, query):
+    response = client.get(f"/api/domains?{query}")
+    assert response.status_code == 400
+    assert response.get_json()['error']
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
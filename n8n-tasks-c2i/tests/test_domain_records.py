@@ -0,0 +1,54 @@
+"""
+The compact domain store decodes every record to exactly what was stored,
+however many distinct protocols, statuses or sitemap paths it sees
+"""
+from domain_records import CompactDomainStore
+
+
+def result(key, protocol='https://', status='completed', sitemap_path='/sitemap.xml'):
+    return {
+        'domain': key,
+        'protocol': protocol,
+        'full_url': f"{protocol}{key}",
+        'ranking': {'domain_authority': 42, 'page_authority': 17},
+        'sitemap': {'found': True, 'url': f"{protocol}{key}{sitemap_path}", 'pages_count': 1200},
+        'indexing': {'google_indexed': True, 'bing_indexed': False},
+        'status': status,
+        'analyzed_at': '2026-10-17T09:30:00.123456'
+    }
+
+
+def test_common_records_round_trip_without_extras():
+    store = CompactDomainStore()
+    records = {f"site{index}.example": result(f"site{index}.example", protocol)
+               for index, protocol in enumerate(['https://', 'http://', 'https://www.', 'upi://'] * 5)}
+    records['queued.example'] = {'domain': 'queued.example', 'protocol': 'https://',
+                                 'full_url': 'https://queued.example', 'status': 'queued',
+                                 'queued_at': '2026-10-17T09:00:00'}
+    store.update(records)
+    assert {key: store[key] for key in records} == records
+    stats = store.stats()
+    assert stats['rows_with_extras'] == 0
+    assert (stats['protocols'], stats['statuses']) == (4, 2)
+
+
+def test_more_than_256_distinct_values_overflow_to_extras():
+    store = CompactDomainStore()
+    records = {f"site{index}.example": result(f"site{index}.example", f"p{index}://", f"status-{index}",
+                                              f"/maps/{index}.xml")
+               for index in range(300)}
+    for key, record in records.items():
+        store[key] = record  # must not raise once the interners are full
+    assert {key: store[key] for key in records} == records
+    assert store.stats()['protocols'] == 255
+    assert store.stats()['rows_with_extras'] == 300 - 255
+
+    # Interned values keep working after the overflow, including for rewrites
+    store['site0.example'] = result('site0.example', 'p0://', 'status-299')
+    assert store['site0.example'] == result('site0.example', 'p0://', 'status-299')
+
+
+def test_records_without_protocol_or_status():
+    store = CompactDomainStore()
+    store['bare.example'] = {'domain': 'bare.example', 'note': 'kept'}
+    assert store['bare.example'] == {'domain': 'bare.example', 'note': 'kept'}
@@ -0,0 +1,153 @@
+"""
+Bulk domain upserts: the bulk-upload route stores and queues each new domain
+once, and domain tables from earlier versions are upgraded in place
+"""
+import gzip
+
+import pytest
+from sqlalchemy import inspect, text
+
+SAMPLE_CSV = b"domain,protocol\nexample.com,https://\nExample.com,https://\nseco.in.net,http://\nnot a domain,\n"
+
+
+@pytest.fixture
+def client(db_app):
+    from src.routes.domain_routes import domain_bp
+    from src.services.dedup_index import domain_dedup
+    domain_dedup.rebuild([])  # as init_database does for an empty domains table
+    db_app.register_blueprint(domain_bp, url_prefix='/api')
+    return db_app.test_client()
+
+
+def test_bulk_upload_inserts_and_queues_new_domains(client):
+    from src.models.domain import Domain, DomainAnalysisQueue, DomainBatch
+
+    response = client.post('/api/domains/bulk-upload?batch_name=first&priority=2', data=SAMPLE_CSV,
+                           content_type='text/csv')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['ingest']['invalid'] == 1
+    assert body['ingest']['duplicates'] == 1
+    assert body['upsert']['inserted'] == 2
+    assert body['batch']['total_domains'] == 2
+    assert body['batch']['file_type'] == 'csv'
+
+    assert sorted(domain.full_url for domain in Domain.query.all()) == ['http://seco.in.net', 'https://example.com']
+    entries = DomainAnalysisQueue.query.all()
+    assert len(entries) == 2
+    assert {(entry.batch_id, entry.priority, entry.status) for entry in entries} == {(body['batch']['id'], 2, 'queued')}
+
+    # Uploading the same domains again, gzip-compressed, stores and queues nothing new
+    again = client.post('/api/domains/bulk-upload', data=gzip.compress(SAMPLE_CSV), content_type='text/csv',
+                        headers={'Content-Encoding': 'gzip'})
+    assert again.status_code == 202
+    assert again.get_json()['upsert']['inserted'] == 0
+    assert again.get_json()['batch']['total_domains'] == 0
+    assert Domain.query.count() == 2
+    assert DomainAnalysisQueue.query.count() == 2
+    assert DomainBatch.query.count() == 2
+
+
+def test_enqueue_counts_new_and_requeued_entries_by_key(db_app, monkeypatch):
+    from datetime import datetime
+    from src.models.domain import Domain, DomainAnalysisQueue
+    from src.models.user import db
+    from src.services import domain_upsert
+
+    # Every call sees the same clock, so created_at cannot tell new rows from old ones
+    class FrozenClock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2026, 10, 17, 12, 0)
+
+    monkeypatch.setattr(domain_upsert, 'datetime', FrozenClock)
+    domains = [Domain(f"site{number}.example", 'https://') for number in range(3)]
+    db.session.add_all(domains)
+    db.session.commit()
+    first, second, third = (domain.id for domain in domains)
+
+    assert domain_upsert.enqueue_domains(db.session, [first, second]) == {'queued': 2, 'requeued': 0}
+    assert domain_upsert.enqueue_domains(db.session, [first, second, third], priority=3) == \
+        {'queued': 1, 'requeued': 2}
+    assert {entry.priority for entry in DomainAnalysisQueue.query.filter_by(domain_id=first)} == {3}
+
+    # A finished entry is closed, so the domain gets a new one
+    DomainAnalysisQueue.query.filter_by(domain_id=first).update({'status': 'completed'})
+    assert domain_upsert.enqueue_domains(db.session, [first, second]) == {'queued': 1, 'requeued': 1}
+    assert DomainAnalysisQueue.query.count() == 4
+
+
+def test_bulk_upload_rejects_unknown_format(client):
+    from src.models.domain import DomainBatch
+
+    response = client.post('/api/domains/bulk-upload?format=xml', data=b'<domains/>')
+    assert response.status_code == 400
+    assert DomainBatch.query.one().status == 'failed'
+
+
+# domains and domain_analysis_queue as created before canonical ids, the unique
+# full_url index and worker leases
+OLD_SCHEMA = """
+CREATE TABLE domains (
+    id INTEGER PRIMARY KEY, domain_name VARCHAR(255) NOT NULL, protocol VARCHAR(20) NOT NULL,
+    full_url VARCHAR(500) NOT NULL, domain_authority INTEGER, analysis_status VARCHAR(50),
+    created_at DATETIME, updated_at DATETIME
+);
+CREATE INDEX ix_domains_full_url ON domains (full_url);
+CREATE TABLE domain_analysis_queue (
+    id INTEGER PRIMARY KEY, domain_id INTEGER NOT NULL REFERENCES domains (id), batch_id INTEGER,
+    priority INTEGER, status VARCHAR(50), attempts INTEGER, max_attempts INTEGER, last_attempt DATETIME,
+    error_message TEXT, created_at DATETIME, updated_at DATETIME
+);
+INSERT INTO domains (id, domain_name, protocol, full_url) VALUES (1, 'example.com', 'https://', 'https://example.com');
+INSERT INTO domain_analysis_queue (id, domain_id, status) VALUES (1, 1, 'queued');
+"""
+
+
+def create_old_schema(db):
+    db.drop_all()
+    with db.engine.begin() as connection:
+        for statement in OLD_SCHEMA.split(';'):
+            if statement.strip():
+                connection.execute(text(statement))
+    db.create_all()  # new tables only; existing ones are left as they were
+
+
+def test_upgrade_brings_old_tables_up_to_date(db_app):
+    from src.models.domain import Domain
+    from src.models.user import db
+    from src.services.domain_canonical import canonicalize
+    from src.services.domain_schema import upgrade_domain_schema
+    from src.services.domain_upsert import bulk_upsert_domains
+
+    create_old_schema(db)
+    changes = upgrade_domain_schema(db)
+    assert 'domains.canonical_id' in changes
+    assert 'domain_analysis_queue.lease_expires_at' in changes
+    assert 'ix_domains_full_url' in changes
+    assert 'uq_domain_analysis_queue_open_domain' in changes
+
+    inspector = inspect(db.engine)
+    indexes = {index['name']: index for index in inspector.get_indexes('domains')}
+    assert indexes['ix_domains_full_url']['unique']
+    assert 'ix_domains_keyset' in indexes
+    assert db.session.get(Domain, 1).canonical_id == canonicalize('example.com').id
+
+    # The upgraded tables take bulk upserts, which rely on both unique indexes
+    totals = bulk_upsert_domains(db.session, [('example.com', 'https://'), ('seco.in.net', 'https://')])
+    assert (totals['inserted'], totals['skipped'], totals['queued']) == (1, 1, 1)
+
+    # Running it again changes nothing
+    assert upgrade_domain_schema(db) == []
+
+
+def test_upgrade_refuses_duplicate_urls(db_app):
+    from src.models.user import db
+    from src.services.domain_schema import upgrade_domain_schema
+
+    create_old_schema(db)
+    with db.engine.begin() as connection:
+        connection.execute(text("INSERT INTO domains (domain_name, protocol, full_url) "
+                                "VALUES ('example.com', 'https://', 'https://example.com')"))
+    with pytest.raises(RuntimeError, match='ix_domains_full_url'):
+        upgrade_domain_schema(db)
@@ -0,0 +1,104 @@
+"""
+The knowledge matcher must answer every query the original keyword scan in
+main.py answered, with the same topic
+"""
+import pytest
+
+from knowledge_matcher import KnowledgeMatcher
+
+KNOWLEDGE_BASE = {
+    'SECOINFI': 'SECOINFI is a blockchain business development company.',
+    'Services': 'SECOINFI offers blockchain development, smart contracts and domain ranking services.',
+    'Domain Analysis': 'Our domain analysis service provides comprehensive SEO insights.',
+    'Contact': 'CEO: Dileep Kumar D, Phone/WhatsApp: +91 9620058644, Website: seco.in.net'
+}
+
+KEYWORDS = {
+    'SECOINFI': ['secoinfi', 'company', 'what is'],
+    'Services': ['service', 'offer', 'provide'],
+    'Domain Analysis': ['domain', 'analysis', 'ranking'],
+    'Contact': ['contact', 'phone', 'email', 'reach']
+}
+
+# The original main.py scanned these substrings in order and answered with the first topic that hit
+BASELINE_SCAN = (
+    ('SECOINFI', ('secoinfi', 'company', 'what is')),
+    ('Services', ('service', 'offer', 'provide')),
+    ('Domain Analysis', ('domain', 'analysis', 'ranking')),
+    ('Contact', ('contact', 'phone', 'email', 'reach'))
+)
+
+BASELINE_QUERIES = [
+    'secoinfi', 'company', 'tell me about the company', 'what is', 'What is SECOINFI?', 'what is this',
+    'services', 'what do you offer', 'what do you provide',
+    'domain', 'analysis', 'ranking', 'domain ranking', 'domain analysis',
+    'contact', 'phone', 'email', 'how can I reach you', 'send me an email', 'phone number'
+]
+
+
+def baseline_topic(message):
+    message = message.lower()
+    for topic, words in BASELINE_SCAN:
+        if any(word in message for word in words):
+            return topic
+    return None
+
+
+@pytest.fixture
+def matcher():
+    matcher = KnowledgeMatcher()
+    matcher.build(KNOWLEDGE_BASE.items(), KEYWORDS)
+    return matcher
+
+
+@pytest.mark.parametrize('message', BASELINE_QUERIES)
+def test_matches_the_baseline_keyword_scan(matcher, message):
+    entry = matcher.match(message)
+    assert entry is not None
+    assert entry[0] == baseline_topic(message)
+
+
+def test_keywords_are_optional():
+    matcher = KnowledgeMatcher()
+    matcher.build(KNOWLEDGE_BASE.items())
+    assert matcher.match('email') is None
+    assert matcher.match('domain analysis')[0] == 'Domain Analysis'
+
+
+def test_extended_matcher_matches_a_rebuild():
+    services = 'SECOINFI offers smart contracts, payments and domain ranking services.'
+    initial = {topic: content for topic, content in KNOWLEDGE_BASE.items() if topic != 'Contact'}
+    initial['Pricing'] = 'Domain analysis starts at 10 USD per domain.'
+    matcher = KnowledgeMatcher()
+    matcher.build(initial.items(), KEYWORDS)
+
+    extended = matcher.extended([('Services', services), ('Contact', KNOWLEDGE_BASE['Contact'])],
+                                removed_topics=['Pricing'], keywords=KEYWORDS)
+    final = dict(KNOWLEDGE_BASE, Services=services)
+    rebuilt = KnowledgeMatcher()
+    rebuilt.build(final.items(), KEYWORDS)
+    for message in BASELINE_QUERIES + ['payments', 'how much does it cost', 'USD']:
+        assert extended.match(message) == rebuilt.match(message)
+    assert extended.stats()['entries'] == 4
+    # The original keeps serving its own entries
+    assert matcher.match('how much in USD')[0] == 'Pricing'
+    assert matcher.match('email') is None
+
+
+def test_unrelated_message_has_no_match(matcher):
+    assert matcher.match('pricing') is None
+
+
+def test_phrase_keywords_need_the_words_in_order(matcher):
+    assert matcher.match('is what') is None
+    assert matcher.match('somewhat isolated') is None
+    # Content words still outweigh the phrase
+    assert matcher.match('what is domain analysis')[0] == 'Domain Analysis'
+
+
+@pytest.mark.parametrize('message, topic', [('how can I reach you', 'Contact'), ('email', 'Contact'),
+                                            ('what is', 'SECOINFI')])
+def test_chat_answers_like_the_baseline(message, topic):
+    import main
+    response, _ = main.answer_message(message, main.knowledge_store.current)
+    assert response == main.knowledge_store.current.knowledge_base[topic]
@@ -0,0 +1,196 @@
+"""
+Chat reads the published knowledge snapshot: it is built from database rows at
+startup, admin edits derive the next one from the changed rows only, and readers
+holding an older snapshot are unaffected
+"""
+import hashlib
+
+import pytest
+
+from knowledge_snapshot import KnowledgeStore
+
+KNOWLEDGE = {
+    'SECOINFI': 'SECOINFI is a blockchain business development company.',
+    'Contact': 'CEO: Dileep Kumar D, Website: seco.in.net'
+}
+
+
+def test_publish_keeps_omitted_parts():
+    store = KnowledgeStore()
+    first = store.publish(knowledge_base=KNOWLEDGE, keywords={'Contact': ['email']},
+                          protocols=[{'protocol': 'https://'}])
+    second = store.publish(topic_queries=[{'id': 1, 'topic': 'Contact', 'query': 'How can I call?',
+                                           'answer': 'Call +91 9620058644'}])
+    assert (first.version, second.version) == (1, 2)
+    assert second.knowledge_base == first.knowledge_base
+    assert second.keywords == {'Contact': ('email',)}
+    assert [item['protocol'] for item in second.protocols] == ['https://']
+    assert first.topic_queries == () and len(second.topic_queries) == 1
+    assert store.current is second
+
+
+def test_snapshot_is_immutable():
+    snapshot = KnowledgeStore().publish(knowledge_base=KNOWLEDGE)
+    with pytest.raises(TypeError):
+        snapshot.knowledge_base['Contact'] = 'changed'
+    assert snapshot.passages.frozen
+
+
+def test_passages_carry_the_stored_content_hash():
+    store = KnowledgeStore()
+    store.publish(knowledge_base=KNOWLEDGE, content_hashes={'Contact': 'stored-contact-hash'})
+    top = store.current.passages.search('seco.in.net website', top_k=1)[0]
+    assert (top['doc_id'], top['content_hash']) == ('Contact', 'stored-contact-hash')
+    # Entries without a stored hash are hashed from their content
+    other = store.current.passages.search('blockchain company', top_k=1)[0]
+    assert other['content_hash'] == hashlib.sha256(KNOWLEDGE['SECOINFI'].encode()).hexdigest()
+
+    # Hashes stay with their entries when another part is republished
+    store.publish(topic_queries=[])
+    assert store.current.content_hashes == {'Contact': 'stored-contact-hash'}
+
+
+def test_load_knowledge_reads_the_content_hash_column(db_app):
+    from sqlalchemy import Boolean, Column, Integer, String, Text
+    from sqlalchemy.orm import declarative_base
+    from src.models.navigation import TopicQuery
+    from src.models.user import db
+    from knowledge_snapshot import load_knowledge
+
+    Base = declarative_base()
+
+    class HashedKnowledge(Base):
+        __tablename__ = 'hashed_knowledge'
+        id = Column(Integer, primary_key=True)
+        topic = Column(String(255))
+        content = Column(Text)
+        content_hash = Column(String(64))
+        priority = Column(Integer, default=1)
+        is_active = Column(Boolean, default=True)
+
+    Base.metadata.create_all(db.engine)
+    db.session.add(HashedKnowledge(topic='Contact', content=KNOWLEDGE['Contact'], content_hash='0xabc'))
+    db.session.commit()
+    parts = load_knowledge(db.session, HashedKnowledge, TopicQuery)
+    assert parts['content_hashes'] == {'Contact': '0xabc'}
+    snapshot = KnowledgeStore().publish(**parts)
+    assert snapshot.passages.search('website')[0]['content_hash'] == '0xabc'
+
+
+def add_knowledge(db, **rows):
+    from src.models.knowledge import KnowledgeBase
+    for topic, content in rows.items():
+        db.session.add(KnowledgeBase(topic=topic, content=content, is_active=True))
+    db.session.commit()
+
+
+def test_publish_from_database_reads_active_rows(db_app):
+    from src.models.knowledge import KnowledgeBase
+    from src.models.navigation import TopicQuery
+    from src.models.user import db
+    from src.services.knowledge_snapshot import knowledge_store, publish_from_database
+
+    add_knowledge(db, **KNOWLEDGE)
+    db.session.add(KnowledgeBase(topic='Retired', content='no longer served', is_active=False))
+    db.session.add(TopicQuery(1, 'Contact', 'How can I call?', 'Call +91 9620058644'))
+    db.session.commit()
+
+    snapshot = publish_from_database(db.session, KnowledgeBase, TopicQuery, keywords={'Contact': ['reach']})
+    assert knowledge_store.current is snapshot
+    assert dict(snapshot.knowledge_base) == KNOWLEDGE
+    assert [item['answer'] for item in snapshot.topic_queries] == ['Call +91 9620058644']
+    assert snapshot.matcher.match('how can I reach you')[0] == 'Contact'
+
+
+def test_admin_query_edits_publish_a_new_snapshot(db_app):
+    # TopicQuery's query column shadows Model.query, so the admin routes are
+    # exercised through the publish step they call after committing
+    from src.models.knowledge import KnowledgeBase
+    from src.models.navigation import TopicQuery
+    from src.models.user import db
+    from src.routes.admin import publish_topic_queries
+    from src.services.knowledge_snapshot import knowledge_store, publish_from_database
+    from src.services.response_cache import response_cache
+
+    add_knowledge(db, **KNOWLEDGE)
+    publish_from_database(db.session, KnowledgeBase, TopicQuery)
+    pricing = TopicQuery(1, 'Pricing', 'How much does domain analysis cost?',
+                         'Domain analysis starts at 10 USD per domain.')
+    db.session.add(pricing)
+    db.session.commit()
+    response_cache.set('how much', 'stale answer')
+    held = publish_topic_queries('Pricing').result(timeout=5)
+
+    assert knowledge_store.current is held
+    assert response_cache.get('how much') is None
+    assert dict(held.knowledge_base) == KNOWLEDGE
+    top = held.semantic.search('how much does domain analysis cost', top_k=1)[0]
+    assert top['passage'] == 'Domain analysis starts at 10 USD per domain.'
+
+    db.session.delete(pricing)
+    db.session.commit()
+    publish_topic_queries('Pricing').result(timeout=5)
+    assert knowledge_store.current.version == held.version + 1
+    assert knowledge_store.current.topic_queries == ()
+    # A reader that took the earlier snapshot keeps a consistent view
+    assert len(held.topic_queries) == 1
+
+
+def searches(snapshot):
+    """What chat reads from a snapshot, for comparing two of them"""
+    messages = ['blockchain company', 'how can I call', 'website', 'pricing per domain', 'emal', 'what is', 'USD']
+    return [(snapshot.matcher.match(message), snapshot.passages.search(message, top_k=5),
+             snapshot.semantic.search(message, top_k=5), snapshot.correct(message),
+             snapshot.trigrams.match(message)) for message in messages]
+
+
+def test_derived_snapshot_serves_like_a_rebuild():
+    store = KnowledgeStore()
+    first = store.publish(knowledge_base=dict(KNOWLEDGE, Pricing='Domain analysis costs 10 USD per domain.'),
+                          keywords={'SECOINFI': ['what is']}, content_hashes={'Pricing': 'stored'},
+                          topic_queries=[{'id': 1, 'topic': 'Contact', 'query': 'How can I call?',
+                                          'answer': 'Call +91 9620058644'},
+                                         {'id': 2, 'topic': 'Pricing', 'query': 'Is it free?', 'answer': 'No.'}])
+    before = searches(first)
+
+    derived = store.apply(knowledge_base={'Contact': 'Write to info@seco.in.net or visit the website'},
+                          removed_topics=['Pricing'], keywords={'Contact': ['email', 'reach']},
+                          topic_queries=[{'id': 3, 'topic': 'Contact', 'query': 'Do you answer email?',
+                                          'answer': 'Within a day.'}],
+                          query_topics=['Contact'])
+    rebuilt = KnowledgeStore().publish(
+        knowledge_base={'SECOINFI': KNOWLEDGE['SECOINFI'],
+                        'Contact': 'Write to info@seco.in.net or visit the website'},
+        keywords={'SECOINFI': ['what is'], 'Contact': ['email', 'reach']},
+        topic_queries=[{'id': 2, 'topic': 'Pricing', 'query': 'Is it free?', 'answer': 'No.'},
+                       {'id': 3, 'topic': 'Contact', 'query': 'Do you answer email?', 'answer': 'Within a day.'}])
+
+    assert store.current is derived and derived.version == 2
+    assert dict(derived.knowledge_base) == dict(rebuilt.knowledge_base)
+    assert derived.topic_queries == rebuilt.topic_queries
+    assert dict(derived.keywords) == dict(rebuilt.keywords)
+    assert dict(derived.content_hashes) == {}
+    assert searches(derived) == searches(rebuilt)
+    # Only the changed entries were indexed again; the earlier snapshot is untouched
+    assert derived.semantic.stats()['delta_segments'] == 1
+    assert searches(first) == before and 'Pricing' in first.knowledge_base
+
+
+def test_admin_edits_read_only_the_changed_topics(db_app):
+    from src.models.knowledge import KnowledgeBase
+    from src.models.navigation import TopicQuery
+    from src.models.user import db
+    from knowledge_snapshot import load_changes
+
+    add_knowledge(db, **KNOWLEDGE)
+    db.session.add(KnowledgeBase(topic='Contact', content='Newer but lower priority', priority=0, is_active=True))
+    db.session.add(TopicQuery(1, 'Contact', 'How can I call?', 'Call +91 9620058644'))
+    db.session.add(TopicQuery(2, 'Pricing', 'Is it free?', 'No.'))
+    db.session.commit()
+
+    changes = load_changes(db.session, KnowledgeBase, TopicQuery, topics=['Contact', 'Retired'],
+                           query_topics=['Contact'])
+    assert changes['knowledge_base'] == {'Contact': KNOWLEDGE['Contact']}
+    assert changes['removed_topics'] == ['Retired']
+    assert [item['answer'] for item in changes['topic_queries']] == ['Call +91 9620058644']
+    assert changes['query_topics'] == ['Contact']
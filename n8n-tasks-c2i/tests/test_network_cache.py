@@ -0,0 +1,160 @@
+"""
+DNS and robots.txt caches: concurrent protocol variants of a site share one
+lookup and one fetch, failures are cached briefly, and entries expire
+"""
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.abc import AbstractResolver
+
+import response_cache
+from network_cache import CachingResolver, RobotsCache
+
+
+class CountingResolver(AbstractResolver):
+    """Resolver that answers from a table after a short pause and counts lookups"""
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.lookups = []
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        self.lookups.append(host)
+        await asyncio.sleep(0.01)
+        if host not in self.addresses:
+            raise OSError(f"cannot resolve {host}")
+        return [{'hostname': host, 'host': self.addresses[host], 'port': port, 'family': family,
+                 'proto': 0, 'flags': 0}]
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the caches' TTLs"""
+    now = [1000.0]
+    # Only the caches' clock; the event loop keeps the real one
+    monkeypatch.setattr(response_cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_concurrent_lookups_share_one_resolution(clock):
+    upstream = CountingResolver({'example.com': '93.184.216.34'})
+    resolver = CachingResolver(resolver=upstream)
+
+    async def scenario():
+        first = await asyncio.gather(*(resolver.resolve('example.com', port) for port in (80, 443, 80, 443)))
+        second = await resolver.resolve('EXAMPLE.com', 8080)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert upstream.lookups == ['example.com']
+    assert [answer[0]['port'] for answer in first] == [80, 443, 80, 443]
+    assert second[0]['host'] == '93.184.216.34' and second[0]['port'] == 8080
+    stats = resolver.stats()
+    assert (stats['requests'], stats['lookups'], stats['coalesced']) == (5, 1, 3)
+    assert stats['hit_ratio'] == 0.8
+
+
+def test_failed_lookups_are_cached_until_the_negative_ttl(clock):
+    upstream = CountingResolver({})
+    resolver = CachingResolver(resolver=upstream, negative_ttl_seconds=30)
+
+    async def attempt():
+        with pytest.raises(OSError):
+            await resolver.resolve('missing.example')
+
+    asyncio.run(attempt())
+    asyncio.run(attempt())
+    assert len(upstream.lookups) == 1
+    assert resolver.stats()['negative_hits'] == 1
+
+    clock[0] += 31
+    asyncio.run(attempt())
+    assert len(upstream.lookups) == 2
+
+
+@pytest.mark.parametrize('address', ['127.0.0.1', '10.0.0.7', '169.254.169.254', '::1', '::ffff:192.168.1.1'])
+def test_hosts_resolving_to_internal_addresses_are_refused(clock, address):
+    upstream = CountingResolver({'internal.example': address})
+    resolver = CachingResolver(resolver=upstream)
+
+    async def attempt():
+        with pytest.raises(OSError, match='non-public'):
+            await resolver.resolve('internal.example', 80)
+
+    asyncio.run(attempt())
+    asyncio.run(attempt())
+    assert len(upstream.lookups) == 1
+    assert resolver.stats()['blocked'] == 1
+
+
+def test_entries_expire_and_the_cache_is_bounded(clock):
+    upstream = CountingResolver({f"site{number}.example": '93.184.216.34' for number in range(3)})
+    resolver = CachingResolver(max_entries=2, ttl_seconds=60, resolver=upstream)
+
+    async def resolve_all(*hosts):
+        for host in hosts:
+            await resolver.resolve(host)
+
+    asyncio.run(resolve_all('site0.example', 'site1.example', 'site2.example', 'site2.example'))
+    assert resolver.stats()['evictions'] == 1
+    asyncio.run(resolve_all('site0.example'))  # evicted, looked up again
+    clock[0] += 61
+    asyncio.run(resolve_all('site0.example'))  # expired
+    assert upstream.lookups.count('site0.example') == 3
+
+
+def robots_fetch(responses):
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        await asyncio.sleep(0.01)
+        response = responses[url]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return fetch, fetched
+
+
+def test_variants_share_one_robots_fetch(clock):
+    robots = RobotsCache()
+    fetch, fetched = robots_fetch({'https://example.com/robots.txt': (
+        200, b"User-agent: *\nDisallow: /private\nSitemap: https://example.com/sitemap.xml\n")})
+
+    async def scenario():
+        return await asyncio.gather(robots.get('https://example.com/', fetch),
+                                    robots.get('http://example.com/about', fetch),
+                                    robots.get('https://EXAMPLE.com/', fetch))
+
+    parsed = asyncio.run(scenario())
+    assert fetched == ['https://example.com/robots.txt']
+    assert parsed[0] is parsed[1] is parsed[2]
+    assert not parsed[0].can_fetch('InfyBot', 'https://example.com/private/x')
+    assert parsed[0].site_maps() == ['https://example.com/sitemap.xml']
+    assert robots.stats()['coalesced'] == 2
+
+
+@pytest.mark.parametrize('status, ttl', [(404, 3600), (503, 300)])
+def test_missing_robots_allow_everything(clock, status, ttl):
+    robots = RobotsCache(ttl_seconds=3600, negative_ttl_seconds=300)
+    fetch, fetched = robots_fetch({'https://example.com/robots.txt': (status, b'')})
+    assert asyncio.run(robots.get('https://example.com/', fetch)).can_fetch('InfyBot', 'https://example.com/x')
+    clock[0] += 301
+    asyncio.run(robots.get('https://example.com/', fetch))
+    # Server errors are retried after the negative TTL; a 404 is kept for the full TTL
+    assert len(fetched) == (2 if ttl == 300 else 1)
+
+
+def test_unreachable_host_is_cached_as_a_failure(clock):
+    robots = RobotsCache()
+    fetch, fetched = robots_fetch({'https://down.example/robots.txt': ConnectionError('refused')})
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            asyncio.run(robots.get('https://down.example/', fetch))
+    assert len(fetched) == 1
+    assert robots.stats()['failures'] == 1 and robots.stats()['negative_hits'] == 2
@@ -0,0 +1,152 @@
+"""
+Protocol fan-out: every active protocol variant of a domain is probed in one
+call over a shared pool, and usage is counted in one batched update
+"""
+import asyncio
+import socket
+
+import pytest
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+from aiohttp.test_utils import TestServer
+from sqlalchemy import event
+
+from network_cache import RobotsCache
+from sitemap_fetcher import SitemapFetcher
+
+SITEMAP = (b'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+           b'<url><loc>https://example.com/a</loc></url></urlset>')
+
+
+class SiteResolver(AbstractResolver):
+    """Points site.test at the local test server, which the fetcher's own resolver refuses"""
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{'hostname': host, 'host': '127.0.0.1', 'port': port, 'family': socket.AF_INET,
+                 'proto': 0, 'flags': socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def test_variants_are_probed_together_and_merged():
+    async def handle(request):
+        if request.path == '/sitemap.xml':
+            return web.Response(body=SITEMAP, content_type='application/xml')
+        if request.path == '/robots.txt':
+            return web.Response(status=404)
+        return web.Response(text='home')
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handle)
+        server = TestServer(app)
+        await server.start_server()
+        fetcher = SitemapFetcher(crawl_delay=0, resolver=SiteResolver(), robots=RobotsCache())
+        host = f"site.test:{server.port}"
+        try:
+            result = await fetcher.probe_variants([('http://', f"http://{host}"),
+                                                   ('https://', f"https://{host}"),  # no TLS on this port
+                                                   ('upi://', f"upi://{host}")])
+            return result, fetcher.stats()
+        finally:
+            await fetcher._session.close()
+            await server.close()
+
+    result, stats = asyncio.run(main())
+    assert result['probed'] == ['http://', 'https://']
+    assert result['reachable'] == ['http://']
+    assert result['preferred']['protocol'] == 'http://'
+    assert result['sitemap']['found'] and result['sitemap']['pages_count'] == 1
+    variants = {variant['protocol']: variant for variant in result['variants']}
+    assert variants['http://']['status'] == 200 and variants['http://']['elapsed_ms'] >= 0
+    assert variants['https://']['error'] and not variants['https://']['reachable']
+    assert variants['upi://']['error'] == 'unsupported protocol'
+    # robots.txt, the home page and the sitemap travelled over pooled connections
+    assert stats['connections_reused'] >= 1
+
+
+@pytest.fixture
+def protocols(db_app):
+    from src.models.domain import Protocol
+    from src.models.user import db
+    for name, active in (('http://', True), ('https://', True), ('https://www.', True), ('wsl://', True),
+                         ('ftp://', True), ('http://www.', False)):
+        db.session.add(Protocol(protocol=name, is_active=active, usage_count=0))
+    db.session.commit()
+    return db
+
+
+def test_fanout_analyzer_bumps_usage_in_one_update(protocols, monkeypatch):
+    from src.models.domain import Protocol
+    from src.services import analysis_queue
+    db = protocols
+    calls = []
+
+    def probe_variants_blocking(domains, timeout=None):
+        calls.append(domains)
+        return [{'variants': [dict(protocol=protocol, url=url, status=200, error=None, elapsed_ms=5.0,
+                                   redirected=False, final_url=url, reachable=True)
+                              for protocol, url in variants if url.startswith('http')],
+                 'probed': [protocol for protocol, url in variants if url.startswith('http')],
+                 'reachable': ['https://'],
+                 'sitemap': {'found': True, 'url': f"{variants[1][1]}/sitemap.xml", 'pages_count': 3}}
+                for variants in domains]
+
+    monkeypatch.setattr(analysis_queue.sitemap_fetcher, 'probe_variants_blocking', probe_variants_blocking)
+    updates = []
+
+    def listener(conn, cursor, statement, *args):
+        if statement.startswith('UPDATE'):
+            updates.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        results = analysis_queue.protocol_fanout_analyzer([{'domain_name': 'example.com'},
+                                                          {'domain_name': 'seco.in.net'}])
+        db.session.commit()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    # Inactive and unsupported Protocol rows are not probed
+    assert [protocol for protocol, url in calls[0][0]] == ['http://', 'https://', 'https://www.', 'wsl://']
+    assert calls[0][0][2][1] == 'https://www.example.com'
+    assert len(calls) == 1 and len(calls[0]) == 2
+    assert results[0]['sitemap_found'] and results[0]['sitemap_pages_count'] == 3
+    assert 'https://www. 200 5ms' in results[0]['analysis_notes']
+
+    assert len(updates) == 1
+    usage = {protocol.protocol: protocol.usage_count for protocol in Protocol.query.all()}
+    assert usage == {'http://': 2, 'https://': 2, 'https://www.': 2, 'wsl://': 0, 'ftp://': 0, 'http://www.': 0}
+
+
+def test_unreachable_and_invalid_domains_fail(protocols, monkeypatch):
+    from src.services import analysis_queue
+    monkeypatch.setattr(analysis_queue.sitemap_fetcher, 'probe_variants_blocking', lambda domains, timeout=None: [
+        {'variants': [], 'probed': ['http://'], 'reachable': [], 'sitemap': None} for _ in domains])
+    unreachable, invalid = analysis_queue.protocol_fanout_analyzer([{'domain_name': 'example.com'},
+                                                                   {'domain_name': '127.0.0.1'}])
+    assert isinstance(unreachable, ConnectionError)
+    assert isinstance(invalid, analysis_queue.PermanentAnalysisError)
+
+
+def test_endpoint_counts_probed_protocols(monkeypatch):
+    import main
+    monkeypatch.setattr(main.sitemap_fetcher, 'probe_variants_blocking', lambda domains, timeout=None: [
+        {'variants': [], 'probed': [protocol for protocol, url in variants if url.startswith('http')],
+         'reachable': [], 'preferred': None, 'sitemap': None} for variants in domains])
+    before = dict(main.data_store['protocol_usage'])
+    client = main.app.test_client()
+
+    response = client.post('/api/domain/analyze/protocols', json={'domain': 'https://www.Example.com/'})
+    assert response.status_code == 200
+    analysis = response.get_json()['analysis']
+    assert analysis['domain'] == 'example.com'
+    assert analysis['probed'] == ['http://', 'https://', 'http://www.', 'https://www.']
+    for protocol in analysis['probed']:
+        assert main.data_store['protocol_usage'][protocol] == before.get(protocol, 0) + 1
+
+    assert client.post('/api/domain/analyze/protocols', json={'domain': 'localhost'}).status_code == 400
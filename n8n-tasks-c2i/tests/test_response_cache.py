@@ -0,0 +1,78 @@
+"""
+Chat answers are cached per normalized message, bounded by size and age,
+and dropped when the knowledge they came from changes
+"""
+import time
+
+from response_cache import ResponseCache, invalidate_on_model_changes, normalize_message
+
+
+def test_normalize_message():
+    assert normalize_message('  What SERVICES   do you offer?! ') == 'what services do you offer'
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire():
+    cache = ResponseCache(ttl_seconds=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_value_computed_before_invalidation_is_not_stored():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.set('a', 'stale', generation=generation)
+    assert cache.get('a') is None
+    cache.set('a', 'fresh', generation=cache.generation)
+    assert cache.get('a') == 'fresh'
+
+
+def test_committed_model_changes_invalidate(db_app):
+    from src.models.knowledge import KnowledgeBase
+    from src.models.user import db
+
+    cache = ResponseCache()
+    invalidate_on_model_changes(cache, KnowledgeBase)
+    cache.set('a', 1)
+
+    db.session.add(KnowledgeBase(topic='Contact', content='seco.in.net'))
+    db.session.rollback()
+    assert cache.get('a') == 1
+
+    db.session.add(KnowledgeBase(topic='Contact', content='seco.in.net'))
+    db.session.commit()
+    assert cache.get('a') is None
+
+    cache.set('a', 1)
+    KnowledgeBase.query.filter_by(topic='Contact').update({'content': 'changed'})
+    db.session.commit()
+    assert cache.get('a') is None
+
+
+def test_registrations_do_not_consume_each_others_changes(db_app):
+    from src.models.knowledge import ConversationLog, KnowledgeBase
+    from src.models.user import db
+
+    knowledge_cache, log_cache = ResponseCache(), ResponseCache()
+    invalidate_on_model_changes(log_cache, ConversationLog)
+    invalidate_on_model_changes(knowledge_cache, KnowledgeBase)
+    knowledge_cache.set('a', 1)
+    log_cache.set('a', 1)
+
+    db.session.add(KnowledgeBase(topic='Contact', content='seco.in.net'))
+    db.session.commit()
+    assert knowledge_cache.get('a') is None
+    assert log_cache.get('a') == 1
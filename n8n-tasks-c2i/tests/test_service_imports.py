@@ -0,0 +1,60 @@
+"""
+Every service module must import both ways: as src.services.<name> for the
+blueprints and the database app, and by bare name for main.py
+"""
+import ast
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, service_modules
+
+# Blueprints and scripts whose src.services imports must resolve; the rest of
+# their imports need models and routes that are not part of this directory
+SERVICE_CONSUMERS = ('admin', 'admin_training', 'blockchain_routes', 'database_init', 'domain_routes')
+
+
+def import_in_layout(layout, module):
+    """Import module in a fresh interpreter that sees only the src package, not the flat directory"""
+    paths = [layout] + [path for path in os.environ.get('PYTHONPATH', '').split(os.pathsep)
+                        if path and os.path.abspath(path) != ROOT]
+    return subprocess.run([sys.executable, '-c', f"import {module}"], cwd=layout, capture_output=True,
+                          text=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(paths)))
+
+
+def service_imports(module):
+    """(service module, imported names) for each 'from src.services.x import ...' in a flat module"""
+    with open(os.path.join(ROOT, f"{module}.py")) as handle:
+        tree = ast.parse(handle.read())
+    return [(node.module, [alias.name for alias in node.names]) for node in ast.walk(tree)
+            if isinstance(node, ast.ImportFrom) and (node.module or '').startswith('src.services.')]
+
+
+@pytest.mark.parametrize('name', service_modules())
+def test_service_imports_under_src_services(src_layout, name):
+    result = import_in_layout(src_layout, f"src.services.{name}")
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize('name', service_modules())
+def test_service_imports_flat(name):
+    importlib.import_module(name)
+
+
+@pytest.mark.parametrize('consumer', SERVICE_CONSUMERS)
+def test_consumers_service_imports_resolve(consumer):
+    imports = service_imports(consumer)
+    assert imports
+    for module, names in imports:
+        service = importlib.import_module(module)
+        for name in names:
+            assert hasattr(service, name), f"{consumer} imports {name} from {module}"
+
+
+@pytest.mark.parametrize('blueprint', ['admin', 'domain_routes'])
+def test_blueprints_import_under_src_routes(src_layout, blueprint):
+    result = import_in_layout(src_layout, f"src.routes.{blueprint}")
+    assert result.returncode == 0, result.stderr
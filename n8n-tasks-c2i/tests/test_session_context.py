@@ -0,0 +1,82 @@
+"""
+Session history is used only for messages that read as follow-ups: ones that
+match nothing on their own or point back at the previous turn
+"""
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def main():
+    import main
+    main.response_cache.invalidate()
+    return main
+
+
+def ask(client, session_id, message):
+    reply = client.post('/api/infy/chat', json={'message': message, 'session_id': session_id})
+    assert reply.status_code == 200
+    return reply.get_json()
+
+
+def test_new_questions_in_a_session_are_answered_on_their_own(main):
+    client = main.app.test_client()
+    session_id = str(uuid.uuid4())
+    knowledge = main.knowledge_store.current.knowledge_base
+
+    ask(client, session_id, 'what services do you offer')
+    ranking = ask(client, session_id, 'domain ranking')
+    analysis = ask(client, session_id, 'domain analysis')
+    assert not ranking['contextual'] and not analysis['contextual']
+    assert ranking['response'] == analysis['response'] == knowledge['Domain Analysis']
+
+
+def test_follow_ups_use_the_previous_question(main):
+    client = main.app.test_client()
+    session_id = str(uuid.uuid4())
+
+    ask(client, session_id, 'how can I reach you')
+    assert ask(client, session_id, 'what about email')['contextual']
+    assert ask(client, session_id, 'tell me more')['contextual']
+    assert not ask(client, session_id, 'services')['contextual']
+
+
+@pytest.mark.parametrize('message, cue', [
+    ('what about pricing', True), ('and the phone?', True), ('is it free', True),
+    ('domain analysis', False), ('andromeda', False), ('thistle', False)
+])
+def test_follow_up_cues(main, message, cue):
+    assert main.has_follow_up_cue(message) is cue
+
+
+def test_anonymous_session_has_no_context(main):
+    client = main.app.test_client()
+    ask(client, main.ANONYMOUS_SESSION_ID, 'how can I reach you')
+    assert not ask(client, main.ANONYMOUS_SESSION_ID, 'tell me more')['contextual']
+
+
+def test_store_keeps_recent_turns_per_session():
+    from session_store import SessionContextStore
+    store = SessionContextStore(max_turns=2)
+    for turn in range(3):
+        store.append('s', f"q{turn}", f"a{turn}")
+    assert store.get('s') == [('q1', 'a1'), ('q2', 'a2')]
+    assert store.get('other') == []
+
+
+def test_store_expires_idle_sessions_and_evicts_to_budget():
+    import time
+    from session_store import SessionContextStore
+
+    store = SessionContextStore(idle_ttl_seconds=0.01)
+    store.append('s', 'q', 'a')
+    time.sleep(0.02)
+    assert store.get('s') == []
+    assert store.stats()['expired'] == 1
+
+    store = SessionContextStore(max_bytes=1000)
+    store.append('old', 'q' * 300, 'a' * 300)
+    store.append('new', 'q' * 300, 'a' * 300)
+    assert store.get('old') == [] and store.get('new')
+    assert store.stats()['evicted'] == 1 and store.stats()['bytes'] <= 1000
@@ -0,0 +1,181 @@
+"""
+The sitemap fetcher obeys robots.txt Disallow and Crawl-delay rules, keeps
+each host's politeness state between probes and fetches only public addresses
+"""
+import asyncio
+import gc
+import socket
+
+import pytest
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+from aiohttp.test_utils import TestServer
+
+from network_cache import RobotsCache
+from sitemap_fetcher import BlockedURLError, HostSlot, SitemapFetcher
+
+SITEMAP = (b'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+           b'<url><loc>https://example.com/a</loc></url><url><loc>https://example.com/b</loc></url></urlset>')
+
+
+class SiteResolver(AbstractResolver):
+    """Points site.test at the local test server, which the fetcher's own resolver refuses"""
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        if host != 'site.test':
+            raise OSError(f"cannot resolve {host}")
+        return [{'hostname': host, 'host': '127.0.0.1', 'port': port, 'family': socket.AF_INET,
+                 'proto': 0, 'flags': socket.AI_NUMERICHOST}]
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+def run_site(robots_txt, scenario, pages=None):
+    """Serve robots.txt, two sitemaps and pages {path: handler}, run scenario(fetcher, base_url),
+    return (result, requested paths)"""
+    requested = []
+    pages = pages or {}
+
+    async def handle(request):
+        requested.append(request.path)
+        if request.path in pages:
+            return pages[request.path](request)
+        if request.path == '/robots.txt':
+            return web.Response(text=robots_txt)
+        if request.path in ('/sitemap.xml', '/sitemap_index.xml'):
+            return web.Response(body=SITEMAP, content_type='application/xml')
+        return web.Response(text='home')
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handle)
+        server = TestServer(app)
+        await server.start_server()
+        fetcher = SitemapFetcher(crawl_delay=0, resolver=SiteResolver(), robots=RobotsCache())
+        try:
+            return await scenario(fetcher, f"http://site.test:{server.port}")
+        finally:
+            if fetcher._session is not None:
+                await fetcher._session.close()
+            await server.close()
+
+    return asyncio.run(main()), requested
+
+
+def test_disallowed_sitemap_is_never_fetched():
+    async def scenario(fetcher, base_url):
+        return fetcher, await fetcher.probe(base_url)
+
+    (fetcher, result), requested = run_site("User-agent: *\nDisallow: /sitemap.xml\n", scenario)
+    assert result['found'] and result['url'].endswith('/sitemap_index.xml')
+    assert result['pages_count'] == 2
+    assert '/sitemap.xml' not in requested
+    assert fetcher.stats()['disallowed'] == 1
+
+
+def test_rules_for_our_agent_apply():
+    async def scenario(fetcher, base_url):
+        return await fetcher.probe_url(base_url + '/')
+
+    result, requested = run_site("User-agent: InfyBot\nDisallow: /\n\nUser-agent: *\nAllow: /\n", scenario)
+    assert result['error'] == 'disallowed by robots.txt'
+    assert not result['reachable']
+    assert requested == ['/robots.txt']
+
+
+def test_robots_crawl_delay_spaces_requests():
+    async def scenario(fetcher, base_url):
+        await fetcher.probe_url(base_url + '/')
+        return fetcher, fetcher._host_slot(base_url)
+
+    (fetcher, slot), requested = run_site("User-agent: *\nCrawl-delay: 1\n", scenario)
+    assert requested == ['/robots.txt', '/']
+    assert slot.crawl_delay == 1.0
+    # robots.txt spent the burst token, so the page waited out the delay
+    assert fetcher.stats()['throttle_seconds'] >= 0.9
+
+
+def test_internal_addresses_are_never_fetched():
+    async def scenario(fetcher, base_url):
+        with pytest.raises(BlockedURLError):
+            await fetcher.fetch(base_url.replace('site.test', '127.0.0.1') + '/robots.txt')
+        with pytest.raises(BlockedURLError):
+            await fetcher.fetch('file:///etc/passwd')
+        return await fetcher.probe_url(base_url + '/away')
+
+    def away(request):
+        raise web.HTTPFound(f"http://127.0.0.1:{request.url.port}/internal")
+
+    result, requested = run_site("User-agent: *\nAllow: /\n", scenario, {'/away': away})
+    assert result['status'] is None and 'not a public address' in result['error']
+    assert requested == ['/robots.txt', '/away']
+
+
+def test_redirects_to_public_hosts_are_followed():
+    async def scenario(fetcher, base_url):
+        return await fetcher.probe_url(base_url + '/old')
+
+    def old(request):
+        raise web.HTTPMovedPermanently('/new')
+
+    result, requested = run_site("User-agent: *\nAllow: /\n", scenario, {'/old': old})
+    assert result['status'] == 200 and result['redirected']
+    assert result['final_url'].startswith('http://site.test:') and result['final_url'].endswith('/new')
+    assert requested == ['/robots.txt', '/old', '/new']
+
+
+def test_sitemaps_on_internal_addresses_are_skipped():
+    index = (b'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+             b'<sitemap><loc>http://10.0.0.1/private.xml</loc></sitemap>'
+             b'<sitemap><loc>/sitemap.xml</loc></sitemap></sitemapindex>')
+
+    async def scenario(fetcher, base_url):
+        return fetcher, await fetcher.probe(base_url)
+
+    robots_txt = "User-agent: *\nSitemap: http://169.254.169.254/latest/meta-data\nSitemap: /index.xml\n"
+    (fetcher, result), requested = run_site(robots_txt, scenario, {
+        '/index.xml': lambda request: web.Response(body=index, content_type='application/xml')})
+    assert result['found'] and result['url'].endswith('/index.xml')
+    assert result['pages_count'] == 2
+    assert requested == ['/robots.txt', '/index.xml', '/sitemap.xml']
+    assert fetcher.stats()['errors'] == 2
+
+
+def test_host_slots_survive_between_probes():
+    fetcher = SitemapFetcher(max_hosts=2)
+    slot = fetcher._host_slot('https://example.com/robots.txt')
+    slot_id = id(slot)
+    del slot
+    gc.collect()
+    # The http variant and later paths share the slot and its crawl-delay bucket
+    assert id(fetcher._host_slot('http://EXAMPLE.com/sitemap.xml')) == slot_id
+    assert fetcher._host_slot('https://example.com/').bucket is not None
+
+
+def test_least_recently_used_idle_host_is_evicted():
+    fetcher = SitemapFetcher(max_hosts=2)
+    first = fetcher._host_slot('https://a.example/')
+    fetcher._host_slot('https://b.example/')
+    fetcher._host_slot('https://a.example/')  # a is now the most recent
+    fetcher._host_slot('https://c.example/')
+    assert list(fetcher._hosts) == ['a.example', 'c.example']
+    assert fetcher._host_slot('https://a.example/') is first
+
+    # Busy slots are kept even past the bound
+    fetcher._hosts['a.example'].users = 1
+    fetcher._hosts['c.example'].users = 1
+    fetcher._host_slot('https://d.example/')
+    assert len(fetcher._hosts) == 3
+    assert fetcher.stats()['hosts_evicted'] == 1
+
+
+def test_default_crawl_delay_is_polite():
+    assert SitemapFetcher().crawl_delay > 0
+    slot = HostSlot(2, 0)
+    assert slot.bucket is None
+    slot.set_crawl_delay(2.0)
+    assert slot.bucket.rate == 0.5
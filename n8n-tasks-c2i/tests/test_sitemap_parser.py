@@ -0,0 +1,124 @@
+"""
+Sitemaps parse incrementally whatever the chunking or compression, and nested
+indexes are walked within their depth, count, URL and byte budgets
+"""
+import gzip
+
+import pytest
+
+from sitemap_parser import SitemapBudget, SitemapError, SitemapParser, SitemapTooLarge, iter_sitemap_urls
+
+NAMESPACE = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*urls):
+    body = ''.join(f"<url><loc> {url} </loc><lastmod>2026-10-17</lastmod>"
+                   f"<image:image><image:loc>{url}/logo.png</image:loc></image:image></url>" for url in urls)
+    return (f'<?xml version="1.0"?><urlset {NAMESPACE} '
+            f'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">{body}</urlset>').encode()
+
+
+def index(*sitemaps):
+    body = ''.join(f"<sitemap><loc>{sitemap}</loc></sitemap>" for sitemap in sitemaps)
+    return f'<?xml version="1.0"?><sitemapindex {NAMESPACE}>{body}</sitemapindex>'.encode()
+
+
+def parse(document, chunk_size):
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(document), chunk_size):
+        entries += parser.feed(document[start:start + chunk_size])
+    return entries + parser.close(), parser
+
+
+PAGES = [f"https://example.com/page/{number}" for number in range(200)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 10 ** 6])
+@pytest.mark.parametrize('compress', [False, True])
+def test_entries_match_for_any_chunking(chunk_size, compress):
+    document = urlset(*PAGES)
+    entries, parser = parse(gzip.compress(document) if compress else document, chunk_size)
+    # Extension <image:loc> tags are not pages
+    assert entries == [('url', url) for url in PAGES]
+    assert parser.root_tag == 'urlset'
+    assert parser.bytes_parsed == len(document)
+
+
+def test_entries_stream_before_the_document_ends():
+    parser = SitemapParser()
+    document = urlset(*PAGES)
+    early = parser.feed(document[:len(document) // 2])
+    assert 0 < len(early) < len(PAGES)
+
+
+@pytest.mark.parametrize('document', [b'<html><body/></html>', urlset('https://example.com/')[:-10], b''])
+def test_non_sitemaps_are_rejected(document):
+    with pytest.raises(SitemapError):
+        parse(document, 64)
+
+
+def test_truncated_gzip_is_rejected():
+    with pytest.raises(SitemapError, match='Truncated'):
+        parse(gzip.compress(urlset(*PAGES))[:-20], 64)
+
+
+def test_gzip_bomb_stops_at_the_byte_limit():
+    bomb = gzip.compress(urlset(*PAGES) + b' ' * (20 * 1024 * 1024))
+    parser = SitemapParser(max_bytes=1024 * 1024)
+    with pytest.raises(SitemapTooLarge):
+        parser.feed(bomb)
+    assert parser.bytes_parsed <= 1024 * 1024 + 256 * 1024
+
+
+def serve(documents):
+    """open_chunks over an in-memory site; every document is gzipped and read 100 bytes at a time"""
+    def open_chunks(url):
+        if url not in documents:
+            raise OSError(f"404 {url}")
+        body = gzip.compress(documents[url])
+        return (body[start:start + 100] for start in range(0, len(body), 100))
+    return open_chunks
+
+
+SITE = {
+    'https://example.com/sitemap.xml': index('/maps/a.xml.gz', 'https://example.com/maps/nested.xml', '/missing.xml'),
+    'https://example.com/maps/a.xml.gz': urlset(*PAGES[:50]),
+    'https://example.com/maps/nested.xml': index('/maps/b.xml', '/maps/a.xml.gz'),
+    'https://example.com/maps/b.xml': urlset(*PAGES[50:80]),
+}
+
+
+def test_nested_indexes_are_followed_once():
+    budget = SitemapBudget()
+    urls = list(iter_sitemap_urls('https://example.com/sitemap.xml', serve(SITE), budget))
+    assert urls == PAGES[:80]
+    assert budget.skipped == 1  # /missing.xml
+    assert budget.sitemaps == 5
+    assert not budget.truncated
+
+
+def test_depth_budget_truncates_the_walk():
+    budget = SitemapBudget(max_depth=1)
+    urls = list(iter_sitemap_urls('https://example.com/sitemap.xml', serve(SITE), budget))
+    assert urls == PAGES[:50]
+    assert budget.truncated
+
+
+def test_url_budget_stops_early():
+    budget = SitemapBudget(max_urls=10)
+    urls = list(iter_sitemap_urls('https://example.com/sitemap.xml', serve(SITE), budget))
+    assert urls == PAGES[:10]
+    assert budget.truncated and budget.urls == 10
+
+
+def test_byte_budget_is_shared_by_the_walk():
+    budget = SitemapBudget(max_bytes=len(SITE['https://example.com/sitemap.xml']) + 100)
+    urls = list(iter_sitemap_urls('https://example.com/sitemap.xml', serve(SITE), budget))
+    assert urls == []
+    assert budget.truncated
+
+
+def test_unreadable_root_raises():
+    with pytest.raises(OSError):
+        list(iter_sitemap_urls('https://example.com/none.xml', serve(SITE)))
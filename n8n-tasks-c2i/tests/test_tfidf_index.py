@@ -0,0 +1,71 @@
+"""
+An index grown through appends, supersedes, discards and merges must rank
+exactly like one rebuilt from the surviving documents
+"""
+import pytest
+
+from tfidf_index import TfidfIndex
+
+DOCUMENTS = [
+    ('secoinfi', 'SECOINFI is a blockchain business development company'),
+    ('services', 'blockchain development, smart contracts and domain analysis services'),
+    ('domains', 'domain analysis covers domain authority, page authority and sitemaps'),
+    ('contact', 'contact the CEO by phone or through the website'),
+    ('voice', 'an AI voice assistant answers questions about blockchain services')
+]
+
+QUERIES = ['blockchain', 'domain authority', 'smart contracts', 'contact phone', 'voice blockchain services',
+           'sitemaps', 'payments']
+
+
+def rebuilt(documents):
+    index = TfidfIndex(background_merge=False)
+    index.add_documents((doc_id, text, None) for doc_id, text in documents.items())
+    return index
+
+
+def ranking(index, query):
+    return [(result['doc_id'], result['score']) for result in index.search(query, top_k=10)]
+
+
+@pytest.mark.parametrize('max_deltas', [1, 8])
+def test_incremental_index_matches_rebuild(max_deltas):
+    index = TfidfIndex(max_deltas=max_deltas, background_merge=False)
+    live = {}
+    for doc_id, text in DOCUMENTS:
+        index.add_documents([(doc_id, text, None)])
+        live[doc_id] = text
+
+    # Rewrite two documents, one of them twice within a single batch
+    updates = [('services', 'payments over UPI and smart contracts'),
+               ('domains', 'sitemaps and indexing'),
+               ('domains', 'domain rankings and sitemaps')]
+    index.add_documents((doc_id, text, None) for doc_id, text in updates)
+    live.update(updates)
+
+    index.discard(['voice', 'missing'])
+    del live['voice']
+
+    expected = rebuilt(live)
+    for query in QUERIES:
+        assert ranking(index, query) == ranking(expected, query)
+
+
+def test_discarding_every_document_empties_search():
+    index = rebuilt(dict(DOCUMENTS))
+    index.discard([doc_id for doc_id, _ in DOCUMENTS])
+    assert index.search('blockchain') == []
+    assert len(index) == 0
+
+
+def test_copy_takes_changes_the_original_never_sees():
+    original = rebuilt(dict(DOCUMENTS))
+    before = {query: ranking(original, query) for query in QUERIES}
+    copy = original.copy()
+    copy.add_documents([('payments', 'payments over UPI', None)])
+    copy.discard(['voice'])
+    assert {query: ranking(original, query) for query in QUERIES} == before
+    live = dict(DOCUMENTS, payments='payments over UPI')
+    del live['voice']
+    for query in QUERIES:
+        assert ranking(copy, query) == ranking(rebuilt(live), query)
@@ -0,0 +1,93 @@
+"""
+Misspelled words, as speech-to-text tends to produce them, are mapped back to
+indexed topic terms
+"""
+import pytest
+
+from trigram_index import TrigramIndex, trigrams
+
+TOPICS = [
+    ('SECOINFI company blockchain', 'SECOINFI'),
+    ('Domain Analysis ranking sitemap', 'Domain Analysis'),
+    ('Contact phone email', 'Contact')
+]
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.build(TOPICS)
+    return index
+
+
+def test_trigrams_are_padded():
+    assert trigrams('seo') == sorted({'  s', ' se', 'seo', 'eo '})
+
+
+@pytest.mark.parametrize('heard, expected', [
+    ('secoinfy', 'secoinfi'),
+    ('domane analysys', 'domain analysi'),
+    ('blokchain', 'blockchain'),
+])
+def test_correct_replaces_unknown_words(index, heard, expected):
+    assert index.correct(heard) == expected
+
+
+def test_correct_keeps_known_and_unmatched_words(index):
+    assert index.correct('email xyzzy') == 'email xyzzy'
+
+
+def test_correct_skips_short_and_vocabulary_words(index):
+    # "emal" is too short to tell from another word; "domane" is a word the caller knows
+    assert index.correct('emal domane', known={'domane'}) == 'emal domane'
+    assert index.correct('what is the secoinfy company') == 'what is the secoinfi company'
+
+
+def test_snapshot_indexes_topic_names_and_keywords_only():
+    from knowledge_snapshot import KnowledgeStore
+    snapshot = KnowledgeStore().publish(
+        knowledge_base={'Support': 'Our helpdesk will help with anything.'},
+        keywords={'Support': ['assistance']},
+        topic_queries=[{'id': 1, 'topic': 'Billing', 'query': 'Where is my invoice?', 'answer': 'Check email.'}])
+    assert 'support' in snapshot.trigrams and 'assistance' in snapshot.trigrams and 'billing' in snapshot.trigrams
+    assert 'help' not in snapshot.trigrams and 'invoice' not in snapshot.trigrams
+    assert snapshot.correct('asistance') == 'assistance'
+    # Content words are known to the matcher and never rewritten
+    assert snapshot.correct('helpdesk') == 'helpdesk'
+
+
+@pytest.mark.parametrize('message', ['hello', 'Hello there', 'hi'])
+def test_greetings_still_get_the_greeting(message):
+    import main
+    snapshot = main.knowledge_store.current
+    assert snapshot.correct(message) == message.lower()
+    response, sources = main.answer_message(message, snapshot)
+    assert response == main.find_knowledge_response('', snapshot)
+    assert response.startswith("I'm Infy")
+    assert sources == []
+
+
+def test_match_ranks_values(index):
+    assert index.match('domane')[0]['value'] == 'Domain Analysis'
+    assert index.match('qqq') == []
+
+
+def test_rebuild_replaces_terms(index):
+    version = index.version
+    index.build([('pricing plans', 'Pricing')])
+    assert index.version == version + 1
+    assert 'pricing' in index and 'secoinfi' not in index
+
+
+def test_extended_index_searches_like_a_rebuild(index):
+    extended = index.extended([('Pricing plans domain', 'Pricing'), ('Contact phone whatsapp', 'Contact')],
+                              removed_values=['Contact', 'SECOINFI'])
+    rebuilt = TrigramIndex()
+    rebuilt.build([TOPICS[1], ('Pricing plans domain', 'Pricing'), ('Contact phone whatsapp', 'Contact')])
+    for word in ('domane', 'pricng', 'whatsap', 'secoinfy', 'emal', 'blokchain'):
+        assert extended.search(word) == rebuilt.search(word)
+    assert 'email' not in extended and 'secoinfi' not in extended and 'whatsapp' in extended
+    assert extended.stats()['terms'] == rebuilt.stats()['terms']
+    assert extended.version == index.version + 1
+    # The original still maps its own terms
+    assert 'email' in index and index.correct('secoinfy') == 'secoinfi'
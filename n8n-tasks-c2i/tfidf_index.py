@@ -0,0 +1,277 @@
+"""
+TF-IDF Vector Index for Infy AI
+Sparse CSR segments over knowledge content and topic queries, with delta
+segments for new rows and background merging into the base segment
+"""
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Imported both as src.services.tfidf_index (knowledge_snapshot) and flat (main.py)
+try:
+    from .knowledge_matcher import tokenize
+except ImportError:
+    from knowledge_matcher import tokenize
+
+
+@dataclass(frozen=True)
+class CSRSegment:
+    """Immutable block of L2-normalised sublinear term-frequency rows"""
+    indptr: np.ndarray   # int64, len(doc_ids) + 1
+    indices: np.ndarray  # int32 term ids
+    data: np.ndarray     # float32 weights
+    rows: np.ndarray     # int32 row id per stored value, for vectorised row sums
+    doc_ids: Tuple[Any, ...]
+    passages: Tuple[str, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_ids)
+
+    def dot(self, query: np.ndarray) -> np.ndarray:
+        """Score every row against a dense query vector in one sparse product"""
+        if not self.size:
+            return np.zeros(0, dtype=np.float64)
+        values = self.data * query[self.indices]
+        return np.bincount(self.rows, weights=values, minlength=self.size)
+
+    @staticmethod
+    def concat(segments: List['CSRSegment']) -> 'CSRSegment':
+        """Stack segments vertically into a single segment"""
+        indptr = [np.zeros(1, dtype=np.int64)]
+        rows = []
+        offset_values = 0
+        offset_rows = 0
+        for segment in segments:
+            indptr.append(segment.indptr[1:] + offset_values)
+            rows.append(segment.rows + offset_rows)
+            offset_values += len(segment.data)
+            offset_rows += segment.size
+        return CSRSegment(
+            indptr=np.concatenate(indptr),
+            indices=np.concatenate([s.indices for s in segments]) if segments else np.zeros(0, dtype=np.int32),
+            data=np.concatenate([s.data for s in segments]) if segments else np.zeros(0, dtype=np.float32),
+            rows=np.concatenate(rows).astype(np.int32) if rows else np.zeros(0, dtype=np.int32),
+            doc_ids=tuple(doc_id for s in segments for doc_id in s.doc_ids),
+            passages=tuple(passage for s in segments for passage in s.passages)
+        )
+
+
+EMPTY_SEGMENT = CSRSegment.concat([])
+
+
+def _row_terms(segments: Iterable[CSRSegment], position: int) -> np.ndarray:
+    """Term ids stored for a global row position across consecutive segments"""
+    for segment in segments:
+        if position < segment.size:
+            return segment.indices[segment.indptr[position]:segment.indptr[position + 1]]
+        position -= segment.size
+    return np.zeros(0, dtype=np.int32)
+
+
+class TfidfIndex:
+    """Segmented TF-IDF index: one merged base segment plus small delta segments"""
+
+    def __init__(self, max_deltas: int = 8, background_merge: bool = True):
+        self.max_deltas = max_deltas
+        self.background_merge = background_merge
+        self.vocabulary: Dict[str, int] = {}
+        self.positions: Dict[Any, int] = {}
+        self.merges = 0
+        self._write_lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        # (base, deltas, document frequencies, row count, superseded rows)
+        # swapped as one reference so readers always see a consistent view
+        self._state: Tuple[CSRSegment, Tuple[CSRSegment, ...], np.ndarray, int, np.ndarray] = (
+            EMPTY_SEGMENT, (), np.zeros(0, dtype=np.int64), 0, np.zeros(0, dtype=np.int64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _term_id(self, token: str) -> int:
+        term_id = self.vocabulary.get(token)
+        if term_id is None:
+            term_id = len(self.vocabulary)
+            self.vocabulary[token] = term_id
+        return term_id
+
+    def _build_segment(self, documents: Iterable[Tuple[Any, str, Optional[str]]]) -> CSRSegment:
+        """Vectorise (doc_id, text, passage) rows into a CSR segment"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        doc_ids = []
+        passages = []
+
+        for doc_id, text, passage in documents:
+            counts: Dict[int, int] = {}
+            for token in tokenize(text):
+                term_id = self._term_id(token)
+                counts[term_id] = counts.get(term_id, 0) + 1
+            weights = {term_id: 1.0 + math.log(tf) for term_id, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term_id in sorted(weights):
+                indices.append(term_id)
+                data.append(weights[term_id] / norm)
+            indptr.append(len(indices))
+            doc_ids.append(doc_id)
+            passages.append(text if passage is None else passage)
+
+        indptr_array = np.asarray(indptr, dtype=np.int64)
+        return CSRSegment(
+            indptr=indptr_array,
+            indices=np.asarray(indices, dtype=np.int32),
+            data=np.asarray(data, dtype=np.float32),
+            rows=np.repeat(np.arange(len(doc_ids), dtype=np.int32), np.diff(indptr_array)),
+            doc_ids=tuple(doc_ids),
+            passages=tuple(passages)
+        )
+
+    def add_documents(self, documents: Iterable[Tuple[Any, str, Optional[str]]]) -> int:
+        """Append (doc_id, text, passage) rows as a new delta segment"""
+        with self._write_lock:
+            segment = self._build_segment(documents)
+            if not segment.size:
+                return 0
+
+            base, deltas, df, doc_count, dead = self._state
+            new_df = np.zeros(len(self.vocabulary), dtype=np.int64)
+            new_df[:len(df)] = df
+            np.add.at(new_df, segment.indices, 1)
+
+            # Re-added doc ids supersede their older rows
+            superseded = []
+            for row, doc_id in enumerate(segment.doc_ids):
+                previous = self.positions.get(doc_id)
+                if previous is not None:
+                    superseded.append(previous)
+                self.positions[doc_id] = doc_count + row
+            if superseded:
+                # Superseded rows no longer count towards document frequencies
+                segments = (base,) + deltas + (segment,)
+                for position in superseded:
+                    np.subtract.at(new_df, _row_terms(segments, position), 1)
+                dead = np.union1d(dead, np.asarray(superseded, dtype=np.int64))
+
+            self._state = (base, deltas + (segment,), new_df, doc_count + segment.size, dead)
+            needs_merge = len(deltas) + 1 > self.max_deltas
+
+        if needs_merge:
+            if self.background_merge:
+                threading.Thread(target=self.merge, daemon=True).start()
+            else:
+                self.merge()
+        return segment.size
+
+    def merge(self) -> bool:
+        """Fold the current delta segments into the base segment"""
+        if not self._merge_lock.acquire(blocking=False):
+            return False  # another merge is already running
+        try:
+            base, deltas = self._state[:2]
+            if not deltas:
+                return False
+            merged = CSRSegment.concat([base] + list(deltas))
+
+            with self._write_lock:
+                _, current_deltas, df, doc_count, dead = self._state
+                # Deltas appended while merging stay queued for the next merge
+                self._state = (merged, current_deltas[len(deltas):], df, doc_count, dead)
+                self.merges += 1
+            return True
+        finally:
+            self._merge_lock.release()
+
+    def discard(self, doc_ids: Iterable[Any]) -> int:
+        """Hide rows for deleted documents from search results"""
+        with self._write_lock:
+            positions = [self.positions.pop(doc_id) for doc_id in doc_ids if doc_id in self.positions]
+            if positions:
+                base, deltas, df, doc_count, dead = self._state
+                df = df.copy()
+                for position in positions:
+                    np.subtract.at(df, _row_terms((base,) + deltas, position), 1)
+                dead = np.union1d(dead, np.asarray(positions, dtype=np.int64))
+                self._state = (base, deltas, df, doc_count, dead)
+            return len(positions)
+
+    def copy(self) -> 'TfidfIndex':
+        """Independent index over the same rows; the immutable segments are shared, not copied"""
+        with self._write_lock:
+            index = TfidfIndex(self.max_deltas, self.background_merge)
+            index.vocabulary = dict(self.vocabulary)
+            index.positions = dict(self.positions)
+            index._state = self._state
+            return index
+
+    def clear(self):
+        """Drop every document and the vocabulary"""
+        with self._write_lock:
+            self.vocabulary = {}
+            self.positions = {}
+            self._state = (EMPTY_SEGMENT, (), np.zeros(0, dtype=np.int64), 0, np.zeros(0, dtype=np.int64))
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Return the top_k rows by TF-IDF similarity to the query"""
+        base, deltas, df, doc_count, dead = self._state
+        # idf counts live documents only, as a rebuilt index would
+        live_count = doc_count - len(dead)
+        if not live_count:
+            return []
+
+        counts: Dict[int, int] = {}
+        for token in tokenize(query):
+            term_id = self.vocabulary.get(token)
+            if term_id is not None and term_id < len(df) and df[term_id]:
+                counts[term_id] = counts.get(term_id, 0) + 1
+        if not counts:
+            return []
+
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tfs = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        idf = np.log((1.0 + live_count) / (1.0 + df[term_ids])) + 1.0
+        weights = (1.0 + np.log(tfs)) * idf
+        # Rows are normalised on term frequency only so appends never rescale
+        # stored rows; idf lives on the query side and scores stay in [0, 1]
+        query_vector = np.zeros(len(df), dtype=np.float32)
+        query_vector[term_ids] = weights / np.linalg.norm(weights)
+
+        segments = (base,) + deltas
+        scores = np.concatenate([segment.dot(query_vector) for segment in segments])
+        scores[dead] = 0.0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = sorted(candidates.tolist(), key=lambda position: (-scores[position], position))
+
+        offsets = np.cumsum([0] + [segment.size for segment in segments])
+        results = []
+        for position in candidates:
+            segment_number = int(np.searchsorted(offsets, position, side='right')) - 1
+            segment = segments[segment_number]
+            row = position - int(offsets[segment_number])
+            results.append({
+                'doc_id': segment.doc_ids[row],
+                'score': round(float(scores[position]), 4),
+                'passage': segment.passages[row]
+            })
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Get segment statistics"""
+        base, deltas, _, doc_count, dead = self._state
+        return {
+            'documents': len(self.positions),
+            'rows': doc_count,
+            'superseded_rows': len(dead),
+            'terms': len(self.vocabulary),
+            'base_rows': base.size,
+            'delta_segments': len(deltas),
+            'delta_rows': sum(segment.size for segment in deltas),
+            'merges': self.merges
+        }
+
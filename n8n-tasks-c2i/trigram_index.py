@@ -0,0 +1,186 @@
+"""
+Trigram Index for Infy AI
+Typo-tolerant lookup of topic names and keywords through character trigrams,
+so misspelled speech-to-text output still reaches the right topic
+"""
+from typing import Any, Container, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Imported both as src.services.trigram_index (knowledge_snapshot) and flat (main.py)
+try:
+    from .knowledge_matcher import TOKEN_PATTERN, tokenize
+except ImportError:
+    from knowledge_matcher import TOKEN_PATTERN, tokenize
+
+
+def trigrams(term: str) -> List[str]:
+    """Padded character trigrams of a term, e.g. 'seo' -> '  s', ' se', 'seo', 'eo '"""
+    padded = f"  {term} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class TrigramIndex:
+    """Trigram -> term postings with Jaccard similarity ranking"""
+
+    def __init__(self, min_similarity: float = 0.4, min_term_length: int = 3, min_correct_length: int = 5):
+        self.min_similarity = min_similarity
+        self.min_term_length = min_term_length
+        # Shorter words have too few trigrams to tell a typo from another word ("hello" vs "help")
+        self.min_correct_length = min_correct_length
+        # (terms, values per term, trigram count per term, trigram postings, live term ids,
+        # term ids per value); a term whose values were all removed keeps its id with a
+        # trigram count of 0, which search skips
+        self._state: Tuple[List[str], List[Tuple[Any, ...]], np.ndarray, Dict[str, np.ndarray], Dict[str, int],
+                           Dict[Any, Tuple[int, ...]]] = ([], [], np.zeros(0, dtype=np.int32), {}, {}, {})
+        self.version = 0
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._state[4]
+
+    def build(self, entries: Iterable[Tuple[str, Any]]) -> int:
+        """Rebuild from (text, value) pairs; every keyword in text maps to value"""
+        values_by_term: Dict[str, List[Any]] = {}
+        for text, value in entries:
+            for term in set(tokenize(text)):
+                if len(term) >= self.min_term_length:
+                    values_by_term.setdefault(term, []).append(value)
+
+        terms = sorted(values_by_term)
+        postings: Dict[str, List[int]] = {}
+        counts = np.zeros(len(terms), dtype=np.int32)
+        for term_id, term in enumerate(terms):
+            grams = trigrams(term)
+            counts[term_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+
+        values = [tuple(dict.fromkeys(values_by_term[term])) for term in terms]
+        by_value: Dict[Any, Tuple[int, ...]] = {}
+        for term_id, term_values in enumerate(values):
+            for value in term_values:
+                by_value[value] = by_value.get(value, ()) + (term_id,)
+        self._state = (
+            terms,
+            values,
+            counts,
+            {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()},
+            {term: term_id for term_id, term in enumerate(terms)},
+            by_value
+        )
+        self.version += 1
+        return self.version
+
+    def extended(self, entries: Iterable[Tuple[str, Any]], removed_values: Iterable[Any] = ()) -> 'TrigramIndex':
+        """New index with removed_values unmapped and (text, value) entries added
+
+        Only the trigrams of new terms are appended; this index is left unchanged.
+        """
+        terms, values, counts, postings, term_ids, by_value = self._state
+        terms, values, postings, term_ids, by_value = list(terms), list(values), dict(postings), \
+            dict(term_ids), dict(by_value)
+        counts = counts.copy()
+
+        removed = set(removed_values)
+        for value in removed:
+            for term_id in by_value.pop(value, ()):
+                values[term_id] = tuple(kept for kept in values[term_id] if kept not in removed)
+                if not values[term_id]:
+                    counts[term_id] = 0
+                    term_ids.pop(terms[term_id], None)
+
+        new_counts: List[int] = []
+        new_postings: Dict[str, List[int]] = {}
+        for text, value in entries:
+            for term in set(tokenize(text)):
+                if len(term) < self.min_term_length:
+                    continue
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(terms)
+                    terms.append(term)
+                    values.append(())
+                    grams = trigrams(term)
+                    new_counts.append(len(grams))
+                    for gram in grams:
+                        new_postings.setdefault(gram, []).append(term_id)
+                if value not in values[term_id]:
+                    values[term_id] += (value,)
+                    by_value[value] = by_value.get(value, ()) + (term_id,)
+
+        for gram, ids in new_postings.items():
+            postings[gram] = np.concatenate((postings.get(gram, np.zeros(0, dtype=np.int32)),
+                                             np.asarray(ids, dtype=np.int32)))
+        index = TrigramIndex(self.min_similarity, self.min_term_length, self.min_correct_length)
+        index._state = (terms, values, np.concatenate((counts, np.asarray(new_counts, dtype=np.int32))),
+                        postings, term_ids, by_value)
+        index.version = self.version + 1
+        return index
+
+    def search(self, term: str, limit: int = 5, min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return indexed terms ranked by trigram similarity to term"""
+        terms, values, counts, postings = self._state[:4]
+        threshold = self.min_similarity if min_similarity is None else min_similarity
+        grams = trigrams(term.lower())
+        hits = [postings[gram] for gram in grams if gram in postings]
+        if not hits:
+            return []
+
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        live = counts[candidates] > 0
+        candidates, shared = candidates[live], shared[live]
+        similarity = shared / (len(grams) + counts[candidates] - shared)
+        keep = similarity >= threshold
+        candidates, similarity = candidates[keep], similarity[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            candidates, similarity = candidates[top], similarity[top]
+
+        ranked = sorted(zip(similarity.tolist(), candidates.tolist()), key=lambda item: (-item[0], terms[item[1]]))
+        return [{
+            'term': terms[term_id],
+            'similarity': round(score, 4),
+            'values': values[term_id]
+        } for score, term_id in ranked]
+
+    def match(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Rank indexed values by the best similarity of any word in text"""
+        best: Dict[Any, float] = {}
+        for token in set(tokenize(text)):
+            if len(token) < self.min_term_length:
+                continue
+            for candidate in self.search(token, limit=limit):
+                for value in candidate['values']:
+                    if candidate['similarity'] > best.get(value, 0.0):
+                        best[value] = candidate['similarity']
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:limit]
+        return [{'value': value, 'similarity': score} for value, score in ranked]
+
+    def correct(self, text: str, known: Container[str] = ()) -> str:
+        """Replace unknown words with their closest indexed term; other words, stop words included, are kept
+
+        Words in known (e.g. the knowledge vocabulary) and words shorter than
+        min_correct_length are never corrected.
+        """
+        term_ids = self._state[4]
+        corrected = []
+        for word in TOKEN_PATTERN.findall(text.lower()):
+            tokens = tokenize(word)
+            token = tokens[0] if tokens else None
+            if token is not None and len(token) >= self.min_correct_length and \
+                    token not in term_ids and token not in known:
+                candidates = self.search(token, limit=1)
+                if candidates:
+                    word = candidates[0]['term']
+            corrected.append(word)
+        return ' '.join(corrected)
+
+    def stats(self) -> Dict[str, int]:
+        """Get index size statistics"""
+        postings, term_ids = self._state[3:5]
+        return {
+            'terms': len(term_ids),
+            'trigrams': len(postings),
+            'version': self.version
+        }
+